@@ -4,9 +4,16 @@ import {onAuthStateChanged, signOut, signInWithPopup} from 'firebase/auth';
 import {googleProvider} from './firebase';
 import {doc, getDoc, setDoc} from 'firebase/firestore';
 
+// Rendered width of a card in the grid at each breakpoint
+const CARD_GRID_SIZES = '(min-width: 1280px) 16vw, (min-width: 1024px) 20vw, (min-width: 768px) 25vw, (min-width: 640px) 33vw, 50vw';
+
+// Local thumbnail paths (and srcset lists of them) are relative to the app's base URL
+const withBaseUrl = (paths) => paths.split(', ').map(path => `${import.meta.env.BASE_URL}${path}`).join(', ');
+
 function App() {
   const [user, setUser] = useState(null);
   const [cards, setCards] = useState([]);
+  const [cardsLoaded, setCardsLoaded] = useState(false);
   const [loading, setLoading] = useState(true);
   const [loadingCollection, setLoadingCollection] = useState(false);
   const [isViewOnly, setIsViewOnly] = useState(false);
@@ -23,13 +30,35 @@ function App() {
   const [previousFilter, setPreviousFilter] = useState('all');
 
   useEffect(() => {
+    const fetchJson = async (path, options) => {
+      const response = await fetch(`${import.meta.env.BASE_URL}${path}`, options);
+      if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+      return response.json();
+    };
+
+    // Era shards from data/manifest.json: the shard holding the first cards of the
+    // grid is shown as soon as it arrives, the rest are appended as they load
+    const loadShards = async (manifest) => {
+      const pending = manifest.shards.map(shard => fetchJson(shard.path).then(data => [shard.era, data]));
+      const byEra = {};
+      for (const shardPromise of pending) {
+        const [era, data] = await shardPromise;
+        byEra[era] = data;
+        setCards(manifest.eras.flatMap(e => byEra[e] || []));
+        setLoading(false);
+      }
+    };
+
     const loadCards = async () => {
       try {
-        const response = await fetch(`${import.meta.env.BASE_URL}cards.json`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
-        console.log('✅ Loaded cards:', data.length);
-        setCards(data);
+        const manifest = await fetchJson('data/manifest.json', {cache: 'no-cache'}).catch(() => null);
+        if (manifest) {
+          await loadShards(manifest);
+        } else {
+          setCards(await fetchJson('cards.json'));
+        }
+        console.log('✅ Loaded cards');
+        setCardsLoaded(true);
         setError(null);
       } catch (err) {
         console.error('❌ Error loading cards:', err);
@@ -45,8 +74,7 @@ function App() {
     if (sharedUserId) {
       setIsViewOnly(true);
       setUser({uid: sharedUserId, email: 'Shared Collection'});
-      loadCards();
-      setTimeout(() => loadSharedCollection(sharedUserId), 500);
+      loadCards().then(() => loadSharedCollection(sharedUserId));
     } else {
       const unsubscribe = onAuthStateChanged(auth, (currentUser) => {
         if (currentUser) {
@@ -85,7 +113,7 @@ function App() {
   };
 
   useEffect(() => {
-    if (!user || isViewOnly || cards.length === 0) return;
+    if (!user || isViewOnly || !cardsLoaded) return;
 
     const loadUserCollection = async () => {
       setLoadingCollection(true);
@@ -108,7 +136,7 @@ function App() {
     };
 
     loadUserCollection();
-  }, [user, cards.length]);
+  }, [user, cardsLoaded]);
 
   const enrichVariationsWithUserData = (variations, userData) => {
     if (!variations) return {normal: {count: 0, ordered: false, languages: []}};
@@ -1320,17 +1348,25 @@ useEffect(() => {
       ${currentFilter === 'trade' ? 'cursor-default' : 'hover:border-purple-500 cursor-pointer hover:scale-105 hover:shadow-2xl hover:shadow-purple-500/20'}`}
                 >
                   <div className="aspect-[2/3] relative bg-slate-900">
-                    <img
-                      src={card.imageUrl}
-                      alt={card.name}
-                      onClick={(e) => {
-                        if (currentFilter === 'trade') {
-                          e.stopPropagation();
-                          setImagePopup(card.imageUrl);
-                        }
-                      }}
-                      className={`w-full h-full object-contain p-2 ${currentFilter === 'trade' ? 'cursor-pointer hover:opacity-90 transition-opacity' : ''}`}
-                    />
+                    <picture className="block w-full h-full">
+                      {card.srcsetAvif && (
+                        <source type="image/avif" srcSet={withBaseUrl(card.srcsetAvif)} sizes={CARD_GRID_SIZES}/>
+                      )}
+                      <img
+                        src={card.thumbUrl ? withBaseUrl(card.thumbUrl) : card.imageUrl}
+                        srcSet={card.srcset ? withBaseUrl(card.srcset) : undefined}
+                        sizes={card.srcset ? CARD_GRID_SIZES : undefined}
+                        loading="lazy"
+                        alt={card.name}
+                        onClick={(e) => {
+                          if (currentFilter === 'trade') {
+                            e.stopPropagation();
+                            setImagePopup(card.imageUrl);
+                          }
+                        }}
+                        className={`w-full h-full object-contain p-2 ${currentFilter === 'trade' ? 'cursor-pointer hover:opacity-90 transition-opacity' : ''}`}
+                      />
+                    </picture>
 
                     {/* Trade Status Overlay - Only shows when Trade filter is active */}
                     {currentFilter === 'trade' ? (
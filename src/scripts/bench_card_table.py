@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Card Table Benchmark
+Compares the per-row dict building the review and CSV export steps used to
+do against the columnar variation table, on a synthetic collection made by
+repeating public/cards.json until it reaches the requested variation count.
+"""
+
+import copy
+import json
+import sys
+import time
+
+import pandas as pd
+
+from card_table import csv_frame, load_variation_table, review_frame
+
+
+def synthetic_cards(path: str, variations: int):
+    with open(path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    cards = []
+    repeats = variations // max(1, sum(len(c.get('variations', {})) for c in base)) + 1
+    for n in range(repeats):
+        for card in base:
+            card = copy.deepcopy(card)
+            card['id'] = f"{card['id']}-{n}"
+            cards.append(card)
+    return cards
+
+
+def per_row_dicts(cards):
+    """The previous approach: one dict per variation, then a DataFrame of dicts"""
+    review, rows = [], []
+    for card in cards:
+        for var_type, var_data in card['variations'].items():
+            available_langs = var_data.get('available_languages', [])
+            record = {
+                'card_id': card['id'], 'card_name': card['name'], 'set': card['set'], 'era': card['era'],
+                'number': card['number'], 'variation_type': var_type,
+                'current_languages': ', '.join(available_langs) if available_langs else 'NOT SET',
+                'lang_count': len(available_langs), 'url': card['url'],
+                'needs_review': len(available_langs) != 2 or not available_langs
+            }
+            if record['needs_review']:
+                review.append(record)
+            rows.append({
+                'card_id': card.get('id', ''), 'name': card.get('name', ''), 'set': card.get('set', ''),
+                'era': card.get('era', ''), 'number': card.get('number', ''),
+                'sheet_no': card.get('sheet_no', ''), 'owned': card.get('owned', ''),
+                'imageUrl': card.get('imageUrl', ''), 'url': card.get('url', ''),
+                'enriched': card.get('enriched', ''), 'enriched_method': card.get('enriched_method', ''),
+                'variation_type': var_type, 'count': var_data.get('count', 0),
+                'ordered': var_data.get('ordered', False),
+                'languages': '|'.join(var_data.get('languages', [])),
+                'default_language': var_data.get('default_language', ''),
+                'available_languages': '|'.join(available_langs)
+            })
+    return pd.DataFrame(review), pd.DataFrame(rows)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    variations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cards = synthetic_cards('../../public/cards.json', variations)
+    total = sum(len(c['variations']) for c in cards)
+    print(f"📦 {len(cards)} cards, {total} variations\n")
+
+    old, _ = timed(per_row_dicts, cards)
+    load, table = timed(load_variation_table, cards)
+    steps, _ = timed(lambda: (review_frame(table), csv_frame(table)))
+
+    # The table is built once per run and shared, so the per-step cost is what
+    # each additional step pays instead of re-walking the nested dicts
+    print(f"  per-row dicts (review + CSV rows)  {old * 1000:8.1f} ms")
+    print(f"  table load (once per run)          {load * 1000:8.1f} ms")
+    print(f"  review + CSV frames on the table   {steps * 1000:8.1f} ms  ({old / steps:.1f}x)")
+    print(f"  load + steps                       {(load + steps) * 1000:8.1f} ms  ({old / (load + steps):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
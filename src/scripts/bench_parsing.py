@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+HTML Parsing Micro-benchmark
+Times the per-page cost of the scraper parsing step on saved card pages:
+the original full BeautifulSoup(html.parser) walk against every backend in
+html_parsing that is installed here.
+
+By default the pages are taken from the HTTP cache (run the enricher once
+to fill it); pass a directory of saved .html/.shtml files to use others.
+"""
+
+import os
+import sys
+import time
+from typing import List
+
+from bs4 import BeautifulSoup
+
+from html_parsing import available_backends, find_card_image, variation_hints
+from http_cache import DEFAULT_CACHE_DIR
+
+
+def load_pages(directory: str) -> List[bytes]:
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(('.json', '.tmp')):
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                content = f.read()
+            if b'<html' in content[:2048].lower():
+                pages.append(content)
+    return pages
+
+
+def baseline(content: bytes) -> None:
+    """The scrapers' original parsing: one full tree plus table walk and image lookups"""
+    soup = BeautifulSoup(content, 'html.parser')
+    soup.get_text().lower()
+    for table in soup.find_all('table'):
+        for row in table.find_all('tr'):
+            cells = row.find_all('td')
+            if len(cells) >= 2:
+                cells[0].get_text().strip().lower()
+
+    soup = BeautifulSoup(content.decode('utf-8', 'replace'), 'html.parser')
+    soup.find('img', {'width': '265'})
+    soup.find('table', {'cellpadding': '5'})
+    soup.find('meta', property='og:image')
+    soup.find_all('img')
+
+
+def time_per_page(func, pages: List[bytes], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages:
+            func(content)
+    return (time.perf_counter() - start) / (repeat * len(pages)) * 1000
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE_DIR
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    pages = load_pages(directory)
+    if not pages:
+        print(f"✗ No saved HTML pages found in {directory}")
+        return
+
+    print(f"📄 {len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1024:.1f} KB average, x{repeat}\n")
+
+    base_ms = time_per_page(baseline, pages, repeat)
+    print(f"  {'baseline (html.parser)':<24} {base_ms:8.2f} ms/page")
+
+    for backend in available_backends():
+        def parse(content: bytes, backend=backend) -> None:
+            variation_hints(content, backend)
+            find_card_image(content, 'https://www.serebii.net/card/', backend)
+
+        ms = time_per_page(parse, pages, repeat)
+        print(f"  {backend:<24} {ms:8.2f} ms/page  ({base_ms / ms:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
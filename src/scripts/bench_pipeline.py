@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Times the data pipeline's hot steps on synthetic collections (1k, 10k and
+100k cards by default) and on card pages and TCGdex responses served by a
+local HTTP stub, so changes can be checked against a saved baseline instead
+of against the live sites.
+
+Each benchmark is run for at least MIN_ROUNDS rounds (more while it stays
+under MAX_TIME seconds) after one warm-up round, pytest-benchmark style, and
+reported as min/median/mean/stddev. Setup (building inputs, temporary files
+and stores) is not timed.
+
+Pages and TCGdex responses come from src/data/bench_fixtures when it holds
+recorded ones (fill it from the HTTP cache with --record after a real
+enricher/updater run), otherwise from built-in pages with the same
+structure as Serebii/PkmnCards card pages.
+
+Usage:
+    python bench_pipeline.py                           # run, print results
+    python bench_pipeline.py --sizes 1000 -k migrate   # a subset
+    python bench_pipeline.py --save                    # store as the baseline
+    python bench_pipeline.py --compare                 # exit 1 on a regression
+    python bench_pipeline.py --record                  # refresh the fixtures
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import requests
+
+import cards_db_adjuster
+from card_matcher import CardMatcher
+from card_store import CardStore
+from checkpoint_journal import write_json_atomic
+from database_converter import PUBLIC_CARDS_JSON, csv_to_json, json_to_csv
+from fix_language_bd import auto_fix_languages
+from http_cache import DEFAULT_CACHE_DIR, HttpCache
+from migrations import run_migrations
+from tcgdex_client import fetch_card_details, make_session
+from yuka_morii_data_fetcher import CardEnricher
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'bench_fixtures')
+BASELINE_FILE = os.path.join(CURRENT_DIR, '..', 'data', 'bench_baseline.json')
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+PAGE_COUNT = 200  # Pages scraped / TCGdex ids fetched per HTTP benchmark
+MIN_ROUNDS = 3
+MAX_TIME = 2.0
+DEFAULT_THRESHOLD = 0.25  # A median this much slower than the baseline is a regression
+
+FIXTURE_SOURCES = {
+    'serebii': ('serebii.net',),
+    'pkmncards': ('pkmncards.com',),
+    'tcgdex': ('api.tcgdex.net',),
+}
+
+
+# Synthetic collections
+
+NAME_SUFFIXES = ('', ' ex', ' V', ' GX', ' Delta', ' Star', ' Lv.X')
+SYLLABLES = ('ka', 'ri', 'mo', 'pi', 'chu', 'lo', 'ta', 'ne', 'zu', 'ba', 'sol', 'gar')
+# Owned counts as they occur in a real collection: mostly missing, some doubles
+COUNT_WEIGHTS = ((0, 60), (1, 30), (2, 7), (3, 3))
+
+
+def synthetic_collection(size: int, seed: int = 0, base_path: str = PUBLIC_CARDS_JSON) -> List[Dict]:
+    """
+    `size` cards built from public/cards.json: each copies a real card's era,
+    set and variation mix (so normal/reverse/first edition/promo stamps keep
+    their real proportions) with a new id, name and number, and random owned
+    counts and orders. The same seed always gives the same collection.
+    """
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+
+    rng = random.Random(seed)
+    counts, weights = zip(*COUNT_WEIGHTS)
+    cards = []
+    for i in range(size):
+        card = copy.deepcopy(base[i % len(base)])
+        copy_no = i // len(base)
+        if copy_no:
+            word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+            card['name'] = f"{word}{rng.choice(NAME_SUFFIXES)}"
+        card['id'] = f"{card['id']}-{copy_no}"
+        card['number'] = str(rng.randint(1, 250)).zfill(3)
+        card['sheet_no'] = str(i)
+        for var_data in card.get('variations', {}).values():
+            var_data['count'] = rng.choices(counts, weights)[0]
+            var_data['ordered'] = var_data['count'] == 0 and rng.random() < 0.05
+        cards.append(card)
+    return cards
+
+
+def legacy_collection(cards: List[Dict]) -> List[Dict]:
+    """The same cards in the pre-migration format (variation 'owned': yes/ordered/no)"""
+    legacy = copy.deepcopy(cards)
+    for card in legacy:
+        for var_type, var_data in card.get('variations', {}).items():
+            owned = 'yes' if var_data.get('count') else 'ordered' if var_data.get('ordered') else 'no'
+            card['variations'][var_type] = {'owned': owned, 'languages': var_data.get('languages', [])}
+    return legacy
+
+
+def tcgdex_briefs(cards: List[Dict], seed: int = 0) -> List[Dict]:
+    """
+    A TCGdex catalog for `cards`: most cards listed as-is, some under a
+    slightly different name (so the matcher's fuzzy path is exercised), a
+    few missing, plus unrelated cards.
+    """
+    rng = random.Random(seed)
+    briefs = []
+    for i, card in enumerate(cards):
+        roll = rng.random()
+        if roll < 0.05:
+            continue
+        name = card['name']
+        if roll < 0.15:
+            name = f"{name} {rng.choice(('ex', 'Promo', 'δ'))}" if rng.random() < 0.5 else name.replace('o', '0', 1)
+        briefs.append({'id': f"bench{i % 97}-{card['number']}", 'localId': card['number'], 'name': name,
+                       'set': {'name': card.get('set', '')}})
+    for i in range(len(cards) // 10):
+        briefs.append({'id': f'other-{i}', 'localId': str(i), 'name': f'Other Card {i}', 'set': {'name': 'Other'}})
+    return briefs
+
+
+# Card pages and TCGdex responses
+
+SEREBII_PAGE = '''<html><head><title>{name} - {set} | Serebii.net TCG</title>
+<meta property="og:image" content="/card/{set_slug}/{n}.jpg"></head>
+<body><div id="wrapper"><table class="dextable">{nav}</table>
+<table cellpadding="5"><tr><td><img src="/card/{set_slug}/{n}.jpg" width="265" alt="{name}"></td>
+<td><table class="cardinfo">
+<tr><td>Rarity</td><td>{rarity}</td></tr><tr><td>Illustrator</td><td>Yuka Morii</td></tr>
+<tr><td>Set</td><td>{set}</td></tr><tr><td>Number</td><td>{n}/{total}</td></tr>
+</table></td></tr></table>
+<p>{text}</p></div></body></html>'''
+
+PKMNCARDS_PAGE = '''<html><head><title>{name} · {set} ({n}) – PkmnCards</title>
+<meta property="og:image" content="https://pkmncards.com/wp-content/uploads/{set_slug}_{n}.jpg"></head>
+<body><article class="type-pkmn_card"><div class="card-image-area">
+<img class="card-image" src="https://pkmncards.com/wp-content/uploads/{set_slug}_{n}.jpg"></div>
+<div class="text"><span class="name">{name}</span><span class="rarity">{rarity}</span>
+<p>{text}</p><div class="illus">Illus. Yuka Morii</div></div></article></body></html>'''
+
+RARITIES = ('Common', 'Uncommon', 'Rare', 'Rare Holo', 'Holofoil Rare', 'Reverse Holo Rare')
+FILLER = 'Flip a coin. If heads, the Defending Pokemon is now Paralyzed. ' * 40
+
+
+def builtin_pages(kind: str, count: int, seed: int = 0) -> List[bytes]:
+    rng = random.Random(seed)
+    template = SEREBII_PAGE if kind == 'serebii' else PKMNCARDS_PAGE
+    pages = []
+    for i in range(count):
+        set_name = rng.choice(('Holon Phantoms', 'Neo Genesis', 'Aquapolis', 'Stellar Crown'))
+        nav = ''.join(f'<tr><td><a href="/card/{s}/">{s}</a></td></tr>' for s in range(60))
+        pages.append(template.format(
+            name=f'Card {i}', set=set_name, set_slug=set_name.lower().replace(' ', ''), n=i + 1,
+            total=count, rarity=rng.choice(RARITIES), nav=nav, text=FILLER).encode('utf-8'))
+    return pages
+
+
+def builtin_tcgdex_card(card_id: str) -> Dict:
+    number = card_id.rsplit('-', 1)[-1]
+    return {
+        'id': card_id, 'localId': number, 'name': f'Card {number}', 'illustrator': 'Yuka Morii',
+        'category': 'Pokemon', 'rarity': 'Rare',
+        'set': {'id': card_id.rsplit('-', 1)[0], 'name': 'Bench Set', 'cardCount': {'official': 250, 'total': 260}},
+        'variants': {'normal': True, 'reverse': True, 'holo': False, 'firstEdition': False, 'wPromo': False},
+        'variants_detailed': [{'type': 'normal', 'size': 'standard'}, {'type': 'reverse', 'size': 'standard'}],
+        'attacks': [{'name': 'Tackle', 'cost': ['Colorless'], 'damage': 10, 'effect': FILLER[:200]}],
+        'legal': {'standard': False, 'expanded': False},
+    }
+
+
+def recorded_fixtures(kind: str) -> List[bytes]:
+    directory = os.path.join(FIXTURE_DIR, kind)
+    if not os.path.isdir(directory):
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), 'rb') as f:
+            fixtures.append(f.read())
+    return fixtures
+
+
+def record_fixtures(limit: int = 50, cache_dir: str = DEFAULT_CACHE_DIR) -> Dict[str, int]:
+    """Copy up to `limit` cached responses per site from the HTTP cache into FIXTURE_DIR"""
+    cache = HttpCache(cache_dir)
+    recorded = {kind: 0 for kind in FIXTURE_SOURCES}
+    for name in sorted(os.listdir(cache.meta_dir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(cache.meta_dir, name), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        host = urlparse(meta['url']).netloc.lower()
+        for kind, hosts in FIXTURE_SOURCES.items():
+            if not host.endswith(hosts) or recorded[kind] >= limit or meta['status_code'] != 200:
+                continue
+            if kind == 'tcgdex' and '/cards/' not in meta['url']:
+                continue
+            directory = os.path.join(FIXTURE_DIR, kind)
+            os.makedirs(directory, exist_ok=True)
+            ext = '.json' if kind == 'tcgdex' else '.html'
+            with open(os.path.join(directory, f'{recorded[kind]:03d}{ext}'), 'wb') as f:
+                f.write(cache.read_body(meta))
+            recorded[kind] += 1
+    return recorded
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    /serebii/<n>.shtml and /pkmncards/<n>/: card pages
+    /v2/<lang>/cards/<id>: TCGdex card details
+    /images/<name>: HEAD/GET an image
+    """
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real sites
+    # Headers and body go out in separate writes; without this every response waits on a delayed ACK
+    disable_nagle_algorithm = True
+    pages: Dict[str, List[bytes]] = {}
+    tcgdex: List[bytes] = []
+
+    def _send(self, status: int, content_type: str, body: bytes = b'') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        path = unquote(urlparse(self.path).path)
+        parts = path.strip('/').split('/')
+        if parts[0] in self.pages and len(parts) > 1:
+            pages = self.pages[parts[0]]
+            n = int(''.join(c for c in parts[1] if c.isdigit()) or 0)
+            self._send(200, 'text/html; charset=utf-8', pages[n % len(pages)])
+        elif parts[0] == 'v2' and len(parts) == 4 and parts[2] == 'cards':
+            card_id = parts[3]
+            if self.tcgdex:
+                detail = json.loads(self.tcgdex[sum(map(ord, card_id)) % len(self.tcgdex)])
+                detail['id'] = card_id
+                body = json.dumps(detail).encode('utf-8')
+            else:
+                body = json.dumps(builtin_tcgdex_card(card_id)).encode('utf-8')
+            self._send(200, 'application/json; charset=utf-8', body)
+        elif parts[0] == 'images':
+            self._send(200, 'image/jpeg', b'\xff\xd8\xff\xe0' + b'\0' * 2048)
+        else:
+            self._send(404, 'text/plain', b'not found')
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def stub_server(handler: Optional[type] = None):
+    """Serve the fixtures on 127.0.0.1 (with a StubHandler subclass, if given) and yield the base URL"""
+    StubHandler.pages = {kind: recorded_fixtures(kind) or builtin_pages(kind, 50) for kind in ('serebii', 'pkmncards')}
+    StubHandler.tcgdex = recorded_fixtures('tcgdex')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler or StubHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Harness
+
+@dataclass
+class Benchmark:
+    """
+    Args:
+        name: Benchmark name, a size is appended for sized benchmarks
+        setup: Called (untimed) before every round with (size, base_url); returns the args for `func`
+        func: The timed call
+        sized: Run once per collection size instead of once
+    """
+    name: str
+    setup: Callable[[int, str], Tuple]
+    func: Callable
+    sized: bool = True
+
+
+def measure(bench: Benchmark, size: int, base_url: str,
+            min_rounds: int = MIN_ROUNDS, max_time: float = MAX_TIME) -> Dict:
+    times = []
+    started = time.perf_counter()
+    # One warm-up round (imports, connection pools, page cache), then the timed rounds
+    for round_no in range(1_000_000):
+        args = bench.setup(size, base_url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            bench.func(*args)
+            elapsed = time.perf_counter() - start
+        if round_no:
+            times.append(elapsed)
+        if len(times) >= min_rounds and time.perf_counter() - started >= max_time:
+            break
+
+    return {
+        'rounds': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stddev': statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+_collections: Dict[int, List[Dict]] = {}
+
+
+def collection(size: int) -> List[Dict]:
+    """The synthetic collection of `size` cards, built once per run"""
+    if size not in _collections:
+        _collections[size] = synthetic_collection(size)
+    return _collections[size]
+
+
+_tmp = tempfile.TemporaryDirectory(prefix='yuka-bench-')
+
+
+def _tmp_path(name: str) -> str:
+    return os.path.join(_tmp.name, name)
+
+
+def setup_json_to_csv(size: int, base_url: str) -> Tuple:
+    path = _tmp_path(f'cards-{size}.json')
+    if not os.path.exists(path):
+        write_json_atomic(path, collection(size))
+    return path, _tmp_path(f'cards-{size}.csv')
+
+
+def setup_csv_to_json(size: int, base_url: str) -> Tuple:
+    json_path, csv_path = setup_json_to_csv(size, base_url)
+    if not os.path.exists(csv_path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            json_to_csv(json_path, csv_path)
+    return csv_path, _tmp_path(f'cards-{size}.out.json')
+
+
+def setup_languages(size: int, base_url: str) -> Tuple:
+    # auto_fix_languages edits the cards in place
+    return copy.deepcopy(collection(size)),
+
+
+def setup_migrate(size: int, base_url: str) -> Tuple:
+    path = _tmp_path(f'migrate-{size}.sqlite')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = CardStore(path)
+    store.replace_all(legacy_collection(collection(size)))
+    return store,
+
+
+def migrate(store: CardStore) -> None:
+    run_migrations(store)
+    store.close()
+
+
+def setup_matcher(size: int, base_url: str) -> Tuple:
+    cards = collection(size)
+    return tcgdex_briefs(cards), cards
+
+
+def match_all(briefs: List[Dict], cards: List[Dict]) -> None:
+    matcher = CardMatcher.from_tcgdex_cards(briefs)
+    for card in cards:
+        matcher.match(card)
+
+
+def setup_scrape(kind: str) -> Callable[[int, str], Tuple]:
+    def setup(size: int, base_url: str) -> Tuple:
+        enricher = CardEnricher()
+        # Plain keep-alive session: the benchmark times fetching and parsing, not the HTTP cache
+        enricher.session = make_session(cached=False)
+        scrape = enricher.scrape_serebii_card if kind == 'serebii' else enricher.scrape_pkmncards
+        path = '/serebii/{}.shtml' if kind == 'serebii' else '/pkmncards/{}/'
+        return scrape, [base_url + path.format(i) for i in range(PAGE_COUNT)]
+    return setup
+
+
+def scrape_all(scrape: Callable[[str], Optional[Dict]], urls: List[str]) -> None:
+    for url in urls:
+        if scrape(url) is None:
+            raise RuntimeError(f"Scraping {url} failed")
+
+
+def setup_find_image(size: int, base_url: str) -> Tuple:
+    cards_db_adjuster.session = make_session(cached=False)
+    return [f'{base_url}/serebii/{i}.shtml' for i in range(PAGE_COUNT)],
+
+
+def find_images(urls: List[str]) -> None:
+    for url in urls:
+        cards_db_adjuster.find_image_url(url)
+
+
+def setup_tcgdex(size: int, base_url: str) -> Tuple:
+    ids = [f'bench{i % 20}-{i}' for i in range(PAGE_COUNT)]
+    return make_session(pool_size=8, cached=False), ids, f'{base_url}/v2'
+
+
+def fetch_tcgdex(session: requests.Session, ids: List[str], api_base: str) -> None:
+    details = fetch_card_details(session, ids, api_base=api_base)
+    if not all(details.values()):
+        raise RuntimeError("Fetching TCGdex card details failed")
+
+
+BENCHMARKS = [
+    Benchmark('json_to_csv', setup_json_to_csv, json_to_csv),
+    Benchmark('csv_to_json', setup_csv_to_json, csv_to_json),
+    Benchmark('auto_fix_languages', setup_languages, auto_fix_languages),
+    Benchmark('migrate_owned_to_count', setup_migrate, migrate),
+    Benchmark('tcgdex_match', setup_matcher, match_all),
+    Benchmark('scrape_serebii', setup_scrape('serebii'), scrape_all, sized=False),
+    Benchmark('scrape_pkmncards', setup_scrape('pkmncards'), scrape_all, sized=False),
+    Benchmark('find_image_url', setup_find_image, find_images, sized=False),
+    Benchmark('tcgdex_fetch_details', setup_tcgdex, fetch_tcgdex, sized=False),
+]
+
+
+def run_benchmarks(sizes: List[int], pattern: Optional[str] = None) -> Dict[str, Dict]:
+    results = {}
+    with stub_server() as base_url:
+        for bench in BENCHMARKS:
+            if pattern and pattern not in bench.name:
+                continue
+            for size in (sizes if bench.sized else [PAGE_COUNT]):
+                name = f'{bench.name}[{size}]'
+                result = measure(bench, size, base_url)
+                results[name] = result
+                print(f"  {name:<32} {result['median'] * 1000:10.2f} ms  "
+                      f"(min {result['min'] * 1000:.2f}, ±{result['stddev'] * 1000:.2f}, {result['rounds']} rounds)")
+    return results
+
+
+def machine_info() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'processor': platform.processor() or platform.machine(),
+            'cpus': str(os.cpu_count())}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Names of the benchmarks whose median is more than `threshold` slower than the baseline's"""
+    if baseline.get('machine') != machine_info():
+        print("⚠️ The baseline was recorded on a different machine or Python, timings may not compare")
+
+    regressions = []
+    print(f"\n{'benchmark':<34} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline['benchmarks'].get(name)
+        if not before:
+            print(f"  {name:<32} {'-':>10} {result['median'] * 1000:10.2f}     new")
+            continue
+        change = result['median'] / before['median'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  ❌'
+        print(f"  {name:<32} {before['median'] * 1000:10.2f} {result['median'] * 1000:10.2f} "
+              f"{change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the card data pipeline')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated synthetic collection sizes')
+    parser.add_argument('-k', dest='pattern', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--save', action='store_true', help='Store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare with the baseline, exit 1 on a regression')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed median slowdown before a benchmark counts as a regression (0.25 = 25%%)')
+    parser.add_argument('--record', action='store_true', help='Record fixtures from the HTTP cache and exit')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        recorded = record_fixtures()
+        print(f"✅ Recorded fixtures: {', '.join(f'{kind} {n}' for kind, n in recorded.items())}")
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    sources = ', '.join(f"{kind}: {'recorded' if recorded_fixtures(kind) else 'built-in'}"
+                        for kind in FIXTURE_SOURCES)
+    print(f"📊 Benchmarking with {', '.join(map(str, sizes))} cards ({sources})\n")
+    results = run_benchmarks(sizes, args.pattern)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"❌ No baseline at {args.baseline}, run with --save first")
+            return 1
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions over {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+            status = 1
+        else:
+            print(f"\n✅ No regressions over {args.threshold * 100:.0f}%")
+
+    if args.save:
+        baseline = {'benchmarks': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        # A partial run (-k, other sizes) only replaces the benchmarks it ran
+        baseline['machine'] = machine_info()
+        baseline['saved_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        baseline['benchmarks'].update(results)
+        write_json_atomic(args.baseline, baseline)
+        print(f"\n✓ Saved {len(results)} results to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Streaming Conversion Benchmark
+Generates a large CSV (one million variation rows by default) plus the
+matching JSON, then runs each converter in its own process and reports
+wall time and peak memory (max RSS), in-memory against streaming.
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from database_converter import CSV_FIELDNAMES, csv_to_json_streaming
+
+VARIATION_TYPES = ['normal', 'reverse_holo', 'holo', 'first_edition']
+
+CHILD = '''
+import resource, sys, time
+import database_converter
+func = getattr(database_converter, sys.argv[1])
+start = time.perf_counter()
+func(sys.argv[2], sys.argv[3])
+print(f"{time.perf_counter() - start:.2f} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}")
+'''
+
+
+def generate_csv(path: str, rows: int) -> None:
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+        for i in range(rows):
+            card = i // len(VARIATION_TYPES)
+            writer.writerow({
+                'card_id': f'set{card % 500}-{card:07d}', 'name': f'Card {card}', 'set': f'Set {card % 500}',
+                'era': 'EX', 'number': f'{card % 300:03d}', 'sheet_no': str(card), 'owned': 'no',
+                'imageUrl': f'https://www.serebii.net/card/set{card % 500}/{card % 300}.jpg',
+                'url': f'https://www.serebii.net/card/set{card % 500}/{card % 300:03d}.shtml',
+                'enriched': True, 'enriched_method': 'web_scraping',
+                'variation_type': VARIATION_TYPES[i % len(VARIATION_TYPES)], 'count': i % 3, 'ordered': False,
+                'languages': 'English', 'default_language': 'EN', 'available_languages': 'EN|JP',
+            })
+
+
+def run(func: str, src: str, dst: str) -> str:
+    result = subprocess.run([sys.executable, '-c', CHILD, func, src, dst],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, peak_mb = result.stdout.strip().splitlines()[-1].split()
+    return f"{float(seconds):7.2f} s  {int(peak_mb):6d} MB peak"
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, 'cards.csv')
+        json_file = os.path.join(tmp, 'cards.json')
+        generate_csv(csv_file, rows)
+        csv_to_json_streaming(csv_file, json_file)
+        print(f"\n📦 {rows} rows: CSV {os.path.getsize(csv_file) / 2**20:.0f} MB, "
+              f"JSON {os.path.getsize(json_file) / 2**20:.0f} MB\n")
+
+        out = os.path.join(tmp, 'out')
+        print(f"  json_to_csv            {run('json_to_csv', json_file, out)}")
+        print(f"  json_to_csv_streaming  {run('json_to_csv_streaming', json_file, out)}")
+        print(f"  csv_to_json            {run('csv_to_json', csv_file, out)}")
+        print(f"  csv_to_json_streaming  {run('csv_to_json_streaming', csv_file, out)}")
+
+
+if __name__ == '__main__':
+    main()
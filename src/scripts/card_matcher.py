@@ -0,0 +1,166 @@
+"""
+Card Matcher
+Indexed matching of collection cards to TCGdex cards. Lookups go through
+hash indexes on normalized (name, set, number), (name, number) and name,
+with a trigram index over names as the fuzzy fallback for names such as
+"Croconaw 未" or "Pikachu TOKYO". Every match carries a confidence score
+and an explanation.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+MIN_FUZZY_SCORE = 0.6
+MIN_SHARED_TRIGRAMS = 3
+# Combining diacritical marks, dropped after NFKD; marks of other scripts (e.g. kana dakuten) are kept
+LATIN_ACCENTS = re.compile('[\u0300-\u036f]')
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase, strip accents and punctuation ('Pokémon' -> 'pokemon'). Other
+    scripts are kept ('Croconaw 未' -> 'croconaw 未'), so such names are not
+    mistaken for their plain counterparts.
+    """
+    text = unicodedata.normalize('NFKD', name or '')
+    text = unicodedata.normalize('NFKC', LATIN_ACCENTS.sub('', text))
+    return ' '.join(re.findall(r'[^\W_]+', text.lower()))
+
+
+def normalize_set(set_name: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', normalize_name(set_name))
+
+
+def normalize_number(number: str) -> str:
+    """'022' -> '22', 'H19' -> 'h19'"""
+    text = re.sub(r'[^a-z0-9]', '', str(number or '').lower())
+    return text.lstrip('0') or ('0' if text else '')
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class MatchResult:
+    tcgdex_id: str
+    confidence: float
+    explanation: str
+
+
+class CardMatcher:
+    """Index of TCGdex cards, built once and queried per collection card"""
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self._by_name_set_number = defaultdict(list)
+        self._by_name_number = defaultdict(list)
+        self._by_name = defaultdict(list)
+        self._trigrams = defaultdict(set)
+        self._name_trigrams: Dict[str, Set[str]] = {}
+        self._fuzzy_memo: Dict[str, List[tuple]] = {}
+
+    def add(self, tcgdex_id: str, name: str, number: str = '', set_name: str = '') -> None:
+        name_key = normalize_name(name)
+        number_key = normalize_number(number)
+        set_key = normalize_set(set_name)
+        self.entries[tcgdex_id] = {'name': name, 'number': number, 'set': set_name}
+
+        if set_key:
+            self._by_name_set_number[(name_key, set_key, number_key)].append(tcgdex_id)
+        self._by_name_number[(name_key, number_key)].append(tcgdex_id)
+        self._by_name[name_key].append(tcgdex_id)
+
+        if name_key not in self._name_trigrams:
+            self._fuzzy_memo.clear()
+            grams = trigrams(name_key)
+            self._name_trigrams[name_key] = grams
+            for gram in grams:
+                self._trigrams[gram].add(name_key)
+
+    @classmethod
+    def from_tcgdex_cards(cls, tcgdex_cards: List[Dict]) -> 'CardMatcher':
+        """Build from TCGdex card briefs ({id, localId, name}) or full details"""
+        matcher = cls()
+        for card in tcgdex_cards:
+            card_set = card.get('set') or {}
+            matcher.add(card.get('id'), card.get('name', ''), card.get('localId', ''),
+                        card_set.get('name', '') if isinstance(card_set, dict) else '')
+        return matcher
+
+    def _fuzzy_names(self, name_key: str) -> List[tuple]:
+        """Top names sharing trigrams with the query, best first, as (score, name)"""
+        if name_key in self._fuzzy_memo:
+            return self._fuzzy_memo[name_key]
+        query = trigrams(name_key)
+
+        # A usable candidate shares at least MIN_SHARED_TRIGRAMS grams with the query,
+        # so it must appear in the posting list of one of the rarest
+        # len(query) - MIN_SHARED_TRIGRAMS + 1 grams - the common ones are never scanned
+        by_rarity = sorted(query, key=lambda gram: len(self._trigrams.get(gram, ())))
+        probe = by_rarity[:max(1, len(by_rarity) - MIN_SHARED_TRIGRAMS + 1)]
+        candidates = set()
+        for gram in probe:
+            candidates.update(self._trigrams.get(gram, ()))
+
+        scored = []
+        for candidate in candidates:
+            candidate_grams = self._name_trigrams[candidate]
+            common = len(query & candidate_grams)
+            dice = 2 * common / (len(query) + len(candidate_grams))
+            # "pikachu tokyo" fully contains "pikachu" - weight containment a bit lower than dice
+            containment = 0.9 * common / len(candidate_grams)
+            scored.append((max(dice, containment), candidate))
+
+        self._fuzzy_memo[name_key] = sorted(scored, reverse=True)[:5]
+        return self._fuzzy_memo[name_key]
+
+    def _pick(self, ids: List[str], set_key: str, number_key: str, confidence: float,
+              reason: str) -> MatchResult:
+        """Choose among several ids for one name, preferring set then number"""
+        if len(ids) == 1:
+            return MatchResult(ids[0], confidence, reason)
+
+        for tcgdex_id in ids:
+            entry = self.entries[tcgdex_id]
+            if set_key and normalize_set(entry['set']) == set_key:
+                return MatchResult(tcgdex_id, confidence * 0.95, f"{reason}, set agrees among {len(ids)} reprints")
+        for tcgdex_id in ids:
+            if number_key and normalize_number(self.entries[tcgdex_id]['number']) == number_key:
+                return MatchResult(tcgdex_id, confidence * 0.9, f"{reason}, number agrees among {len(ids)} reprints")
+        return MatchResult(ids[0], confidence * 0.6, f"{reason}, ambiguous among {len(ids)} reprints")
+
+    def match(self, card: Dict) -> Optional[MatchResult]:
+        """Find the best TCGdex card for a collection card, or None"""
+        name_key = normalize_name(card.get('name', ''))
+        set_key = normalize_set(card.get('set', ''))
+        number_key = normalize_number(card.get('number', ''))
+
+        ids = self._by_name_set_number.get((name_key, set_key, number_key))
+        if ids:
+            return MatchResult(ids[0], 1.0, 'exact name, set and number')
+
+        ids = self._by_name_number.get((name_key, number_key))
+        if ids:
+            return self._pick(ids, set_key, number_key, 0.9, 'exact name and number')
+
+        ids = self._by_name.get(name_key)
+        if ids:
+            return self._pick(ids, set_key, number_key, 0.75, 'exact name')
+
+        best = None
+        for score, candidate in self._fuzzy_names(name_key):
+            if score < MIN_FUZZY_SCORE:
+                break
+            ids = self._by_name[candidate]
+            reason = f"fuzzy name '{card.get('name', '')}' ~ '{self.entries[ids[0]]['name']}' ({score:.2f})"
+            number_ids = [i for i in ids if normalize_number(self.entries[i]['number']) == number_key]
+            if number_ids:
+                return self._pick(number_ids, set_key, number_key, 0.7 * score, reason + ', number agrees')
+            best = best or self._pick(ids, set_key, number_key, 0.5 * score, reason)
+
+        return best
@@ -0,0 +1,330 @@
+"""
+Card Store
+SQLite (WAL mode) store for the collection with one table for cards and one
+for their variations, indexed on id, set, era and variation_type. Scripts
+read and update just the rows they touch in a transaction, and
+public/cards.json becomes a view exported from the store.
+
+The store is lossless: key order and any non-standard fields are kept, so
+exporting reproduces the cards.json it was imported from byte-for-byte.
+If cards.json is changed outside the store, open_store() re-imports it.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from checkpoint_journal import write_json_atomic
+from database_converter import CARD_COLUMNS, PUBLIC_CARDS_JSON, VARIATION_COLUMNS, _split_fields
+from publish_artifacts import build_artifacts
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CARD_STORE = os.path.join(CURRENT_DIR, '..', 'data', 'cards.sqlite')
+
+CARD_VALUE_COLUMNS = [name for name in CARD_COLUMNS if name != 'id']
+LIST_COLUMNS = [name for name, kind in VARIATION_COLUMNS.items() if kind is list]
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    keys TEXT NOT NULL,
+    extra TEXT,
+    %s
+);
+CREATE TABLE IF NOT EXISTS variations (
+    card_id TEXT NOT NULL REFERENCES cards (id) ON DELETE CASCADE,
+    variation_type TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    keys TEXT,
+    extra TEXT,
+    %s,
+    PRIMARY KEY (card_id, variation_type)
+);
+CREATE INDEX IF NOT EXISTS cards_by_pos ON cards (pos);
+CREATE INDEX IF NOT EXISTS cards_by_set ON cards ("set");
+CREATE INDEX IF NOT EXISTS cards_by_era ON cards (era);
+CREATE INDEX IF NOT EXISTS variations_by_type ON variations (variation_type);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+''' % (',\n    '.join(f'"{name}"' for name in CARD_VALUE_COLUMNS),
+       ',\n    '.join(f'"{name}"' for name in VARIATION_COLUMNS))
+
+CARD_COLUMN_LIST = ', '.join(f'"{name}"' for name in CARD_VALUE_COLUMNS)
+VARIATION_COLUMN_LIST = ', '.join(f'"{name}"' for name in VARIATION_COLUMNS)
+
+
+# json.dumps(..., ensure_ascii=False) builds a new encoder per call; reuse one
+_to_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+@lru_cache(maxsize=1024)
+def _keys_json(keys: tuple) -> str:
+    """Key lists repeat across cards, so their JSON is built once per distinct list"""
+    return _to_json(list(keys))
+
+
+@lru_cache(maxsize=1024)
+def _keys_list(keys_json: str) -> tuple:
+    return tuple(json.loads(keys_json))
+
+
+def _file_hash(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class CardStore:
+    """Cards and variations in SQLite, queried and updated row by row"""
+
+    def __init__(self, path: str = CARD_STORE):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT COUNT(*) FROM cards').fetchone()[0]
+
+    # Writing
+
+    def _card_row(self, card: Dict, pos: int) -> tuple:
+        card_fields = {k: v for k, v in card.items() if k != 'variations'}
+        values, extra = _split_fields(card_fields, CARD_COLUMNS)
+        if 'variations' in card and not isinstance(card['variations'], dict):
+            extra = _to_json({**(json.loads(extra) if extra else {}), 'variations': card['variations']})
+        return (card.get('id'), pos, _keys_json(tuple(card)), extra,
+                *[values.get(name) for name in CARD_VALUE_COLUMNS])
+
+    @staticmethod
+    def _variation_row(card_id: str, variation_type: str, pos: int, variation_data) -> tuple:
+        if not isinstance(variation_data, dict):
+            return (card_id, variation_type, pos, None, _to_json(variation_data),
+                    *[None] * len(VARIATION_COLUMNS))
+        values, extra = _split_fields(variation_data, VARIATION_COLUMNS)
+        for name in LIST_COLUMNS:
+            if name in values:
+                values[name] = _to_json(values[name])
+        return (card_id, variation_type, pos, _keys_json(tuple(variation_data)), extra,
+                *[values.get(name) for name in VARIATION_COLUMNS])
+
+    def upsert_cards(self, cards: Iterable[Dict], meta: Optional[Dict[str, str]] = None) -> int:
+        """
+        Insert or replace whole cards (with their variations) in one transaction.
+
+        Existing cards keep their position in the collection, new ones are
+        appended. `meta` entries are written in the same transaction, so
+        progress markers commit together with the rows. Returns the number of
+        cards written.
+        """
+        # A card listed twice is written once, with its last version
+        cards = list({card.get('id'): card for card in cards}.values())
+        ids = [card.get('id') for card in cards]
+
+        with self.db:
+            for key, value in (meta or {}).items():
+                self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+            positions = {}
+            for chunk in range(0, len(ids), 500):
+                part = ids[chunk:chunk + 500]
+                positions.update(self.db.execute(
+                    f'SELECT id, pos FROM cards WHERE id IN ({", ".join("?" * len(part))})', part).fetchall())
+            next_pos = self.db.execute('SELECT COALESCE(MAX(pos) + 1, 0) FROM cards').fetchone()[0]
+
+            card_rows, variation_rows = [], []
+            for card in cards:
+                card_id = card.get('id')
+                if card_id not in positions:
+                    positions[card_id], next_pos = next_pos, next_pos + 1
+                card_rows.append(self._card_row(card, positions[card_id]))
+
+                variations = card.get('variations')
+                if isinstance(variations, dict):
+                    variation_rows.extend(self._variation_row(card_id, variation_type, i, data)
+                                          for i, (variation_type, data) in enumerate(variations.items()))
+
+            self.db.executemany('DELETE FROM variations WHERE card_id = ?', [(card_id,) for card_id in ids])
+            self.db.executemany(f'INSERT OR REPLACE INTO cards (id, pos, keys, extra, {CARD_COLUMN_LIST}) '
+                                f'VALUES ({", ".join("?" * (len(CARD_COLUMNS) + 3))})', card_rows)
+            self.db.executemany(
+                f'INSERT INTO variations (card_id, variation_type, pos, keys, extra, {VARIATION_COLUMN_LIST}) '
+                f'VALUES ({", ".join("?" * (len(VARIATION_COLUMNS) + 5))})', variation_rows)
+        return len(cards)
+
+    def replace_all(self, cards: List[Dict]) -> None:
+        """Replace the whole collection, keeping the order of `cards`"""
+        with self.db:
+            self.db.execute('DELETE FROM variations')
+            self.db.execute('DELETE FROM cards')
+        self.upsert_cards(cards)
+
+    def update_card(self, card_id: str, **fields) -> bool:
+        """Set card-level fields (e.g. imageUrl=...) on one card; False if it does not exist"""
+        card = self.get_card(card_id)
+        if card is None:
+            return False
+        card.update(fields)
+        self.upsert_cards([card])
+        return True
+
+    def update_variation(self, card_id: str, variation_type: str, **fields) -> bool:
+        """Set fields (count, ordered, languages, ...) on one variation, creating it if needed"""
+        card = self.get_card(card_id)
+        if card is None or not isinstance(card.get('variations'), dict):
+            return False
+        variation = card['variations'].setdefault(variation_type, {})
+        variation.update(fields)
+
+        with self.db:
+            pos = self.db.execute('SELECT pos FROM variations WHERE card_id = ? AND variation_type = ?',
+                                  (card_id, variation_type)).fetchone()
+            self.db.execute(
+                f'INSERT OR REPLACE INTO variations (card_id, variation_type, pos, keys, extra, {VARIATION_COLUMN_LIST}) '
+                f'VALUES ({", ".join("?" * (len(VARIATION_COLUMNS) + 5))})',
+                self._variation_row(card_id, variation_type, pos['pos'] if pos else len(card['variations']) - 1,
+                                    variation))
+        return True
+
+    # Reading
+
+    def _cards_from_rows(self, card_rows: List[sqlite3.Row]) -> List[Dict]:
+        if not card_rows:
+            return []
+        ids = [row['id'] for row in card_rows]
+        variations = {card_id: [] for card_id in ids}
+        for chunk in range(0, len(ids), 500):
+            part = ids[chunk:chunk + 500]
+            for row in self.db.execute(
+                    f'SELECT * FROM variations WHERE card_id IN ({", ".join("?" * len(part))}) '
+                    f'ORDER BY card_id, pos', part):
+                variations[row['card_id']].append(row)
+
+        cards = []
+        for row in card_rows:
+            extra = json.loads(row['extra']) if row['extra'] else {}
+            card = {}
+            for key in _keys_list(row['keys']):
+                if key in extra:
+                    card[key] = extra[key]
+                elif key == 'variations':
+                    card[key] = {v['variation_type']: self._variation_from_row(v) for v in variations[row['id']]}
+                elif key in CARD_COLUMNS:
+                    card[key] = bool(row[key]) if CARD_COLUMNS[key] is bool else row[key]
+            cards.append(card)
+        return cards
+
+    @staticmethod
+    def _variation_from_row(row: sqlite3.Row):
+        extra = json.loads(row['extra']) if row['extra'] else {}
+        if row['keys'] is None:
+            return extra
+        variation = {}
+        for key in _keys_list(row['keys']):
+            if key in extra:
+                variation[key] = extra[key]
+            elif key in LIST_COLUMNS:
+                variation[key] = json.loads(row[key])
+            elif VARIATION_COLUMNS.get(key) is bool:
+                variation[key] = bool(row[key])
+            else:
+                variation[key] = row[key]
+        return variation
+
+    def get_card(self, card_id: str) -> Optional[Dict]:
+        cards = self._cards_from_rows(self.db.execute('SELECT * FROM cards WHERE id = ?', (card_id,)).fetchall())
+        return cards[0] if cards else None
+
+    def find_cards(self, set: Optional[str] = None, era: Optional[str] = None,
+                   variation_type: Optional[str] = None) -> List[Dict]:
+        """Cards matching every given filter, in collection order"""
+        clauses, params = [], []
+        if set is not None:
+            clauses.append('"set" = ?')
+            params.append(set)
+        if era is not None:
+            clauses.append('era = ?')
+            params.append(era)
+        if variation_type is not None:
+            clauses.append('id IN (SELECT card_id FROM variations WHERE variation_type = ?)')
+            params.append(variation_type)
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        return self._cards_from_rows(self.db.execute(f'SELECT * FROM cards {where} ORDER BY pos', params).fetchall())
+
+    def all_cards(self) -> List[Dict]:
+        return self.find_cards()
+
+    def iter_batches(self, batch_size: int = 500, after_pos: int = -1) -> Iterator[Tuple[int, List[Dict]]]:
+        """Yield (position of the last card, cards) in collection order, batch_size cards at a time"""
+        while True:
+            rows = self.db.execute('SELECT * FROM cards WHERE pos > ? ORDER BY pos LIMIT ?',
+                                   (after_pos, batch_size)).fetchall()
+            if not rows:
+                return
+            after_pos = rows[-1]['pos']
+            yield after_pos, self._cards_from_rows(rows)
+
+    # cards.json view
+
+    def import_json(self, path: str = PUBLIC_CARDS_JSON) -> int:
+        with open(path, 'r', encoding='utf-8') as f:
+            cards = json.load(f)
+        self.replace_all(cards)
+
+        # Whatever was recorded about the previous contents (e.g. schema version) no longer holds
+        with self.db:
+            self.db.execute('DELETE FROM meta')
+        self.set_meta('source_hash', _file_hash(path))
+        return len(cards)
+
+    def export_json(self, path: str = PUBLIC_CARDS_JSON) -> int:
+        """
+        Write the collection as indented JSON (atomically) and return the card
+        count. Exporting public/cards.json also rebuilds the app's artifacts.
+        """
+        cards = self.all_cards()
+        write_json_atomic(path, cards)
+        if os.path.abspath(path) == os.path.abspath(PUBLIC_CARDS_JSON):
+            self.set_meta('source_hash', _file_hash(path))
+            # Keep what the app downloads in step with cards.json
+            build_artifacts(cards)
+        return len(cards)
+
+    def is_in_sync(self, path: str = PUBLIC_CARDS_JSON) -> bool:
+        """True if cards.json is unchanged since the store last imported or exported it"""
+        source_hash = self.get_meta('source_hash')
+        return source_hash is not None and source_hash == _file_hash(path)
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key: str, value: Optional[str]) -> None:
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+
+def open_store(path: str = CARD_STORE, source: str = PUBLIC_CARDS_JSON) -> CardStore:
+    """Open the card store, (re-)importing cards.json if it changed outside the store"""
+    store = CardStore(path)
+    if os.path.exists(source) and not store.is_in_sync(source):
+        count = store.import_json(source)
+        print(f"📥 Imported {count} cards from {os.path.basename(source)} into the card store")
+    return store
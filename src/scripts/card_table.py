@@ -0,0 +1,123 @@
+"""
+Card Variation Table
+Flattens cards.json once into a columnar pandas table with one row per
+variation, so the review, language-fix and CSV export steps can work with
+vectorized operations instead of re-walking the nested card -> variations
+dicts.
+
+List fields (languages, available_languages) are stored pipe-separated,
+matching the CSV format.
+"""
+
+import json
+from typing import Dict, List, Union
+
+import pandas as pd
+
+CARD_FIELDS = ['id', 'name', 'set', 'era', 'number', 'sheet_no', 'owned', 'imageUrl', 'url',
+               'enriched', 'enriched_method']
+
+
+def load_variation_table(cards: Union[str, List[Dict]]) -> pd.DataFrame:
+    """
+    Build the variation table from a cards list, a cards.json path or a
+    .parquet/.arrow snapshot (read column-wise, without building dicts).
+
+    Columns: card_pos (index of the card in the list), the card fields,
+    variation_type, count, ordered, languages, default_language,
+    available_languages and languages_source ('tcgdex' when the available
+    languages came from the TCGdex catalogs). era, set, variation_type,
+    default_language, available_languages and languages_source are categorical.
+    """
+    if isinstance(cards, str) and cards.endswith(('.parquet', '.arrow')):
+        return _snapshot_variation_table(cards)
+
+    if isinstance(cards, str):
+        with open(cards, 'r', encoding='utf-8') as f:
+            cards = json.load(f)
+
+    # Card-level columns are built once per card and expanded by position
+    card_columns = pd.DataFrame({field: [card.get(field, '') for card in cards] for field in CARD_FIELDS})
+    for column in ('era', 'set'):
+        card_columns[column] = card_columns[column].astype('category')
+
+    items = [(pos, variation_type, variation_data)
+             for pos, card in enumerate(cards)
+             for variation_type, variation_data in card.get('variations', {}).items()]
+    card_pos = [pos for pos, _, _ in items]
+
+    table = card_columns.take(card_pos).reset_index(drop=True)
+    table.insert(0, 'card_pos', card_pos)
+    table['variation_type'] = pd.Categorical([variation_type for _, variation_type, _ in items])
+    table['count'] = [data.get('count', 0) for _, _, data in items]
+    table['ordered'] = [data.get('ordered', False) for _, _, data in items]
+    table['languages'] = ['|'.join(data.get('languages', [])) for _, _, data in items]
+    table['default_language'] = pd.Categorical([data.get('default_language', '') for _, _, data in items])
+    table['available_languages'] = pd.Categorical(
+        ['|'.join(data.get('available_languages', [])) for _, _, data in items])
+    table['languages_source'] = pd.Categorical([data.get('languages_source', '') for _, _, data in items])
+    return table
+
+
+def _snapshot_variation_table(path: str) -> pd.DataFrame:
+    import pyarrow.compute as pc
+    from database_converter import read_snapshot_table
+
+    snapshot = read_snapshot_table(path)
+    snapshot = snapshot.filter(pc.is_valid(snapshot.column('variation_type')))
+
+    columns = {'card_pos': snapshot.column('card_pos')}
+    for field in CARD_FIELDS + ['variation_type', 'count', 'ordered', 'default_language']:
+        columns[field] = snapshot.column(field)
+    for field in ('languages', 'available_languages'):
+        columns[field] = pc.binary_join(snapshot.column(field), '|')
+
+    table = pd.DataFrame({name: column.to_pandas() for name, column in columns.items()})
+    # Not a typed column; only the few variations carrying extra keys have it
+    table['languages_source'] = [json.loads(extra).get('languages_source', '') if extra else ''
+                                 for extra in snapshot.column('variation_extra').to_pylist()]
+    for field in CARD_FIELDS + ['default_language', 'languages', 'available_languages']:
+        if table[field].dtype == object:
+            table[field] = table[field].fillna('')
+    table['count'] = table['count'].fillna(0).astype('int64')
+    table['ordered'] = table['ordered'].fillna(False).astype(bool)
+    for column in ('era', 'set', 'variation_type', 'default_language', 'available_languages', 'languages_source'):
+        table[column] = table[column].astype('category')
+    return table
+
+
+def language_counts(table: pd.DataFrame) -> pd.Series:
+    """Number of available languages per variation"""
+    available = table['available_languages']
+    return available.str.count(r'\|').add(1).where(available != '', 0)
+
+
+def review_frame(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Variations whose available languages are not exactly two, in review CSV
+    layout. Languages taken from the TCGdex catalogs need no review.
+    """
+    lang_count = language_counts(table)
+    needs_review = (lang_count != 2) & (table['languages_source'] != 'tcgdex')
+
+    review = pd.DataFrame({
+        'card_id': table['id'],
+        'card_name': table['name'],
+        'set': table['set'],
+        'era': table['era'],
+        'number': table['number'],
+        'variation_type': table['variation_type'],
+        'current_languages': table['available_languages'].str.replace('|', ', ', regex=False)
+                                                         .replace('', 'NOT SET'),
+        'lang_count': lang_count,
+        'url': table['url'],
+        'needs_review': needs_review,
+    })
+    return review[needs_review].reset_index(drop=True)
+
+
+def csv_frame(table: pd.DataFrame) -> pd.DataFrame:
+    """The table in the database_converter CSV layout (one row per variation)"""
+    frame = table.drop(columns=['card_pos']).rename(columns={'id': 'card_id'})
+    return frame[['card_id'] + CARD_FIELDS[1:] + [
+        'variation_type', 'count', 'ordered', 'languages', 'default_language', 'available_languages']]
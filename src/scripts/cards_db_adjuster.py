@@ -1,10 +1,18 @@
-import json
-import requests
-from bs4 import BeautifulSoup
-import time
-from urllib.parse import urljoin
+import os
 
+from card_store import open_store
+from fingerprints import MANIFEST_DIR, FingerprintManifest
+from html_parsing import find_card_image
+from http_cache import CachedSession
+from image_resolver import ImageUrlResolver
+from instrumentation import metrics, profiling_requested
 
+IMAGE_RESOLVER_VERSION = '1'
+
+session = CachedSession()
+
+
+@metrics.stage('find_image_url')
 def find_image_url(page_url):
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -12,36 +20,12 @@ def find_image_url(page_url):
 
     try:
         # Scrape the page to find the card image
-        response = requests.get(page_url, headers=headers, timeout=10)
+        response = session.get(page_url, headers=headers, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Method 1: Look for image in table with specific attributes
-        # Find img tag with width="265" or border="0" (common pattern for card images)
-        img_tag = soup.find("img", {"width": "265"})
-        if img_tag and img_tag.get("src"):
-            # Convert relative URL to absolute URL
-            img_url = urljoin(page_url, img_tag["src"])
-            return img_url
-
-        # Method 2: Look for images in table cells
-        table = soup.find("table", {"cellpadding": "5"})
-        if table:
-            img_tag = table.find("img")
-            if img_tag and img_tag.get("src"):
-                img_url = urljoin(page_url, img_tag["src"])
-                return img_url
-
-        # Method 3: Look for Open Graph image
-        og_image = soup.find("meta", property="og:image")
-        if og_image and og_image.get("content"):
-            return og_image["content"]
-
-        # Method 4: Look for any image with /card/ in the path
-        for img in soup.find_all("img"):
-            src = img.get("src", "")
-            if "/card/" in src:
-                return urljoin(page_url, src)
+
+        # Method 1: <img width="265">, 2: first image in <table cellpadding="5">,
+        # 3: Open Graph image, 4: any image with /card/ in the path
+        return find_card_image(response.content, page_url)
 
     except Exception as e:
         print(f"Error fetching {page_url}: {e}")
@@ -49,36 +33,78 @@ def find_image_url(page_url):
     return ""
 
 
-def update_cards():
-    # Load your existing json
-    with open('../../public/cards.json', 'r', encoding='utf-8') as f:
-        cards = json.load(f)
+def fill_image_urls(cards, on_found=None, workers=8):
+    """
+    Look up imageUrl for cards that lack one or whose url/set/number changed
+    since their image was found. Cards are updated in place and on_found(card)
+    is called for each new URL. Returns the cards.
+
+    Image URLs are inferred from the page URL and from the templates of cards
+    in the same set, and confirmed with `workers` concurrent HEAD requests;
+    only misses download and parse the card page.
+    """
+    # Cards whose url/set/number changed since their image was found are looked up again
+    manifest = FingerprintManifest(os.path.join(MANIFEST_DIR, 'images.json'), IMAGE_RESOLVER_VERSION)
 
     total = len(cards)
     print(f"Starting update for {total} cards...")
 
+    todo = []
     for i, card in enumerate(cards):
+        stale = card['id'] in manifest and manifest.needs_update(card)
+
         # Update if imageUrl is empty or missing
-        if not card.get("imageUrl"):
-            print(f"[{i + 1}/{total}] Finding image for: {card['name']} ({card['id']})...")
-            new_url = find_image_url(card['url'])
+        if not card.get("imageUrl") or stale:
+            todo.append(card)
+        else:
+            if card['id'] not in manifest:
+                manifest.mark(card)
+            print(f"[{i + 1}/{total}] Skipping {card['name']} (already has imageUrl)")
+
+    if todo:
+        # Per-set URL templates are learned from every card whose image is known
+        resolver = ImageUrlResolver(find_image_url, workers=workers)
+        todo_ids = {card['id'] for card in todo}
+        resolver.learn_from(card for card in cards if card.get("imageUrl") and card['id'] not in todo_ids)
+
+        print(f"Finding images for {len(todo)} cards...")
+        with metrics.stage('resolve_images'):
+            found = resolver.resolve(todo)
+        metrics.inc('images_resolved', resolver.stats['probed'], method='probe')
+        metrics.inc('images_resolved', resolver.stats['scraped'], method='scrape')
+
+        for card in todo:
+            new_url = found.get(card['id'])
             if new_url:
                 card["imageUrl"] = new_url
-                print(f"  ✓ Found: {new_url}")
+                if on_found:
+                    on_found(card)
+                manifest.mark(card)
+                print(f"  ✓ Found: {card['name']} ({card['id']}): {new_url}")
             else:
-                print(f"  ✗ Not found")
+                print(f"  ✗ Not found: {card['name']} ({card['id']})")
 
-            # Be nice to the servers! Wait 1 second between requests
-            time.sleep(0.1)
-        else:
-            print(f"[{i + 1}/{total}] Skipping {card['name']} (already has imageUrl)")
+        print(f"🎯 {resolver.stats['probed']} found by HEAD probe, {resolver.stats['scraped']} by page scrape")
+
+    manifest.save()
+    return cards
 
-    # Save the updated file
-    with open('../../public/cards.json', 'w', encoding='utf-8') as f:
-        json.dump(cards, f, indent=2, ensure_ascii=False)
+
+def update_cards():
+    # Load the collection from the card store (cards.json is exported from it)
+    store = open_store()
+    fill_image_urls(store.all_cards(), lambda card: store.update_card(card['id'], imageUrl=card['imageUrl']))
+
+    # Refresh the cards.json view
+    store.export_json()
+    store.close()
 
     print("\nUpdate complete! cards.json has been saved.")
+    metrics.export('images')
 
 
 if __name__ == "__main__":
+    import sys
+
+    profiling_requested(sys.argv)
     update_cards()
\ No newline at end of file
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Firestore Sync Check
+Runs diff, push and pull from firestore_sync.py against firestore_fake's
+FakeFirestore and a temporary copy of the card store, so the sync can be
+checked without a Firebase project and without touching the real store or
+public/cards.json. Exits 1 if any check fails.
+
+Checked:
+    diff   fields a document does not hold are not differences; a dry run
+           reports the delta and writes nothing
+    push   writes exactly the differing fields, with a UTC lastUpdated, and
+           splits more than BATCH_SIZE documents into several batch commits
+    pull   writes the document's values into the store and cards.json copy
+    batch  the fake refuses batches over Firestore's 500 write limit
+
+Usage:
+    python check_firestore_sync.py
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from card_store import CardStore
+from database_converter import PUBLIC_CARDS_JSON
+from firestore_fake import MAX_BATCH_WRITES, FakeFirestore
+from firestore_sync import BATCH_SIZE, COLLECTION, FirestoreBackend, pull, push
+
+USERS = 2 * BATCH_SIZE + 1  # Three batch commits
+
+
+def first_variation(cards: List[Dict]) -> Tuple[str, str, Dict]:
+    """(card id, variation type, variation) of the first card that has a variation"""
+    for card in cards:
+        for variation_type, variation in (card.get('variations') or {}).items():
+            if isinstance(variation, dict):
+                return card['id'], variation_type, variation
+    raise ValueError('No card has a variation')
+
+
+def check_diff(cards: List[Dict], errors: List[str]) -> None:
+    card_id, variation_type, variation = first_variation(cards)
+    count = variation.get('count') or 0
+    client = FakeFirestore({
+        f'{COLLECTION}/empty': {},
+        f'{COLLECTION}/partial': {card_id: {variation_type: {}}},
+        f'{COLLECTION}/changed': {card_id: {variation_type: {'count': count + 2}}},
+    })
+    deltas = push(cards, FirestoreBackend(client), ['empty', 'partial', 'changed'], dry_run=True)
+
+    if deltas['empty'] or deltas['partial']:
+        errors.append(f"diff: fields missing from a document counted as differences: "
+                      f"{len(deltas['empty'])} / {len(deltas['partial'])}")
+    changed = [(change.card_id, change.variation_type, change.field, change.local, change.remote)
+               for change in deltas['changed']]
+    if changed != [(card_id, variation_type, 'count', count, count + 2)]:
+        errors.append(f'diff: expected one count difference on {card_id}.{variation_type}, got {changed}')
+    if client.writes or client.commits:
+        errors.append(f'diff: a dry run wrote {client.writes} documents in {client.commits} commits')
+
+
+def check_push(cards: List[Dict], errors: List[str]) -> None:
+    card_id, variation_type, variation = first_variation(cards)
+    ordered = variation.get('ordered') is True
+    uids = [f'user{i:04d}' for i in range(USERS)]
+    client = FakeFirestore({f'{COLLECTION}/{uid}': {card_id: {variation_type: {'ordered': not ordered}},
+                                                    'other': {'normal': {'count': 7}}} for uid in uids})
+    start = datetime.now().astimezone()
+    deltas = push(cards, FirestoreBackend(client), uids)
+
+    expected_commits = math.ceil(USERS / BATCH_SIZE)
+    if client.commits != expected_commits or client.writes != USERS:
+        errors.append(f'push: {USERS} documents took {client.commits} commits and {client.writes} writes, '
+                      f'expected {expected_commits} commits')
+    if sum(len(delta) for delta in deltas.values()) != USERS:
+        errors.append(f'push: expected one changed field per document, got {sum(map(len, deltas.values()))}')
+
+    document = client.documents[f'{COLLECTION}/{uids[-1]}']
+    if document[card_id][variation_type].get('ordered') != ordered:
+        errors.append(f'push: {card_id}.{variation_type}.ordered was not written')
+    if document.get('other') != {'normal': {'count': 7}}:
+        errors.append('push: the merge write replaced fields outside the delta')
+    written = datetime.fromisoformat(document.get('lastUpdated', '1970-01-01'))
+    if written.utcoffset() != timedelta(0) or abs(written - start) > timedelta(minutes=1):
+        errors.append(f"push: lastUpdated is not the current UTC time: {document.get('lastUpdated')}")
+
+    # Everything is in step now, so a second push writes nothing
+    commits = client.commits
+    if any(push(cards, FirestoreBackend(client), uids).values()) or client.commits != commits:
+        errors.append('push: a second push still found differences')
+
+
+def check_pull(store: CardStore, export_path: str, errors: List[str]) -> None:
+    card_id, variation_type, variation = first_variation(store.all_cards())
+    count = (variation.get('count') or 0) + 3
+    languages = ['English'] if variation.get('languages') == ['English', 'Japanese'] else ['English', 'Japanese']
+    document = {card_id: {variation_type: {'count': count, 'languages': languages}}}
+    client = FakeFirestore({f'{COLLECTION}/me': document})
+    backend = FirestoreBackend(client)
+
+    delta = pull(store, backend, 'me', export_path=export_path)
+    pulled = store.get_card(card_id)['variations'][variation_type]
+    if len(delta) != 2 or pulled.get('count') != count or pulled.get('languages') != languages:
+        errors.append(f'pull: expected count {count} and {languages} on {card_id}.{variation_type}, got {pulled}')
+
+    with open(export_path, 'r', encoding='utf-8') as f:
+        exported = {card['id']: card for card in json.load(f)}
+    if exported[card_id]['variations'][variation_type].get('count') != count:
+        errors.append('pull: the cards.json copy was not refreshed')
+    if pull(store, backend, 'me', export_path=export_path):
+        errors.append('pull: a second pull still found differences')
+    if client.writes:
+        errors.append(f'pull: wrote {client.writes} documents to Firestore')
+
+
+def check_batch_limit(cards: List[Dict], errors: List[str]) -> None:
+    card_id, variation_type, variation = first_variation(cards)
+    uids = [f'user{i:04d}' for i in range(MAX_BATCH_WRITES + 1)]
+    client = FakeFirestore({f'{COLLECTION}/{uid}': {card_id: {variation_type: {'count': -1}}} for uid in uids})
+    try:
+        push(cards, FirestoreBackend(client, batch_size=MAX_BATCH_WRITES + 1), uids)
+    except ValueError:
+        if client.writes:
+            errors.append(f'batch: a refused batch still wrote {client.writes} documents')
+        return
+    errors.append(f'batch: a batch of {MAX_BATCH_WRITES + 1} writes was accepted')
+
+
+def main() -> int:
+    with open(PUBLIC_CARDS_JSON, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+
+    errors: List[str] = []
+    check_diff(cards, errors)
+    check_push(cards, errors)
+    check_batch_limit(cards, errors)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CardStore(os.path.join(tmp, 'cards.sqlite'))
+        try:
+            store.import_json(PUBLIC_CARDS_JSON)
+            check_pull(store, os.path.join(tmp, 'cards.json'), errors)
+        finally:
+            store.close()
+
+    if errors:
+        print(f"\n❌ {len(errors)} Firestore sync checks failed:")
+        for error in errors:
+            print(f"  {error}")
+        return 1
+    print("\n✅ Firestore sync diff, push, pull and batch splitting behave as expected")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
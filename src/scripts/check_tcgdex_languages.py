@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+TCGdex Language Check
+Runs the language availability join end to end against the local HTTP stub
+instead of the live API: the English and Japanese Yuka Morii lists are
+synced into a temporary mirror through `api_base`/`mirror_path`, then joined
+with the shipped set aliases. Exits 1 if any variation resolves to the wrong
+availability.
+
+Usage:
+    python check_tcgdex_languages.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, List
+from urllib.parse import parse_qs, unquote, urlparse
+
+from bench_pipeline import StubHandler, stub_server
+from tcgdex_client import make_session
+from tcgdex_languages import ILLUSTRATOR, LanguageAvailability, load_set_aliases, sync_catalogs
+
+# {lang: {set id: {local id: variants}}} served by the stub. sv03.5 is SV2a in
+# Japanese; swsh1 is left out of the aliases, so its Japanese copy is unknown.
+CATALOGS = {
+    'en': {
+        'sv03.5': {'1': ('normal', 'reverse'), '2': ('holo', 'reverse')},
+        'swsh1': {'5': ('normal', 'reverse')},
+    },
+    'ja': {
+        'SV2a': {'001': ('normal',)},
+        'S1W': {'005': ('normal',)},
+    },
+}
+
+# (set id, local id) -> {variation type: {language code: expected}}
+EXPECTED = {
+    ('sv03.5', '1'): {'normal': {'EN': True, 'JP': True}, 'reverse_holo': {'EN': True, 'JP': False}},
+    ('sv03.5', '2'): {'holo': {'EN': True, 'JP': False}, 'normal': {'EN': False, 'JP': False}},
+    ('swsh1', '5'): {'normal': {'EN': True, 'JP': None}, 'reverse_holo': {'EN': True, 'JP': None}},
+}
+
+
+def catalog_cards(lang: str, set_id: str) -> List[Dict]:
+    return [{'id': f'{set_id}-{local_id}', 'localId': local_id, 'name': f'Card {local_id}', 'rarity': 'Rare',
+             'illustrator': ILLUSTRATOR, 'variants': {variant: True for variant in variants}}
+            for local_id, variants in CATALOGS[lang][set_id].items()]
+
+
+class LanguageStubHandler(StubHandler):
+    """StubHandler plus /v2/<lang>/illustrators/<name> and the GraphQL set query"""
+
+    def _send_json(self, data) -> None:
+        self._send(200, 'application/json; charset=utf-8', json.dumps(data).encode('utf-8'))
+
+    def do_GET(self):
+        parts = unquote(urlparse(self.path).path).strip('/').split('/')
+        if parts[0] == 'v2' and len(parts) == 4 and parts[2] == 'illustrators':
+            catalog = CATALOGS.get(parts[1])
+            if catalog is None or parts[3] != ILLUSTRATOR:
+                return self._send(404, 'text/plain', b'not found')
+            return self._send_json({'name': ILLUSTRATOR, 'cards': [
+                {'id': card['id'], 'localId': card['localId'], 'name': card['name']}
+                for set_id in catalog for card in catalog_cards(parts[1], set_id)]})
+        if parts[0] == 'v2' and len(parts) == 3 and parts[2] == 'sets':
+            return self._send_json([{'id': set_id, 'cardCount': {'total': len(cards)}}
+                                    for set_id, cards in CATALOGS.get(parts[1], {}).items()])
+        super().do_GET()
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        lang = parse_qs(url.query).get('lang', ['en'])[0]
+        set_id = body['variables']['id']
+        if url.path != '/v2/graphql' or set_id not in CATALOGS.get(lang, {}):
+            return self._send_json({'data': {'set': None}, 'errors': [{'message': f'No set {set_id}'}]})
+        cards = catalog_cards(lang, set_id)
+        self._send_json({'data': {'set': {'id': set_id, 'name': set_id, 'cards': cards,
+                                          'cardCount': {'total': len(cards), 'official': len(cards)}}}})
+
+
+def check(api_base: str, mirror_path: str) -> List[str]:
+    """Sync and join the stub catalogs; returns the mismatches"""
+    sync_catalogs(make_session(cached=False), api_base=api_base, path=mirror_path)
+
+    errors = []
+    if load_set_aliases().get('ja', {}).get('sv03.5') != 'SV2a':
+        errors.append('the shipped aliases do not map sv03.5 to SV2a')
+
+    availability = LanguageAvailability.from_mirror(mirror_path)
+    for (set_id, local_id), expected in EXPECTED.items():
+        known = availability.resolve({'set': {'id': set_id}, 'localId': local_id})
+        for variation_type, codes in expected.items():
+            for code, value in codes.items():
+                if known[variation_type].get(code) != value:
+                    errors.append(f'{set_id}-{local_id} {variation_type} {code}: '
+                                  f'expected {value}, got {known[variation_type].get(code)}')
+
+    # Without the aliases no Japanese set matches, which is what the aliases fix
+    unaliased = LanguageAvailability.from_mirror(mirror_path, set_aliases={})
+    if unaliased.resolve({'set': {'id': 'sv03.5'}, 'localId': '1'})['normal']['JP'] is not None:
+        errors.append('sv03.5-1 resolved in Japanese without the set aliases')
+    return errors
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp, stub_server(LanguageStubHandler) as base_url:
+        errors = check(f'{base_url}/v2', os.path.join(tmp, 'tcgdex_mirror.sqlite'))
+
+    if errors:
+        print(f"\n❌ {len(errors)} language availability checks failed:")
+        for error in errors:
+            print(f"  {error}")
+        return 1
+    print("\n✅ Language availability joins the English and Japanese catalogs through the set aliases")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Checklist Importer
+Imports ownership from the wide checklist spreadsheet
+(src/data/csv/Idan's Yuka Mprii Checklist - Yuka Morii Checklist-2.csv),
+which has one column block per era side by side: the first header row holds
+the era titles, the second the block columns (No., Derived_URL, Name, Owned,
+Image).
+
+The blocks are found from the header rows and unpivoted in one array gather
+into (era, no, url, name, owned) records. Records are matched to cards by
+URL (several sheet rows share a URL by mistake, so the name decides between
+candidates), then by the id the URL implies, then by era and name or sheet
+number and name; rows with no match are added as new cards. Each row's
+content hash and matched card id are kept in a manifest, so re-importing an
+edited sheet only touches the rows that changed.
+
+Cards get sheet_no from the sheet and their ownership: 'owned' is set to
+yes/no, an owned card with no counted variation gets a count of 1 on its
+first variation, and a card marked as not owned has its counts cleared.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from card_matcher import normalize_name
+from card_store import open_store
+from checkpoint_journal import write_json_atomic
+from fingerprints import MANIFEST_DIR
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKLIST_CSV = os.path.join(CURRENT_DIR, '..', 'data', 'csv',
+                             "Idan's Yuka Mprii Checklist - Yuka Morii Checklist-2.csv")
+IMPORT_MANIFEST = os.path.join(MANIFEST_DIR, 'checklist_import.json')
+
+# Block column labels -> record fields; Image (a formula in the sheet) is not imported
+BLOCK_COLUMNS = {'No.': 'no', 'Derived_URL': 'url', 'Name': 'name', 'Owned': 'owned'}
+RECORD_FIELDS = ['no', 'url', 'name', 'owned']
+SEREBII_CARD = re.compile(r'^https?://www\.serebii\.net/card/([^/]+)/([^/.]+)\.shtml$', re.IGNORECASE)
+
+
+def era_key(era: str) -> str:
+    """Era title compared loosely: "Sword ＆Shield" is "Sword & Shield" """
+    return re.sub(r'[^a-z0-9&]', '', unicodedata.normalize('NFKC', era or '').lower())
+
+
+def find_blocks(raw: pd.DataFrame) -> List[Tuple[str, Dict[str, int]]]:
+    """
+    Era blocks as (era title, {field: column}). A block starts at each "No."
+    in the second header row and runs to the next one; its era is the title
+    above its first column.
+    """
+    titles = [str(value).strip() for value in raw.iloc[0]]
+    labels = [str(value).strip() for value in raw.iloc[1]]
+    starts = [i for i, label in enumerate(labels) if label == 'No.']
+
+    blocks = []
+    for start, end in zip(starts, starts[1:] + [len(labels)]):
+        columns = {BLOCK_COLUMNS[labels[i]]: i for i in range(start, end) if labels[i] in BLOCK_COLUMNS}
+        missing = [field for field in RECORD_FIELDS if field not in columns]
+        if missing:
+            raise ValueError(f"Checklist block at column {start + 1} has no {', '.join(missing)} column")
+        blocks.append((titles[start], columns))
+    return blocks
+
+
+def read_checklist(path: str = CHECKLIST_CSV) -> pd.DataFrame:
+    """
+    The sheet as records: era, no, url, name, owned (True/False, None when
+    blank), key (stable row identity) and hash (row content hash).
+    """
+    raw = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, encoding='utf-8')
+    blocks = find_blocks(raw)
+
+    # Gather every block's columns at once: (rows, blocks, fields) -> one row per (block, sheet row)
+    body = raw.iloc[2:].to_numpy()
+    columns = np.array([[block[field] for field in RECORD_FIELDS] for _, block in blocks])
+    cells = body[:, columns].transpose(1, 0, 2).reshape(-1, len(RECORD_FIELDS))
+
+    records = pd.DataFrame(cells, columns=RECORD_FIELDS)
+    records.insert(0, 'era', np.repeat([era for era, _ in blocks], len(body)))
+    for field in RECORD_FIELDS:
+        records[field] = records[field].str.strip()
+
+    records = records[(records['no'] != '') | (records['url'] != '') | (records['name'] != '')].reset_index(drop=True)
+    # "No Link Found" and friends
+    records['url'] = records['url'].where(records['url'].str.match(r'https?://'), '')
+    records['owned'] = records['owned'].str.upper().map({'TRUE': True, 'FALSE': False}).astype(object)
+    records['owned'] = records['owned'].where(records['owned'].notna(), None)
+
+    identity = records['no'].where(records['no'] != '', records['url'].where(records['url'] != '', records['name']))
+    records['key'] = records['era'] + '|' + identity
+    records['hash'] = pd.util.hash_pandas_object(
+        records[['era', *RECORD_FIELDS]].astype(str), index=False).map('{:016x}'.format)
+    return records.drop_duplicates('key', keep='first').reset_index(drop=True)
+
+
+def implied_id(url: str) -> str:
+    """The id the collection gives Serebii cards: <set slug>-<number>"""
+    match = SEREBII_CARD.match(url or '')
+    return f'{match.group(1).lower()}-{match.group(2)}' if match else ''
+
+
+class CardIndex:
+    """Hash indexes over the collection for matching sheet rows, each card matched at most once"""
+
+    def __init__(self, cards: List[Dict], claimed: Set[str]):
+        self.cards = cards
+        self.claimed = set(claimed)
+        self.by_id = {card.get('id'): card for card in cards}
+        self.by_url = defaultdict(list)
+        self.by_era_name = defaultdict(list)
+        self.by_no_name = defaultdict(list)
+        for card in cards:
+            name_key = normalize_name(card.get('name', ''))
+            self.by_url[card.get('url') or ''].append(card)
+            self.by_era_name[(era_key(card.get('era')), name_key)].append(card)
+            self.by_no_name[(str(card.get('sheet_no') or ''), name_key)].append(card)
+
+    def _first_free(self, candidates: List[Dict], name_key: Optional[str] = None) -> Optional[Dict]:
+        for card in candidates:
+            if card['id'] in self.claimed:
+                continue
+            if name_key is None or normalize_name(card.get('name', '')) == name_key:
+                return card
+        return None
+
+    def match(self, record, card_id: Optional[str] = None) -> Optional[Dict]:
+        """Card for a sheet record: its previous match, then URL, implied id, era and name, sheet number and name"""
+        if card_id in self.by_id:
+            card = self.by_id[card_id]
+        else:
+            name_key = normalize_name(record.name)
+            by_url = self.by_url.get(record.url, []) if record.url else []
+            by_implied_id = [self.by_id[implied_id(record.url)]] if implied_id(record.url) in self.by_id else []
+            card = (self._first_free(by_url, name_key)
+                    or self._first_free(by_implied_id)
+                    or self._first_free(self.by_era_name.get((era_key(record.era), name_key), []))
+                    or self._first_free(self.by_no_name.get((record.no, name_key), []))
+                    or self._first_free(by_url))
+        if card:
+            self.claimed.add(card['id'])
+        return card
+
+    def add(self, card: Dict) -> None:
+        self.cards.append(card)
+        self.by_id[card['id']] = card
+        self.by_url[card.get('url') or ''].append(card)
+        self.claimed.add(card['id'])
+
+
+def new_card(record, era: str, card_ids: Dict) -> Dict:
+    """A collection card for a sheet row that matches nothing, for the enricher to fill in"""
+    match = SEREBII_CARD.match(record.url)
+    card_id = implied_id(record.url) or re.sub(r'[^a-z0-9]+', '-', f'{era} {record.name}'.lower()).strip('-')
+    base_id, n = card_id, 2
+    while card_id in card_ids:
+        card_id, n = f'{base_id}-{n}', n + 1
+    return {
+        'id': card_id,
+        'name': record.name,
+        'set': '',
+        'era': era,
+        'number': match.group(2) if match else '',
+        'sheet_no': record.no,
+        'owned': 'no',
+        'imageUrl': '',
+        'url': record.url,
+        'variations': {'normal': {'count': 0, 'ordered': False, 'languages': ['English']}},
+    }
+
+
+def apply_record(card: Dict, record) -> bool:
+    """Copy the sheet number and ownership onto the card; True if anything changed"""
+    before = repr(card)
+    if record.no:
+        card['sheet_no'] = record.no
+
+    if record.owned is not None:
+        card['owned'] = 'yes' if record.owned else 'no'
+        variations = [v for v in (card.get('variations') or {}).values() if isinstance(v, dict)]
+        if record.owned and variations and not any((v.get('count') or 0) > 0 for v in variations):
+            variations[0]['count'] = 1
+        elif not record.owned:
+            for variation in variations:
+                variation['count'] = 0
+    return repr(card) != before
+
+
+def import_checklist(cards: List[Dict], records: pd.DataFrame, manifest: Dict[str, Dict]
+                     ) -> Tuple[List[Dict], List[Dict], Dict[str, Dict]]:
+    """
+    Upsert the changed sheet records into `cards` (in place).
+
+    Returns:
+        (changed cards, added cards, the new manifest {row key: {hash, card_id}})
+    """
+    previous_hash = records['key'].map(lambda key: manifest.get(key, {}).get('hash'))
+    changed_records = records[records['hash'] != previous_hash]
+    unchanged_keys = set(records['key']) - set(changed_records['key'])
+
+    # Cards matched by unchanged rows stay theirs
+    index = CardIndex(cards, {manifest[key]['card_id'] for key in unchanged_keys if manifest[key].get('card_id')})
+    known_eras = {era_key(card.get('era')): card.get('era') for card in cards}
+
+    updated = {key: manifest[key] for key in unchanged_keys}
+    changed, added, added_ids = [], [], set()
+    for record in changed_records.itertuples(index=False):
+        card = index.match(record, manifest.get(record.key, {}).get('card_id'))
+        if card is None:
+            if not record.url:
+                print(f"  ⚠️ No link and no matching card for {record.era} #{record.no} {record.name}, skipped")
+                updated[record.key] = {'hash': record.hash, 'card_id': None}
+                continue
+            card = new_card(record, known_eras.get(era_key(record.era), record.era), index.by_id)
+            index.add(card)
+            added.append(card)
+            added_ids.add(card['id'])
+            print(f"  ➕ {card['era']} #{record.no} {record.name}: new card {card['id']}")
+
+        if apply_record(card, record) and card['id'] not in added_ids:
+            changed.append(card)
+            print(f"  ✓ {card['era']} #{record.no} {record.name} → {card['id']} (owned: {card.get('owned')})")
+        updated[record.key] = {'hash': record.hash, 'card_id': card['id']}
+
+    return changed, added, updated
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Import ownership from the checklist spreadsheet')
+    parser.add_argument('csv', nargs='?', default=CHECKLIST_CSV, help='Checklist CSV export')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would change without saving')
+    parser.add_argument('--full', action='store_true', help='Re-import every row, not only changed ones')
+    args = parser.parse_args(argv)
+
+    records = read_checklist(args.csv)
+    manifest = {}
+    if os.path.exists(IMPORT_MANIFEST) and not args.full:
+        with open(IMPORT_MANIFEST, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    print(f"📋 {len(records)} checklist rows in {records['era'].nunique()} era blocks")
+
+    store = open_store()
+    cards = store.all_cards()
+    changed, added, updated = import_checklist(cards, records, manifest)
+    rows_changed = sum(1 for key, entry in updated.items() if manifest.get(key) != entry)
+    print(f"\n✅ {len(changed)} cards updated, {len(added)} added"
+          f" ({rows_changed} rows changed since the last import)")
+
+    if args.dry_run:
+        print("Dry run, nothing saved")
+    else:
+        if changed or added:
+            store.upsert_cards(changed + added)
+            # Refresh the cards.json view
+            store.export_json()
+        write_json_atomic(IMPORT_MANIFEST, updated)
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
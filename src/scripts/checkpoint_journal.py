@@ -0,0 +1,69 @@
+"""
+Checkpoint Journal
+Crash-safe progress for long runs: every processed card is appended to a
+JSON Lines journal and fsynced, so a checkpoint costs O(1) per card. At the
+end of a run the results are compacted into the final JSON once, written to
+a temp file and atomically renamed into place.
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+
+
+def write_json_atomic(path: str, data: Any, indent: int = 2) -> None:
+    """Write JSON to a temp file next to `path`, fsync it and rename it over `path`"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CardJournal:
+    """Append-only JSON Lines journal of per-card results, keyed by card id"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def replay(self) -> Dict[str, Dict]:
+        """
+        Read back the cards recorded by a previous (interrupted) run.
+
+        A torn last line from a crash mid-write is ignored.
+        """
+        cards = {}
+        if not os.path.exists(self.path):
+            return cards
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                cards[entry['id']] = entry['card']
+        return cards
+
+    def append(self, card: Dict) -> None:
+        """Durably record one processed card"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+        self._file.write(json.dumps({'id': card.get('id'), 'card': card}, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def compact(self, cards: List[Dict], output_file: str) -> None:
+        """Write the final JSON atomically, then drop the journal"""
+        self.close()
+        write_json_atomic(output_file, cards)
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -2,13 +2,33 @@
 """
 Pokemon Card JSON/CSV Converter
 Converts JSON card data to CSV for editing variant languages, and back to JSON.
+Also reads and writes binary Parquet / Arrow IPC snapshots of the same data,
+which the intermediate pipeline steps exchange instead of indented JSON.
 """
 
 import json
 import csv
+import os
+from itertools import groupby
 from typing import List, Dict, Any
 
+from card_table import csv_frame, load_variation_table
+from instrumentation import metrics, profiling_requested
 
+PUBLIC_CARDS_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'public', 'cards.json')
+REVIEW_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'csv', 'cards_variations_review.csv')
+
+# Typed snapshot columns - values of any other type go to the *_extra JSON column
+CARD_COLUMNS = {
+    'id': str, 'name': str, 'set': str, 'era': str, 'number': str, 'sheet_no': str, 'owned': str,
+    'imageUrl': str, 'url': str, 'enriched': bool, 'enriched_method': str,
+}
+VARIATION_COLUMNS = {
+    'count': int, 'ordered': bool, 'languages': list, 'default_language': str, 'available_languages': list,
+}
+
+
+@metrics.stage('json_to_csv')
 def json_to_csv(json_file: str, csv_file: str) -> None:
     """
     Convert JSON pokemon card data to CSV format.
@@ -19,73 +39,71 @@ def json_to_csv(json_file: str, csv_file: str) -> None:
         csv_file: Path to output CSV file
     """
     # Load JSON data
-    with open(json_file, 'r', encoding='utf-8') as f:
+    with metrics.stage('json_load'), open(json_file, 'r', encoding='utf-8') as f:
         cards = json.load(f)
 
-    # Prepare CSV rows
-    rows = []
-
-    for card in cards:
-        card_id = card.get('id', '')
-        name = card.get('name', '')
-        set_name = card.get('set', '')
-        era = card.get('era', '')
-        number = card.get('number', '')
-        sheet_no = card.get('sheet_no', '')
-        owned = card.get('owned', '')
-        imageUrl = card.get('imageUrl', '')
-        url = card.get('url', '')
-        enriched = card.get('enriched', '')
-        enriched_method = card.get('enriched_method', '')
-
-        variations = card.get('variations', {})
-
-        # Create a row for each variation
-        for variation_type, variation_data in variations.items():
-            count = variation_data.get('count', 0)
-            ordered = variation_data.get('ordered', False)
-            languages = variation_data.get('languages', [])
-            default_language = variation_data.get('default_language', '')
-            available_languages = variation_data.get('available_languages', [])
-
-            # Convert lists to pipe-separated strings for CSV
-            languages_str = '|'.join(languages) if languages else ''
-            available_languages_str = '|'.join(available_languages) if available_languages else ''
-
-            row = {
-                'card_id': card_id,
-                'name': name,
-                'set': set_name,
-                'era': era,
-                'number': number,
-                'sheet_no': sheet_no,
-                'owned': owned,
-                'imageUrl': imageUrl,
-                'url': url,
-                'enriched': enriched,
-                'enriched_method': enriched_method,
-                'variation_type': variation_type,
-                'count': count,
-                'ordered': ordered,
-                'languages': languages_str,
-                'default_language': default_language,
-                'available_languages': available_languages_str
-            }
-            rows.append(row)
+    cards_to_csv(cards, csv_file)
+
+
+def cards_to_csv(cards: List[Dict], csv_file: str) -> None:
+    """Write already loaded cards to CSV, one row per variation"""
+    # Flatten once into the variation table (lists become pipe-separated strings)
+    with metrics.stage('variation_table'):
+        rows = csv_frame(load_variation_table(cards))
 
     # Write to CSV
-    if rows:
-        fieldnames = list(rows[0].keys())
-        with open(csv_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+    if len(rows):
+        with metrics.stage('csv_write'):
+            rows.to_csv(csv_file, index=False, encoding='utf-8', lineterminator='\r\n')
 
         print(f"✓ Converted {len(cards)} cards ({len(rows)} variations) to CSV: {csv_file}")
     else:
         print("✗ No data to convert")
 
 
+def _card_from_row(row: Dict[str, str]) -> Dict:
+    """Card fields of a CSV row, with an empty variations dict"""
+    return {
+        'id': row['card_id'],
+        'name': row['name'],
+        'set': row['set'],
+        'era': row['era'],
+        'number': row['number'],
+        'sheet_no': row['sheet_no'],
+        'owned': row['owned'],
+        'imageUrl': row['imageUrl'],
+        'url': row['url'],
+        'variations': {},
+        'enriched': row['enriched'] == 'True' or row['enriched'] == 'true',
+        'enriched_method': row['enriched_method']
+    }
+
+
+def _variation_from_row(row: Dict[str, str]) -> Dict:
+    """Variation fields of a CSV row"""
+    # Convert pipe-separated strings back to lists
+    languages = [lang.strip() for lang in row['languages'].split('|') if lang.strip()]
+    available_languages = [lang.strip() for lang in row['available_languages'].split('|') if lang.strip()]
+
+    # Convert count to int
+    try:
+        count = int(row['count'])
+    except (ValueError, TypeError):
+        count = 0
+
+    # Convert ordered to boolean
+    ordered = row['ordered'].lower() in ('true', '1', 'yes')
+
+    return {
+        'count': count,
+        'ordered': ordered,
+        'languages': languages,
+        'default_language': row['default_language'],
+        'available_languages': available_languages
+    }
+
+
+@metrics.stage('csv_to_json')
 def csv_to_json(csv_file: str, json_file: str) -> None:
     """
     Convert CSV pokemon card data back to JSON format.
@@ -96,7 +114,7 @@ def csv_to_json(csv_file: str, json_file: str) -> None:
         json_file: Path to output JSON file
     """
     # Read CSV data
-    with open(csv_file, 'r', encoding='utf-8') as f:
+    with metrics.stage('csv_read'), open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         rows = list(reader)
 
@@ -108,80 +126,366 @@ def csv_to_json(csv_file: str, json_file: str) -> None:
 
         # Initialize card if not exists
         if card_id not in cards_dict:
-            cards_dict[card_id] = {
-                'id': card_id,
-                'name': row['name'],
-                'set': row['set'],
-                'era': row['era'],
-                'number': row['number'],
-                'sheet_no': row['sheet_no'],
-                'owned': row['owned'],
-                'imageUrl': row['imageUrl'],
-                'url': row['url'],
-                'variations': {},
-                'enriched': row['enriched'] == 'True' or row['enriched'] == 'true',
-                'enriched_method': row['enriched_method']
-            }
+            cards_dict[card_id] = _card_from_row(row)
 
         # Add variation
-        variation_type = row['variation_type']
-
-        # Convert pipe-separated strings back to lists
-        languages = [lang.strip() for lang in row['languages'].split('|') if lang.strip()]
-        available_languages = [lang.strip() for lang in row['available_languages'].split('|') if lang.strip()]
-
-        # Convert count to int
-        try:
-            count = int(row['count'])
-        except (ValueError, TypeError):
-            count = 0
-
-        # Convert ordered to boolean
-        ordered = row['ordered'].lower() in ('true', '1', 'yes')
-
-        cards_dict[card_id]['variations'][variation_type] = {
-            'count': count,
-            'ordered': ordered,
-            'languages': languages,
-            'default_language': row['default_language'],
-            'available_languages': available_languages
-        }
+        cards_dict[card_id]['variations'][row['variation_type']] = _variation_from_row(row)
 
     # Convert to list
     cards = list(cards_dict.values())
 
     # Write to JSON
-    with open(json_file, 'w', encoding='utf-8') as f:
+    with metrics.stage('json_dump'), open(json_file, 'w', encoding='utf-8') as f:
         json.dump(cards, f, indent=2, ensure_ascii=False)
 
     print(f"✓ Converted CSV to {len(cards)} cards in JSON: {json_file}")
 
 
+CSV_FIELDNAMES = ['card_id', 'name', 'set', 'era', 'number', 'sheet_no', 'owned', 'imageUrl', 'url',
+                  'enriched', 'enriched_method', 'variation_type', 'count', 'ordered', 'languages',
+                  'default_language', 'available_languages']
+
+
+@metrics.stage('json_to_csv_streaming')
+def json_to_csv_streaming(json_file: str, csv_file: str) -> None:
+    """
+    Streaming version of json_to_csv: cards are parsed one at a time with
+    ijson and their variation rows written immediately, so memory stays
+    flat regardless of collection size.
+    """
+    import ijson
+
+    card_count = 0
+    row_count = 0
+
+    with open(json_file, 'rb') as src, open(csv_file, 'w', encoding='utf-8', newline='') as dst:
+        writer = csv.DictWriter(dst, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+
+        for card in ijson.items(src, 'item', use_float=True):
+            card_count += 1
+            for variation_type, variation_data in card.get('variations', {}).items():
+                row_count += 1
+                writer.writerow({
+                    'card_id': card.get('id', ''),
+                    'name': card.get('name', ''),
+                    'set': card.get('set', ''),
+                    'era': card.get('era', ''),
+                    'number': card.get('number', ''),
+                    'sheet_no': card.get('sheet_no', ''),
+                    'owned': card.get('owned', ''),
+                    'imageUrl': card.get('imageUrl', ''),
+                    'url': card.get('url', ''),
+                    'enriched': card.get('enriched', ''),
+                    'enriched_method': card.get('enriched_method', ''),
+                    'variation_type': variation_type,
+                    'count': variation_data.get('count', 0),
+                    'ordered': variation_data.get('ordered', False),
+                    'languages': '|'.join(variation_data.get('languages', [])),
+                    'default_language': variation_data.get('default_language', ''),
+                    'available_languages': '|'.join(variation_data.get('available_languages', []))
+                })
+
+    if not row_count:
+        os.remove(csv_file)
+        print("✗ No data to convert")
+        return
+
+    print(f"✓ Converted {card_count} cards ({row_count} variations) to CSV: {csv_file}")
+
+
+@metrics.stage('csv_to_json_streaming')
+def csv_to_json_streaming(csv_file: str, json_file: str) -> None:
+    """
+    Streaming version of csv_to_json for CSVs whose rows are grouped by
+    card_id (as json_to_csv writes them): each card is written out as soon
+    as its group ends, so only one card is held in memory at a time.
+    The output is identical to csv_to_json for grouped input; a CSV that is
+    not grouped raises ValueError and leaves json_file untouched.
+    """
+    card_count = 0
+    emitted = set()
+    tmp_file = json_file + '.tmp'
+
+    try:
+        with open(csv_file, 'r', encoding='utf-8') as src, open(tmp_file, 'w', encoding='utf-8') as dst:
+            reader = csv.DictReader(src)
+
+            for card_id, rows in groupby(reader, key=lambda row: row['card_id']):
+                # A re-sorted CSV would otherwise produce the card twice
+                if card_id in emitted:
+                    raise ValueError(f"{csv_file} is not grouped by card_id ({card_id} appears in two places); "
+                                     f"use csv_to_json for unsorted CSVs")
+                emitted.add(card_id)
+
+                card = None
+                for row in rows:
+                    card = card or _card_from_row(row)
+                    card['variations'][row['variation_type']] = _variation_from_row(row)
+
+                # Same bytes json.dump(cards, indent=2) would produce for this element
+                body = json.dumps(card, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+                dst.write(('[\n  ' if card_count == 0 else ',\n  ') + body)
+                card_count += 1
+
+            dst.write('\n]' if card_count else '[]')
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, json_file)
+
+    print(f"✓ Converted CSV to {card_count} cards in JSON: {json_file}")
+
+
+def _split_fields(record: Dict, columns: Dict[str, type]):
+    """Split a dict into typed column values and a JSON string of everything else"""
+    values = {}
+    extra = {}
+    for key, value in record.items():
+        expected = columns.get(key)
+        if expected is list and type(value) is list and all(type(v) is str for v in value):
+            values[key] = value
+        elif expected is not None and expected is not list and type(value) is expected:
+            values[key] = value
+        else:
+            extra[key] = value
+    return values, json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+def cards_to_snapshot_table(cards: List[Dict]):
+    """
+    Build a lossless Arrow table with one row per variation.
+
+    Cards without variations get a single row with a null variation_type.
+    Key order and any non-standard fields are kept, so
+    snapshot_table_to_cards(cards_to_snapshot_table(cards)) == cards.
+    """
+    import pyarrow as pa
+
+    columns = {name: [] for name in ['card_pos', 'card_keys', 'card_extra', 'variation_type',
+                                     'variation_keys', 'variation_extra']}
+    columns.update({name: [] for name in CARD_COLUMNS})
+    columns.update({name: [] for name in VARIATION_COLUMNS})
+
+    for pos, card in enumerate(cards):
+        card_fields = {k: v for k, v in card.items() if k != 'variations'}
+        card_values, card_extra = _split_fields(card_fields, CARD_COLUMNS)
+        variations = card.get('variations')
+        if 'variations' in card and not isinstance(variations, dict):
+            extra = json.loads(card_extra) if card_extra else {}
+            extra['variations'] = variations
+            card_extra = json.dumps(extra, ensure_ascii=False)
+            variations = None
+
+        rows = list(variations.items()) if variations else [(None, None)]
+        for variation_type, variation_data in rows:
+            columns['card_pos'].append(pos)
+            columns['card_keys'].append(list(card.keys()))
+            columns['card_extra'].append(card_extra)
+            for name in CARD_COLUMNS:
+                columns[name].append(card_values.get(name))
+
+            columns['variation_type'].append(variation_type)
+            if isinstance(variation_data, dict):
+                variation_values, variation_extra = _split_fields(variation_data, VARIATION_COLUMNS)
+                columns['variation_keys'].append(list(variation_data.keys()))
+            else:
+                variation_values = {}
+                variation_extra = None if variation_data is None else json.dumps(variation_data, ensure_ascii=False)
+                columns['variation_keys'].append(None)
+            columns['variation_extra'].append(variation_extra)
+            for name in VARIATION_COLUMNS:
+                columns[name].append(variation_values.get(name))
+
+    types = {
+        'card_pos': pa.int32(), 'card_keys': pa.list_(pa.string()), 'variation_keys': pa.list_(pa.string()),
+        'count': pa.int64(), 'ordered': pa.bool_(), 'enriched': pa.bool_(),
+        'languages': pa.list_(pa.string()), 'available_languages': pa.list_(pa.string()),
+    }
+    arrays = {}
+    for name, values in columns.items():
+        array = pa.array(values, type=types.get(name, pa.string()))
+        # Card-level strings repeat once per variation - store them dictionary-encoded
+        if name in ('set', 'era', 'owned', 'enriched_method', 'variation_type', 'default_language'):
+            array = array.dictionary_encode()
+        arrays[name] = array
+    return pa.table(arrays)
+
+
+def _to_python(column) -> List[Any]:
+    """Decode an Arrow column to Python values, avoiding per-value to_pylist() for
+    dictionary and list columns"""
+    import pyarrow as pa
+
+    array = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+    if isinstance(array, pa.ChunkedArray):
+        array = pa.concat_arrays(array.chunks) if array.num_chunks else pa.array([], type=array.type)
+
+    if pa.types.is_dictionary(array.type):
+        lookup = array.dictionary.to_pylist() + [None]
+        return [lookup[i] for i in array.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+
+    if pa.types.is_list(array.type):
+        flat = array.values.to_pylist()
+        offsets = array.offsets.to_numpy().tolist()
+        valid = array.is_valid().to_pylist() if array.null_count else None
+        return [flat[offsets[i]:offsets[i + 1]] if valid is None or valid[i] else None
+                for i in range(len(array))]
+
+    return array.to_pylist()
+
+
+def snapshot_table_to_cards(table) -> List[Dict]:
+    """Rebuild the cards list from a snapshot table"""
+    import numpy as np
+
+    card_pos = table.column('card_pos').to_numpy()
+    first_rows = np.flatnonzero(np.diff(card_pos, prepend=-1))
+
+    # Card-level columns are only decoded at each card's first row
+    card_table = table.select(['card_keys', 'card_extra'] + list(CARD_COLUMNS)).take(first_rows)
+    card_columns = {name: _to_python(card_table.column(name)) for name in card_table.column_names}
+    columns = {name: _to_python(table.column(name))
+               for name in ['variation_type', 'variation_keys', 'variation_extra'] + list(VARIATION_COLUMNS)}
+
+    cards = []
+    for c, start in enumerate(first_rows.tolist()):
+        extra = json.loads(card_columns['card_extra'][c]) if card_columns['card_extra'][c] else {}
+        card = {}
+        for key in card_columns['card_keys'][c]:
+            if key in extra:
+                card[key] = extra[key]
+            elif key == 'variations':
+                card[key] = {}
+            else:
+                card[key] = card_columns[key][c]
+        cards.append(card)
+
+        end = first_rows[c + 1] if c + 1 < len(first_rows) else len(card_pos)
+        for i in range(start, end):
+            variation_type = columns['variation_type'][i]
+            if variation_type is None:
+                continue
+
+            if columns['variation_keys'][i] is None:
+                variation = json.loads(columns['variation_extra'][i])
+            else:
+                extra = json.loads(columns['variation_extra'][i]) if columns['variation_extra'][i] else {}
+                variation = {key: extra[key] if key in extra else columns[key][i]
+                             for key in columns['variation_keys'][i]}
+            card['variations'][variation_type] = variation
+
+    return cards
+
+
+def save_snapshot(cards: List[Dict], path: str) -> None:
+    """Write cards to a .parquet or .arrow (Arrow IPC) snapshot"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = cards_to_snapshot_table(cards)
+    tmp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema,
+                                 options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+                writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_table(path: str):
+    """Read the raw Arrow table of a .parquet or .arrow snapshot using memory-mapped IO"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def load_snapshot(path: str) -> List[Dict]:
+    """Read cards back from a .parquet or .arrow snapshot"""
+    return snapshot_table_to_cards(read_snapshot_table(path))
+
+
+def load_cards(path: str) -> List[Dict]:
+    """Load cards from a JSON file, a binary snapshot or a card store, by extension"""
+    if path.endswith(('.parquet', '.arrow')):
+        return load_snapshot(path)
+    if path.endswith('.sqlite'):
+        from card_store import CardStore
+        with CardStore(path) as store:
+            return store.all_cards()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cards(cards: List[Dict], path: str) -> None:
+    """Save cards to a binary snapshot, a card store, or to indented JSON for .json paths"""
+    if path.endswith(('.parquet', '.arrow')):
+        save_snapshot(cards, path)
+    elif path.endswith('.sqlite'):
+        from card_store import CardStore
+        with CardStore(path) as store:
+            store.replace_all(cards)
+    else:
+        with metrics.stage('json_dump'), open(path, 'w', encoding='utf-8') as f:
+            json.dump(cards, f, indent=2, ensure_ascii=False)
+
+
 def main():
     """Main function to demonstrate usage"""
     import sys
 
-    if len(sys.argv) < 2:
+    profiling_requested(sys.argv)
+    argv = [arg for arg in sys.argv if arg != '--profile']
+
+    if len(argv) < 2:
         print("Pokemon Card JSON/CSV Converter")
         print("\nUsage:")
-        print("  Convert JSON to CSV - j2c")
-        print("\n  Convert CSV back to JSON: - c2j")
+        print("  Convert JSON to CSV - j2c [--stream]")
+        print("\n  Convert CSV back to JSON: - c2j [--stream]")
+        print("\n  Convert between JSON, a .parquet/.arrow snapshot and a .sqlite card store: - snapshot <input> <output>")
+        print("\n  Publish a snapshot to public/cards.json: - publish <snapshot>")
+        print("\n  Add --profile to any command for per-stage profiles")
         return
 
-    command = sys.argv[1].lower()
+    command = argv[1].lower()
 
-    csv_file = '../data/csv/cards_variations_review.csv'
+    csv_file = REVIEW_CSV
+
+    # --stream keeps memory flat for very large collections
+    stream = '--stream' in argv
 
     if command == 'j2c':
         json_file = '../data/json/cards.json'
-        json_to_csv(json_file, csv_file)
+        (json_to_csv_streaming if stream else json_to_csv)(json_file, csv_file)
 
     elif command == 'c2j':
         json_file = '../data/cards_updated_from_csv.json'
-        csv_to_json(csv_file, json_file)
+        (csv_to_json_streaming if stream else csv_to_json)(csv_file, json_file)
+
+    elif command == 'snapshot' and len(argv) == 4:
+        cards = load_cards(argv[2])
+        save_cards(cards, argv[3])
+        print(f"✓ Converted {len(cards)} cards: {argv[2]} → {argv[3]}")
+
+    elif command == 'publish' and len(argv) == 3:
+        from publish_artifacts import build_artifacts
+
+        cards = load_snapshot(argv[2])
+        save_cards(cards, PUBLIC_CARDS_JSON)
+        manifest = build_artifacts(cards)
+        print(f"✓ Published {len(cards)} cards to {PUBLIC_CARDS_JSON} (artifacts version {manifest['version']})")
 
     else:
         print("✗ Invalid command or arguments")
+        return
+
+    metrics.export('converter')
 
 
 if __name__ == '__main__':
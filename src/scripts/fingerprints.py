@@ -0,0 +1,72 @@
+"""
+Card Fingerprints
+Per-card content fingerprints so pipeline stages only reprocess cards whose
+inputs changed (or whose last result is older than max_age), and so runs can
+resume by card id instead of by position.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'manifests')
+
+FINGERPRINT_FIELDS = ('id', 'url', 'set', 'number')
+
+
+def card_fingerprint(card: Dict, version: str) -> str:
+    """Hash the fields a stage depends on together with the stage version"""
+    payload = [card.get(field, '') for field in FINGERPRINT_FIELDS] + [version]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class FingerprintManifest:
+    """
+    JSON manifest of {card_id: {fingerprint, updated_at}} for one stage.
+
+    Args:
+        path: Manifest file location
+        version: Stage version, bump it to invalidate every card
+        max_age: Seconds before a card is refreshed anyway (None = never)
+    """
+
+    def __init__(self, path: str, version: str, max_age: Optional[float] = None):
+        self.path = path
+        self.version = version
+        self.max_age = max_age
+        self.entries: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def __contains__(self, card_id: str) -> bool:
+        return card_id in self.entries
+
+    def needs_update(self, card: Dict) -> bool:
+        """True if the card is new, its inputs changed, or its entry expired"""
+        entry = self.entries.get(card.get('id'))
+        if not entry:
+            return True
+        if entry['fingerprint'] != card_fingerprint(card, self.version):
+            return True
+        if self.max_age is not None and time.time() - entry['updated_at'] > self.max_age:
+            return True
+        return False
+
+    def mark(self, card: Dict) -> None:
+        """Record that the card has been processed with its current inputs"""
+        self.entries[card.get('id')] = {
+            'fingerprint': card_fingerprint(card, self.version),
+            'updated_at': time.time(),
+        }
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,109 @@
+"""
+Firestore Fake
+In-process stand-in for the part of the google-cloud-firestore client the
+sync script uses: collection().document() references with get/set/update,
+and write batches. Documents live in a dict, and reads, writes and commits
+are counted, so sync runs can be checked without a Firebase project.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from firestore_sync import merge_document
+
+MAX_BATCH_WRITES = 500
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: 'DocumentReference', data: Optional[Dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict]:
+        return copy.deepcopy(self._data)
+
+
+class DocumentReference:
+    def __init__(self, client: 'FakeFirestore', collection: str, document_id: str):
+        self._client = client
+        self.id = document_id
+        self.path = f'{collection}/{document_id}'
+
+    def get(self) -> DocumentSnapshot:
+        self._client.reads += 1
+        return DocumentSnapshot(self, self._client.documents.get(self.path))
+
+    def set(self, data: Dict, merge: bool = False) -> None:
+        self._client._commit([('set', self, data, merge)])
+
+    def update(self, field_updates: Dict[str, Any]) -> None:
+        self._client._commit([('update', self, field_updates, False)])
+
+
+class CollectionReference:
+    def __init__(self, client: 'FakeFirestore', name: str):
+        self._client = client
+        self.id = name
+
+    def document(self, document_id: str) -> DocumentReference:
+        return DocumentReference(self._client, self.id, document_id)
+
+
+class WriteBatch:
+    """Writes applied together on commit(), at most MAX_BATCH_WRITES of them, like Firestore's"""
+
+    def __init__(self, client: 'FakeFirestore'):
+        self._client = client
+        self._writes: List[Tuple[str, DocumentReference, Dict, bool]] = []
+
+    def set(self, reference: DocumentReference, data: Dict, merge: bool = False) -> None:
+        self._writes.append(('set', reference, data, merge))
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any]) -> None:
+        self._writes.append(('update', reference, field_updates, False))
+
+    def commit(self) -> None:
+        if len(self._writes) > MAX_BATCH_WRITES:
+            raise ValueError(f'A batch can hold at most {MAX_BATCH_WRITES} writes, got {len(self._writes)}')
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """The document API of google.cloud.firestore.Client, backed by a dict of {path: data}"""
+
+    def __init__(self, documents: Optional[Dict[str, Dict]] = None):
+        self.documents: Dict[str, Dict] = copy.deepcopy(documents or {})
+        self.reads = 0
+        self.writes = 0
+        self.commits = 0
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self, name)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def _commit(self, writes: List[Tuple[str, DocumentReference, Dict, bool]]) -> None:
+        # Validate everything first, so a failing batch changes nothing
+        for kind, reference, _, _ in writes:
+            if kind == 'update' and reference.path not in self.documents:
+                raise KeyError(f'No document to update: {reference.path}')
+
+        for kind, reference, data, merge in writes:
+            if kind == 'set' and not merge:
+                self.documents[reference.path] = copy.deepcopy(data)
+            elif kind == 'set':
+                merge_document(self.documents.setdefault(reference.path, {}), data)
+            else:
+                # update() takes dotted field paths
+                for field_path, value in data.items():
+                    target = self.documents[reference.path]
+                    *parents, leaf = field_path.split('.')
+                    for part in parents:
+                        target = target.setdefault(part, {})
+                    target[leaf] = copy.deepcopy(value)
+        self.writes += len(writes)
+        self.commits += 1
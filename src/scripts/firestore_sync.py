@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Firestore Sync
+Keeps the ownership fields of cards.json (variations[*].count, ordered and
+languages) and a user's Firestore document in step. The app stores that
+document at collections/<uid> as {card id: {variation type: {...}}} and
+overlays it on cards.json, while the pipeline rewrites the same fields
+locally, so the two drift apart.
+
+The sync computes a delta keyed by (card id, variation type, field) between
+the two sides. A field the document does not hold shows the cards.json value
+in the app, so it is not a difference and untouched cards are never written.
+It then pushes or pulls only the changed fields:
+    push   writes the local values into the user documents with merge
+           writes, up to BATCH_SIZE documents per batch commit
+    pull   writes the document's values into the card store, one variation
+           row per change
+Variations the local card does not have are ignored, as the app ignores them.
+
+Backends are pluggable: FirestoreBackend works with a
+google.cloud.firestore.Client or with firestore_fake.FakeFirestore, and
+JsonFileBackend works on exported user documents.
+
+Usage:
+    python firestore_sync.py diff <uid>
+    python firestore_sync.py push <uid> [<uid> ...] [--dry-run]
+    python firestore_sync.py pull <uid> --export user.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from card_store import open_store
+from checkpoint_journal import write_json_atomic
+from database_converter import PUBLIC_CARDS_JSON
+
+try:
+    from google.cloud import firestore
+except ImportError:
+    firestore = None
+
+COLLECTION = 'collections'
+BATCH_SIZE = 500
+SYNC_FIELDS = {'count': 0, 'ordered': False, 'languages': []}
+
+
+@dataclass(frozen=True)
+class FieldDelta:
+    """One ownership field whose local and remote values differ"""
+    card_id: str
+    variation_type: str
+    field: str
+    local: Any
+    remote: Any
+
+    def __str__(self) -> str:
+        return f'{self.card_id}.{self.variation_type}.{self.field}: local {self.local!r}, remote {self.remote!r}'
+
+
+def _local_value(variation: Any, field: str) -> Any:
+    if not isinstance(variation, dict) or variation.get(field) is None:
+        return SYNC_FIELDS[field]
+    return variation[field]
+
+
+def compute_delta(cards: List[Dict], document: Optional[Dict]) -> List[FieldDelta]:
+    """The ownership fields that differ between the local cards and a user document"""
+    document = document or {}
+    delta = []
+    for card in cards:
+        variations = card.get('variations')
+        if not isinstance(variations, dict):
+            continue
+        remote_card = document.get(card.get('id'))
+        remote_card = remote_card if isinstance(remote_card, dict) else {}
+        for variation_type, variation in variations.items():
+            remote = remote_card.get(variation_type)
+            if not isinstance(remote, dict):
+                continue
+            # Like the app, only the fields the document holds override the card
+            for field in SYNC_FIELDS:
+                if field not in remote:
+                    continue
+                local_value = _local_value(variation, field)
+                if local_value != remote[field]:
+                    delta.append(FieldDelta(card['id'], variation_type, field, local_value, remote[field]))
+    return delta
+
+
+def delta_to_document(delta: Iterable[FieldDelta]) -> Dict:
+    """The local values of a delta as a nested merge write: {card id: {variation type: {field: value}}}"""
+    data = {}
+    for change in delta:
+        data.setdefault(change.card_id, {}).setdefault(change.variation_type, {})[change.field] = change.local
+    return data
+
+
+class FirestoreBackend:
+    """User documents in Firestore, through a google.cloud.firestore.Client or a FakeFirestore"""
+
+    def __init__(self, client, collection: str = COLLECTION, batch_size: int = BATCH_SIZE):
+        self.client = client
+        self.collection = collection
+        self.batch_size = batch_size
+
+    def get(self, uid: str) -> Optional[Dict]:
+        snapshot = self.client.collection(self.collection).document(uid).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    def write(self, updates: Dict[str, Dict]) -> int:
+        """Merge-write {uid: nested fields} in batches; returns the number of commits"""
+        uids = list(updates)
+        commits = 0
+        for start in range(0, len(uids), self.batch_size):
+            batch = self.client.batch()
+            for uid in uids[start:start + self.batch_size]:
+                batch.set(self.client.collection(self.collection).document(uid), updates[uid], merge=True)
+            batch.commit()
+            commits += 1
+        return commits
+
+
+class JsonFileBackend:
+    """Exported user documents, one JSON file per uid"""
+
+    def __init__(self, paths: Dict[str, str]):
+        self.paths = paths
+
+    def get(self, uid: str) -> Optional[Dict]:
+        path = self.paths[uid]
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, updates: Dict[str, Dict]) -> int:
+        for uid, data in updates.items():
+            document = self.get(uid) or {}
+            merge_document(document, data)
+            write_json_atomic(self.paths[uid], document)
+        return len(updates)
+
+
+def merge_document(target: Dict, data: Dict) -> None:
+    """Deep-merge like Firestore's set(..., merge=True): maps are merged, any other value replaces"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_document(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def push(cards: List[Dict], backend, uids: Iterable[str], dry_run: bool = False) -> Dict[str, List[FieldDelta]]:
+    """Write the local ownership fields that differ into each user's document; returns the deltas"""
+    deltas, updates = {}, {}
+    for uid in uids:
+        deltas[uid] = compute_delta(cards, backend.get(uid))
+        if deltas[uid]:
+            updates[uid] = {**delta_to_document(deltas[uid]), 'lastUpdated': datetime.now(timezone.utc).isoformat()}
+
+    if updates and not dry_run:
+        commits = backend.write(updates)
+        print(f"☁️  Pushed {sum(len(delta) for delta in deltas.values())} fields to {len(updates)} documents"
+              f" in {commits} batch commits")
+    return deltas
+
+
+def pull(store, backend, uid: str, dry_run: bool = False, export_path: str = PUBLIC_CARDS_JSON) -> List[FieldDelta]:
+    """Write the document's ownership fields that differ into the card store; returns the delta"""
+    delta = compute_delta(store.all_cards(), backend.get(uid))
+    if delta and not dry_run:
+        by_variation: Dict[tuple, Dict] = {}
+        for change in delta:
+            by_variation.setdefault((change.card_id, change.variation_type), {})[change.field] = change.remote
+        for (card_id, variation_type), fields in by_variation.items():
+            store.update_variation(card_id, variation_type, **fields)
+        # Refresh the cards.json view
+        store.export_json(export_path)
+        print(f"📥 Pulled {len(delta)} fields into {len(by_variation)} variations")
+    return delta
+
+
+def make_backend(args) -> Any:
+    if args.export:
+        if len(args.uids) != 1:
+            raise SystemExit('❌ --export holds one user document; pass a single uid')
+        return JsonFileBackend({args.uids[0]: args.export})
+    if firestore is None:
+        raise SystemExit('❌ google-cloud-firestore is not installed (pip install google-cloud-firestore), '
+                         'or use --export with an exported user document')
+    return FirestoreBackend(firestore.Client(project=args.project))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Sync owned counts between cards.json and Firestore user documents')
+    parser.add_argument('command', choices=['diff', 'push', 'pull'])
+    parser.add_argument('uids', nargs='+', help='Firebase user ids (document ids in the collections collection)')
+    parser.add_argument('--export', help='Use an exported user document (JSON file) instead of Firestore')
+    parser.add_argument('--project', default=os.environ.get('VITE_FIREBASE_PROJECT_ID'), help='Firebase project id')
+    parser.add_argument('--dry-run', action='store_true', help='Show the delta without writing')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pull' and len(args.uids) != 1:
+        parser.error('pull takes a single uid')
+    backend = make_backend(args)
+
+    with open_store() as store:
+        if args.command == 'pull':
+            deltas = {args.uids[0]: pull(store, backend, args.uids[0], dry_run=args.dry_run)}
+        else:
+            deltas = push(store.all_cards(), backend, args.uids, dry_run=args.dry_run or args.command == 'diff')
+
+    for uid, delta in deltas.items():
+        print(f"\n👤 {uid}: {len(delta)} fields differ")
+        for change in delta:
+            print(f"  {change}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,97 +1,140 @@
 import json
-
-
-def auto_fix_languages(cards):
-    """Automatically fix obvious language availability issues"""
-
-    fixed_count = 0
-
-    for card in cards:
-        for var_type, var_data in card['variations'].items():
-            original_langs = var_data.get('available_languages', [])
-            new_langs = None
-
-            # Rule 1: World Championship cards = EN only
-            if 'world_championship' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 2: Comic-Con promos = EN only
-            elif 'comic-con' in var_type.lower() or 'comic_con' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 3: Prerelease/Expansion stamps = Usually EN only
-            elif 'prerelese_stamp' in var_type.lower() or 'expansion stamp' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 4: Burger King, McDonald's = EN only
-            elif 'burger_king' in var_type.lower() or 'mcdonal' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 5: Trick or Trade, Countdown Calendar = EN only
-            elif 'trick_or_trade' in var_type.lower() or 'countdown_calendar' in var_type.lower() or 'holiday_calender' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 6: Play! Pokemon = EN only (usually)
-            elif 'play!_pokemon' in var_type.lower() or 'play_pokemon' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 7: 10th Anniversary promos = JP only
-            elif '10th_anniversary' in var_type.lower():
-                new_langs = ['JP']
-
-            # Rule 8: Pokemon Center promos = JP only (usually)
-            elif 'pokemon_center' in var_type.lower():
-                new_langs = ['JP']
-
-            # Rule 9: Tropical Mega Battle = JP only
-            elif 'tropical_mega_battle' in var_type.lower():
-                new_langs = ['JP']
-
-            # Rule 10: Modern sets (Sword & Shield onwards) - normal/reverse holo have both
-            elif card['era'] in ['Sword & Shield', 'Scarlet & Violet', 'Sun & Moon']:
-                if var_type in ['normal', 'reverse_holo', 'holo']:
-                    new_langs = ['EN', 'JP']
-
-            # Rule 11: Older sets - normal/reverse holo/first edition have both
-            elif card['era'] in ['EX', 'Diamond Pearl', 'Platinum', 'Heart Gold Soul Silver',
-                                 'Black and White', 'X&Y', 'e-cards', 'Neo']:
-                if var_type in ['normal', 'reverse_holo', 'holo', 'first_edition', 'first_edition_holo']:
-                    new_langs = ['EN', 'JP']
-
-            # Rule 12: Unpeeled Ditto = EN only
-            elif 'unpeeled_ditto' in var_type.lower():
-                new_langs = ['EN', 'JP']
-
-            # Rule 13: Cosmos Holo = Usually EN only
-            elif 'cosmos_holo' in var_type.lower():
-                new_langs = ['EN']
-
-            # Rule 14: Jumbo cards = depends, but if JP set, JP only
-            elif 'jumbo' in var_type.lower():
-                if card['set'] in ['Unnumbered Releases'] or 'promo' in card['set'].lower():
-                    new_langs = ['JP']  # Most jumbo promos are JP
-
-            # Apply fix if we determined new languages
-            if new_langs and new_langs != original_langs:
-                var_data['available_languages'] = new_langs
-                fixed_count += 1
-                print(f"✓ Fixed {card['name']} - {var_type}: {original_langs} → {new_langs}")
-
-    print(f"\n✅ Auto-fixed {fixed_count} variations")
+import os
+import re
+from collections import Counter
+
+from card_table import load_variation_table
+from database_converter import PUBLIC_CARDS_JSON, save_cards
+from tcgdex_languages import LANGUAGES_SOURCE
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_FILE = os.path.join(CURRENT_DIR, '..', 'data', 'json', 'language_rules.json')
+
+
+class LanguageRuleEngine:
+    """
+    Language availability rules compiled from a declarative table.
+
+    Rules are checked in order and the first one whose guard matches wins:
+      - match: substrings of the lowercased variation type
+      - eras: card eras the rule applies to
+    A winning rule then only sets `languages` if its optional conditions hold:
+      - variation_types: exact variation types
+      - sets / set_contains: exact set names, or substrings of the lowercased set
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.hits = Counter()
+        self._memo = {}
+
+        # One alternation over every substring; the lookahead reports a match
+        # at each position, and alternatives are ordered by rule priority
+        alternatives = []
+        self._group_rule = []
+        for index, rule in enumerate(rules):
+            for pattern in rule.get('match', []):
+                alternatives.append(f'({re.escape(pattern.lower())})')
+                self._group_rule.append(index)
+        self._pattern = re.compile('(?=' + '|'.join(alternatives) + ')') if alternatives else None
+
+        self._eras = [frozenset(rule['eras']) if 'eras' in rule else None for rule in rules]
+        self._era_rules = {}
+        for index, eras in enumerate(self._eras):
+            if eras is not None and 'match' not in rules[index]:
+                for era in eras:
+                    self._era_rules.setdefault(era, index)
+
+        self._variation_types = [frozenset(rule['variation_types']) if 'variation_types' in rule else None
+                                 for rule in rules]
+        self._sets = [frozenset(rule.get('sets', [])) for rule in rules]
+
+    @classmethod
+    def from_file(cls, path=RULES_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['rules'])
+
+    def _winning_rule(self, var_type, era):
+        candidates = []
+
+        if self._pattern:
+            for m in self._pattern.finditer(var_type.lower()):
+                index = self._group_rule[m.lastindex - 1]
+                if self._eras[index] is None or era in self._eras[index]:
+                    candidates.append(index)
+
+        if era in self._era_rules:
+            candidates.append(self._era_rules[era])
+
+        return min(candidates) if candidates else None
+
+    def resolve(self, var_type, era, set_name):
+        """Return (rule name, new languages) for a variation, memoized per key"""
+        key = (var_type, era, set_name)
+        if key in self._memo:
+            return self._memo[key]
+
+        result = (None, None)
+        index = self._winning_rule(var_type, era)
+        if index is not None:
+            rule = self.rules[index]
+            applies = True
+
+            if self._variation_types[index] is not None:
+                applies = var_type in self._variation_types[index]
+
+            if applies and ('sets' in rule or 'set_contains' in rule):
+                applies = (set_name in self._sets[index] or
+                           any(part in set_name.lower() for part in rule.get('set_contains', [])))
+
+            result = (rule['name'], rule['languages'] if applies else None)
+
+        self._memo[key] = result
+        return result
+
+
+def auto_fix_languages(cards, engine=None):
+    """
+    Automatically fix obvious language availability issues. Variations whose
+    languages came from the TCGdex catalogs are facts, not guesses, and are kept.
+    """
+
+    engine = engine or LanguageRuleEngine.from_file()
+    table = load_variation_table(cards)
+    key_columns = ['variation_type', 'era', 'set']
+
+    # Resolve each distinct (variation type, era, set) once, then join back
+    keys = table[key_columns].drop_duplicates()
+    resolved = [engine.resolve(*key) for key in keys.itertuples(index=False)]
+    keys['rule'] = [rule_name for rule_name, _ in resolved]
+    keys['new_langs'] = ['|'.join(langs) if langs else '' for _, langs in resolved]
+    table = table.merge(keys, on=key_columns, how='left', sort=False)
+
+    engine.hits.update(table['rule'].dropna().value_counts().to_dict())
+
+    # Apply fix if we determined new languages
+    changed = table[(table['new_langs'] != '') & (table['new_langs'] != table['available_languages'])
+                    & (table['languages_source'] != LANGUAGES_SOURCE)]
+    for row in changed.itertuples(index=False):
+        var_data = cards[row.card_pos]['variations'][row.variation_type]
+        original_langs = var_data.get('available_languages', [])
+        new_langs = row.new_langs.split('|')
+        var_data['available_languages'] = new_langs
+        print(f"✓ Fixed {row.name} - {row.variation_type}: {original_langs} → {new_langs}")
+
+    print(f"\n✅ Auto-fixed {len(changed)} variations")
+    print("📊 Rule hits:")
+    for rule in engine.rules:
+        print(f"  {rule['name']}: {engine.hits[rule['name']]}")
     return cards
 
 
 if __name__ == '__main__':
-    with open('../../public/cards.json', 'r', encoding='utf-8') as f:
+    with open(PUBLIC_CARDS_JSON, 'r', encoding='utf-8') as f:
         cards = json.load(f)
 
     # Apply auto-fixes
     cards = auto_fix_languages(cards)
 
     # Save auto-fixed version
-    with open('../data/json/cards_autofixed.json', 'w', encoding='utf-8') as f:
-        json.dump(cards, f, ensure_ascii=False, indent=2)
-
-
-
-
+    save_cards(cards, os.path.join(CURRENT_DIR, '..', 'data', 'cards_autofixed.arrow'))
@@ -0,0 +1,145 @@
+"""
+HTML Parsing Backends
+Fast, targeted extraction for the Serebii/PkmnCards scrapers. Uses selectolax
+or lxml when installed and falls back to BeautifulSoup's html.parser, which
+is limited to the relevant tags with a SoupStrainer where possible.
+
+Set HTML_PARSER_BACKEND=selectolax|lxml|html.parser to force a backend.
+"""
+
+import os
+from typing import List, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from instrumentation import metrics
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+
+def available_backends() -> List[str]:
+    backends = []
+    if HTMLParser is not None:
+        backends.append('selectolax')
+    if lxml is not None:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def get_backend() -> str:
+    """Return the forced backend, or the fastest one installed"""
+    forced = os.environ.get('HTML_PARSER_BACKEND')
+    if forced:
+        if forced not in available_backends():
+            raise ValueError(f"HTML parser backend '{forced}' is not available")
+        return forced
+    return available_backends()[0]
+
+
+def variation_hints(content: bytes, backend: str = None) -> Tuple[str, List[str]]:
+    """
+    Extract what the scrapers need to detect variations from a card page.
+
+    Returns:
+        (lowercased page text, lowercased values of every "Rarity" table row)
+    """
+    backend = backend or get_backend()
+    with metrics.timer('parse_seconds', step='variation_hints', backend=backend):
+        return _variation_hints(content, backend)
+
+
+def _variation_hints(content: bytes, backend: str) -> Tuple[str, List[str]]:
+    if backend == 'selectolax':
+        tree = HTMLParser(content)
+        # Like get_text(), leave inline JS/CSS out of the page text
+        tree.strip_tags(['script', 'style'])
+        page_text = tree.root.text() if tree.root else ''
+        rows = [[td.text() for td in row.css('td')] for row in tree.css('tr')]
+
+    elif backend == 'lxml':
+        if not content.strip():
+            return '', []
+        tree = lxml.html.fromstring(content)
+        lxml.etree.strip_elements(tree, 'script', 'style', with_tail=False)
+        page_text = tree.text_content()
+        rows = [[td.text_content() for td in row.iter('td')] for row in tree.iter('tr')]
+
+    else:
+        soup = BeautifulSoup(content, 'html.parser')
+        page_text = soup.get_text()
+        rows = [[td.get_text() for td in row.find_all('td')] for row in soup.find_all('tr')]
+
+    rarities = [
+        cells[1].strip().lower()
+        for cells in rows
+        if len(cells) >= 2 and 'rarity' in cells[0].strip().lower()
+    ]
+    return page_text.lower(), rarities
+
+
+def find_card_image(content: bytes, page_url: str, backend: str = None) -> str:
+    """
+    Find the card image on a page, trying in order: an <img width="265">,
+    the first image in a <table cellpadding="5">, the og:image meta tag and
+    any image with /card/ in its path. Returns '' if none is found.
+    """
+    backend = backend or get_backend()
+    with metrics.timer('parse_seconds', step='find_card_image', backend=backend):
+        return _find_card_image(content, page_url, backend)
+
+
+def _find_card_image(content: bytes, page_url: str, backend: str) -> str:
+    if backend == 'selectolax':
+        tree = HTMLParser(content)
+        node = (next((img for img in tree.css('img[width="265"][src]') if img.attributes['src']), None)
+                or next((img for img in tree.css('table[cellpadding="5"] img[src]') if img.attributes['src']), None))
+        if node:
+            return urljoin(page_url, node.attributes['src'])
+        meta = tree.css_first('meta[property="og:image"][content]')
+        if meta:
+            return meta.attributes['content']
+        srcs = [img.attributes.get('src') or '' for img in tree.css('img')]
+
+    elif backend == 'lxml':
+        if not content.strip():
+            return ''
+        tree = lxml.html.fromstring(content)
+        found = ([src for src in tree.xpath('//img[@width="265"]/@src') if src]
+                 or [src for src in tree.xpath('((//table[@cellpadding="5"])[1]//img)[1]/@src') if src])
+        if found:
+            return urljoin(page_url, found[0])
+        og_image = tree.xpath('//meta[@property="og:image"]/@content')
+        if og_image and og_image[0]:
+            return og_image[0]
+        srcs = tree.xpath('//img/@src')
+
+    else:
+        # Only build the tags the lookups can match
+        soup = BeautifulSoup(content, 'html.parser', parse_only=SoupStrainer(['img', 'meta', 'table']))
+        img_tag = soup.find('img', {'width': '265'})
+        if img_tag and img_tag.get('src'):
+            return urljoin(page_url, img_tag['src'])
+        table = soup.find('table', {'cellpadding': '5'})
+        img_tag = table.find('img') if table else None
+        if img_tag and img_tag.get('src'):
+            return urljoin(page_url, img_tag['src'])
+        og_image = soup.find('meta', property='og:image')
+        if og_image and og_image.get('content'):
+            return og_image['content']
+        srcs = [img.get('src', '') for img in soup.find_all('img')]
+
+    for src in srcs:
+        if '/card/' in src:
+            return urljoin(page_url, src)
+    return ''
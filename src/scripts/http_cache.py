@@ -0,0 +1,225 @@
+"""
+HTTP Response Cache
+Content-addressed on-disk cache shared by all scrapers. Responses are keyed
+by URL, bodies are stored once per content hash, and stale entries are
+revalidated with If-None-Match / If-Modified-Since. The cache is bounded by
+size with least-recently-used eviction, and can serve offline.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from instrumentation import domain_of, instrument_session, metrics
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'http_cache')
+DEFAULT_TTL = 7 * 24 * 3600  # Card pages almost never change
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class HttpCache:
+    """URL-keyed response store with content-addressed bodies and LRU eviction"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.meta_dir = os.path.join(cache_dir, 'meta')
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        os.makedirs(self.meta_dir, exist_ok=True)
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._load_index()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _load_index(self) -> None:
+        for name in os.listdir(self.meta_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.meta_dir, name), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if os.path.exists(self._blob_path(meta['blob'])):
+                self._index[name[:-5]] = meta
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.meta_dir, key + '.json')
+
+    def _write_meta(self, key: str, meta: Dict) -> None:
+        path = self._meta_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def total_bytes(self) -> int:
+        blobs = {meta['blob']: meta['size'] for meta in self._index.values()}
+        return sum(blobs.values())
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Return the cached metadata for `url`, or None"""
+        with self._lock:
+            return self._index.get(self.key_for(url))
+
+    def is_fresh(self, meta: Dict) -> bool:
+        return time.time() - meta['stored_at'] < self.ttl
+
+    def read_body(self, meta: Dict) -> bytes:
+        with open(self._blob_path(meta['blob']), 'rb') as f:
+            return f.read()
+
+    def touch(self, url: str, revalidated: bool = False) -> None:
+        """Mark an entry as recently used (and fresh again after a 304)"""
+        key = self.key_for(url)
+        with self._lock:
+            meta = self._index.get(key)
+            if not meta:
+                return
+            meta['accessed_at'] = time.time()
+            if revalidated:
+                meta['stored_at'] = meta['accessed_at']
+            self._write_meta(key, meta)
+
+    def store(self, url: str, status_code: int, headers: Dict[str, str], body: bytes) -> Dict:
+        """Save a response body and its validators"""
+        headers = CaseInsensitiveDict(headers)
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, blob_path)
+
+        now = time.time()
+        meta = {
+            'url': url,
+            'status_code': status_code,
+            'headers': {name: headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified')
+                        if name in headers},
+            'blob': digest,
+            'size': len(body),
+            'stored_at': now,
+            'accessed_at': now,
+        }
+
+        key = self.key_for(url)
+        with self._lock:
+            self._index[key] = meta
+            self._write_meta(key, meta)
+            self._evict()
+        return meta
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        for key, meta in sorted(self._index.items(), key=lambda item: item[1]['accessed_at']):
+            if total <= self.max_bytes:
+                break
+            del self._index[key]
+            try:
+                os.remove(self._meta_path(key))
+            except OSError:
+                pass
+
+            # Bodies are shared between URLs - only delete unreferenced blobs
+            if not any(m['blob'] == meta['blob'] for m in self._index.values()):
+                total -= meta['size']
+                try:
+                    os.remove(self._blob_path(meta['blob']))
+                except OSError:
+                    pass
+
+
+class CachedSession(requests.Session):
+    """
+    requests.Session that serves GETs from an HttpCache.
+
+    Fresh entries are returned without touching the network, stale ones are
+    revalidated with conditional headers, and offline=True never hits the
+    network (missing entries raise requests.ConnectionError).
+    """
+
+    def __init__(self, cache: Optional[HttpCache] = None, offline: Optional[bool] = None):
+        super().__init__()
+        self.cache = cache or HttpCache()
+        if offline is None:
+            offline = os.environ.get('HTTP_CACHE_OFFLINE', '').lower() in ('1', 'true', 'yes')
+        self.offline = offline
+        instrument_session(self)
+
+    def _cached_response(self, url: str, meta: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta['status_code']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.headers['X-Cache'] = 'HIT'
+        response._content = self.cache.read_body(meta)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        response.reason = 'OK'
+        return response
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET' or kwargs.get('params'):
+            return super().request(method, url, *args, **kwargs)
+
+        meta = self.cache.lookup(url)
+        domain = domain_of(url)
+
+        if self.offline:
+            if not meta:
+                raise requests.ConnectionError(f"Offline mode: {url} is not cached")
+            self.cache.touch(url)
+            metrics.inc('http_cache', domain=domain, result='hit')
+            return self._cached_response(url, meta)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+
+        # Cache-Control: no-cache asks for revalidation even if the entry is fresh
+        if meta and self.cache.is_fresh(meta) and headers.get('Cache-Control') != 'no-cache':
+            self.cache.touch(url)
+            metrics.inc('http_cache', domain=domain, result='hit')
+            return self._cached_response(url, meta)
+
+        if meta:
+            if meta['headers'].get('ETag'):
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = super().request(method, url, *args, headers=headers, **kwargs)
+
+        if response.status_code == 304 and meta:
+            self.cache.touch(url, revalidated=True)
+            metrics.inc('http_cache', domain=domain, result='revalidated')
+            return self._cached_response(url, meta)
+
+        metrics.inc('http_cache', domain=domain, result='miss')
+
+        if response.status_code == 200:
+            self.cache.store(url, response.status_code, response.headers, response.content)
+
+        return response
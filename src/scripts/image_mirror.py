@@ -0,0 +1,253 @@
+"""
+Image Mirror
+Downloads every card's imageUrl into a content-addressed local store and
+generates resized WebP (and AVIF, when Pillow supports it) thumbnails under
+public/thumbs, so the app can serve small local images instead of
+hot-linking full-size scans. Identical images share one blob and one set of
+thumbnails, and images that are already mirrored are not downloaded again.
+
+Cards get:
+    thumbUrl:   the middle-width WebP thumbnail
+    srcset:     every WebP width, for <img srcset>
+    srcsetAvif: every AVIF width, for <source type="image/avif">
+Paths are relative to the app's base URL.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from card_store import open_store
+from checkpoint_journal import write_json_atomic
+from image_resolver import USER_AGENT
+from tcgdex_client import make_session
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_STORE = os.path.join(CURRENT_DIR, '..', 'data', 'image_store')
+IMAGE_INDEX = os.path.join(IMAGE_STORE, 'index.json')
+THUMB_DIR = os.path.join(CURRENT_DIR, '..', '..', 'public', 'thumbs')
+THUMB_URL_PREFIX = 'thumbs/'
+
+THUMB_WIDTHS = (200, 400, 800)
+THUMB_QUALITY = {'webp': 80, 'avif': 55}
+THUMB_FIELDS = ('thumbUrl', 'srcset', 'srcsetAvif')
+
+CONTENT_TYPE_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif'}
+
+
+def thumb_formats() -> List[str]:
+    """WebP always, AVIF if this Pillow build can write it"""
+    from PIL import features
+
+    return ['webp'] + (['avif'] if features.check('avif') else [])
+
+
+def _blob_path(digest: str, ext: str) -> str:
+    return os.path.join(IMAGE_STORE, 'blobs', digest[:2], digest + ext)
+
+
+def _thumb_name(digest: str, width: int, fmt: str) -> str:
+    return f'{digest[:16]}-{width}.{fmt}'
+
+
+def make_thumbnails(blob_path: str, digest: str, formats: List[str]) -> Dict[str, List[int]]:
+    """
+    Resize one image to every THUMB_WIDTHS width it is wider than (or its own
+    width if it is narrower than all of them). Existing thumbnails are kept.
+    Returns {format: [widths]}.
+    """
+    from PIL import Image
+
+    with Image.open(blob_path) as image:
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        widths = [width for width in THUMB_WIDTHS if width < image.width] or [image.width]
+
+        for width in widths:
+            resized = None
+            for fmt in formats:
+                path = os.path.join(THUMB_DIR, _thumb_name(digest, width, fmt))
+                if os.path.exists(path):
+                    continue
+                if resized is None:
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                resized.save(tmp_path, format=fmt.upper(), quality=THUMB_QUALITY[fmt])
+                os.replace(tmp_path, path)
+
+    return {fmt: widths for fmt in formats}
+
+
+def _make_thumbnails(args: Tuple[str, str, List[str]]) -> Optional[Dict[str, List[int]]]:
+    """make_thumbnails() for the process pool; None if the blob cannot be decoded"""
+    try:
+        return make_thumbnails(*args)
+    except Exception as e:
+        print(f"  ⚠️ Cannot make thumbnails for {args[0]}: {e}")
+        return None
+
+
+def _srcset(digest: str, widths: List[int], fmt: str) -> str:
+    return ', '.join(f'{THUMB_URL_PREFIX}{_thumb_name(digest, width, fmt)} {width}w' for width in widths)
+
+
+class ImageMirror:
+    """
+    Content-addressed image store with an index of {url: {sha256, ext, thumbs}},
+    or {url: {sha256, ext, undecodable}} for blobs Pillow cannot read.
+
+    Args:
+        workers: Concurrent downloads
+        processes: Worker processes for thumbnail generation
+    """
+
+    def __init__(self, workers: int = 8, processes: Optional[int] = None):
+        self.workers = workers
+        self.processes = processes
+        self.index: Dict[str, Dict] = {}
+        # Images are stored by content hash here, so they bypass the HTTP cache
+        self.session = make_session(pool_size=workers, cached=False)
+        self.session.headers.update({'User-Agent': USER_AGENT})
+
+        if os.path.exists(IMAGE_INDEX):
+            with open(IMAGE_INDEX, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def _is_mirrored(self, url: str) -> bool:
+        entry = self.index.get(url)
+        return bool(entry) and os.path.exists(_blob_path(entry['sha256'], entry['ext']))
+
+    def download(self, url: str) -> Optional[Dict]:
+        """Fetch one image into the store, returning its index entry (None on failure)"""
+        try:
+            response = self.session.get(url, timeout=20)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"  ⚠️ Error downloading {url}: {e}")
+            return None
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith('image/'):
+            print(f"  ⚠️ Not an image ({content_type or 'no content type'}): {url}")
+            return None
+
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        ext = CONTENT_TYPE_EXTENSIONS.get(content_type) or os.path.splitext(url.split('?')[0])[1].lower() or '.img'
+        path = _blob_path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        return {'sha256': digest, 'ext': ext}
+
+    def mirror(self, urls: List[str]) -> Dict[str, Dict]:
+        """Download the URLs not mirrored yet, then build any missing thumbnails"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        todo = [url for url in urls if not self._is_mirrored(url)]
+
+        if todo:
+            print(f"🌐 Downloading {len(todo)} images ({self.workers} workers)...")
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for url, entry in zip(todo, pool.map(self.download, todo)):
+                    if entry:
+                        self.index[url] = entry
+
+        formats = thumb_formats()
+        blobs = {}
+        for url in urls:
+            entry = self.index.get(url)
+            # Undecodable blobs are only retried when the URL's content (and so its entry) changes
+            if entry and not entry.get('undecodable') and (entry.get('formats') != formats or
+                                                           not self._has_thumbs(entry)):
+                blobs[entry['sha256']] = (_blob_path(entry['sha256'], entry['ext']), entry['sha256'], formats)
+
+        if blobs:
+            # Identical images from different URLs are resized once
+            print(f"🖼️  Generating thumbnails for {len(blobs)} images ({', '.join(formats)})...")
+            os.makedirs(THUMB_DIR, exist_ok=True)
+            with ProcessPoolExecutor(max_workers=self.processes) as pool:
+                thumbs = dict(zip(blobs, pool.map(_make_thumbnails, blobs.values())))
+            for url in urls:
+                entry = self.index.get(url)
+                if not entry or entry['sha256'] not in thumbs:
+                    continue
+                if thumbs[entry['sha256']] is None:
+                    # No thumbnails, so the card falls back to its imageUrl
+                    entry.pop('formats', None)
+                    entry.pop('thumbs', None)
+                    entry['undecodable'] = True
+                else:
+                    entry['formats'] = formats
+                    entry['thumbs'] = thumbs[entry['sha256']]
+
+        if todo or blobs:
+            write_json_atomic(IMAGE_INDEX, self.index)
+        return {url: self.index[url] for url in urls if url in self.index}
+
+    @staticmethod
+    def _has_thumbs(entry: Dict) -> bool:
+        return 'thumbs' in entry and all(
+            os.path.exists(os.path.join(THUMB_DIR, _thumb_name(entry['sha256'], width, fmt)))
+            for fmt, widths in entry['thumbs'].items() for width in widths)
+
+
+def add_thumbnails(cards: List[Dict], on_change: Optional[Callable[[Dict], None]] = None,
+                   workers: int = 8) -> List[Dict]:
+    """
+    Mirror every card's imageUrl and set thumbUrl/srcset/srcsetAvif on it.
+    Cards are updated in place and on_change(card) is called for each card
+    whose fields changed. Returns the cards.
+    """
+    entries = ImageMirror(workers=workers).mirror([card.get('imageUrl') for card in cards])
+
+    changed = 0
+    for card in cards:
+        entry = entries.get(card.get('imageUrl'))
+        if not entry or 'thumbs' not in entry:
+            # Thumbnails of a previous imageUrl must not outlive it
+            if any(key in card for key in THUMB_FIELDS):
+                for key in THUMB_FIELDS:
+                    card.pop(key, None)
+                changed += 1
+                if on_change:
+                    on_change(card)
+            continue
+
+        digest, thumbs = entry['sha256'], entry['thumbs']
+        webp = thumbs['webp']
+        fields = {
+            'thumbUrl': f"{THUMB_URL_PREFIX}{_thumb_name(digest, webp[len(webp) // 2], 'webp')}",
+            'srcset': _srcset(digest, webp, 'webp'),
+        }
+        if 'avif' in thumbs:
+            fields['srcsetAvif'] = _srcset(digest, thumbs['avif'], 'avif')
+
+        if any(card.get(key) != value for key, value in fields.items()):
+            card.update(fields)
+            changed += 1
+            if on_change:
+                on_change(card)
+
+    print(f"✅ {len(entries)} images mirrored, thumbnails updated on {changed} cards")
+    return cards
+
+
+def update_thumbnails():
+    store = open_store()
+    changed = []
+    add_thumbnails(store.all_cards(), changed.append)
+
+    if changed:
+        store.upsert_cards(changed)
+        # Refresh the cards.json view
+        store.export_json()
+    store.close()
+
+
+if __name__ == '__main__':
+    update_thumbnails()
@@ -0,0 +1,187 @@
+"""
+Image URL Resolver
+Finds card image URLs without downloading the card page when possible.
+Candidate URLs are inferred from the card page URL (Serebii pages at
+/card/<set>/<n>.shtml have their image at /card/<set>/<n>.jpg) and from
+per-set URL templates learned from cards whose image is already known, then
+checked with concurrent HEAD requests. Only cards with no confirmed
+candidate fall back to fetching and parsing the page.
+"""
+
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from instrumentation import metrics
+from tcgdex_client import make_session
+
+SEREBII_PAGE = re.compile(r'^(https?://www\.serebii\.net/card/[^/]+/)([^/?#]+)\.shtml$', re.IGNORECASE)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+# Card fields a learned template can contain, tried in this order when learning
+TEMPLATE_FIELDS = ('slug', 'n3', 'number', 'n')
+MAX_TEMPLATES_PER_SET = 3
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+def template_fields(card: Dict) -> Dict[str, str]:
+    """Values a URL template is rendered with: name slug and number spellings"""
+    number = str(card.get('number') or '').strip()
+    fields = {
+        'slug': re.sub(r'[^a-z0-9]+', '_', (card.get('name') or '').lower()).strip('_'),
+        'number': number,
+        'n': (number.lstrip('0') or '0').lower() if number else '',
+        'n3': number.zfill(3) if number.isdigit() else '',
+    }
+    return fields
+
+
+def learn_template(card: Dict, image_url: str) -> Optional[str]:
+    """
+    Turn a known image URL into a template by replacing the card's number
+    (and name slug) in the file name with {fields}. Returns None if the
+    file name does not contain the card number.
+    """
+    fields = template_fields(card)
+    head, _, name = image_url.rpartition('/')
+
+    # Matched values are swapped for private-use placeholders so later fields
+    # cannot match inside an earlier one
+    used = []
+    for i, field in enumerate(TEMPLATE_FIELDS):
+        value = fields[field]
+        if field != 'slug' and len(used) > ('slug' in used):
+            break  # One spelling of the number is enough
+        if value and value in name:
+            start = name.rindex(value)
+            name = f'{name[:start]}{chr(0xE000 + i)}{name[start + len(value):]}'
+            used.append(field)
+
+    if not any(field != 'slug' for field in used):
+        return None
+
+    template = f'{head}/{name}'.replace('{', '{{').replace('}', '}}')
+    for i, field in enumerate(TEMPLATE_FIELDS):
+        template = template.replace(chr(0xE000 + i), f'{{{field}}}')
+
+    # Only keep templates that reproduce the URL they were learned from
+    return template if template.format(**fields) == image_url else None
+
+
+def _set_key(card: Dict) -> Tuple[str, str]:
+    return urlparse(card.get('url') or '').netloc.lower(), card.get('set') or ''
+
+
+class ImageUrlResolver:
+    """
+    Resolves image URLs for many cards at once.
+
+    Args:
+        scrape: Fallback called with the card page URL, returns '' on a miss
+        session: Session for the HEAD probes, a pooled one by default
+        workers: Concurrent HEAD requests
+        scrape_delay: Seconds to wait after each fallback page fetch
+    """
+
+    def __init__(self, scrape: Callable[[str], str], session: Optional[requests.Session] = None,
+                 workers: int = 8, scrape_delay: float = 0.1):
+        self.scrape = scrape
+        self.session = session or make_session(pool_size=workers)
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.workers = workers
+        self.scrape_delay = scrape_delay
+        self.templates: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        self.stats = Counter()
+
+    def learn(self, card: Dict, image_url: str) -> Optional[str]:
+        """Record the set's URL template from a card with a known image"""
+        template = learn_template(card, image_url) if image_url else None
+        if template:
+            self.templates[_set_key(card)][template] += 1
+        return template
+
+    def learn_from(self, cards: Iterable[Dict]) -> None:
+        for card in cards:
+            self.learn(card, card.get('imageUrl') or '')
+
+    def candidates(self, card: Dict) -> List[str]:
+        """Inferred image URLs for a card, most likely first"""
+        url = card.get('url') or ''
+        found = []
+
+        if urlparse(url).path.lower().endswith(IMAGE_EXTENSIONS):
+            found.append(url)
+
+        match = SEREBII_PAGE.match(url)
+        if match:
+            found.append(f"{match.group(1)}{(match.group(2).lstrip('0') or '0').lower()}.jpg")
+
+        fields = template_fields(card)
+        for template, _ in self.templates[_set_key(card)].most_common(MAX_TEMPLATES_PER_SET):
+            try:
+                found.append(template.format(**fields))
+            except (KeyError, IndexError, ValueError):
+                continue
+
+        return list(dict.fromkeys(found))
+
+    def probe(self, url: str) -> bool:
+        """True if a HEAD request finds an image at `url`"""
+        try:
+            response = self.session.head(url, timeout=10, allow_redirects=True)
+        except requests.RequestException:
+            return False
+        content_type = response.headers.get('Content-Type', 'image/')
+        return response.status_code == 200 and content_type.startswith('image/')
+
+    def _probe_cards(self, cards: List[Dict]) -> Dict[str, str]:
+        """HEAD-probe the candidates of every card concurrently, first confirmed candidate wins"""
+        candidates = {card['id']: self.candidates(card) for card in cards}
+        urls = list(dict.fromkeys(url for found in candidates.values() for url in found))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            ok = dict(zip(urls, pool.map(self.probe, urls)))
+
+        return {card_id: next(url for url in found if ok[url])
+                for card_id, found in candidates.items() if any(ok[url] for url in found)}
+
+    def resolve(self, cards: List[Dict]) -> Dict[str, str]:
+        """
+        Find image URLs for `cards` and return {card id: url} for those found.
+
+        Every card's candidates are probed at once. Misses are scraped one at
+        a time; whenever a scrape teaches a new template for its set, the
+        set's remaining misses are probed again before scraping them.
+        """
+        resolved = self._probe_cards(cards)
+        self.stats['probed'] += len(resolved)
+
+        misses = [card for card in cards if card['id'] not in resolved]
+        while misses:
+            card = misses.pop(0)
+            if not card.get('url'):
+                continue
+            image_url = self.scrape(card['url'])
+            # Be nice to the servers between page fetches
+            with metrics.stage('rate_limit_sleep'):
+                time.sleep(self.scrape_delay)
+            if not image_url:
+                continue
+
+            resolved[card['id']] = image_url
+            self.stats['scraped'] += 1
+
+            known = set(self.templates[_set_key(card)])
+            if self.learn(card, image_url) not in known | {None}:
+                same_set = [other for other in misses if _set_key(other) == _set_key(card)]
+                found = self._probe_cards(same_set)
+                resolved.update(found)
+                self.stats['probed'] += len(found)
+                misses = [other for other in misses if other['id'] not in found]
+
+        return resolved
@@ -0,0 +1,264 @@
+"""
+Run Instrumentation
+Timers, counters and latency histograms for the scraping and conversion
+scripts, so a slow run shows whether the time went to network waits,
+parsing, rate-limit sleeps or writing JSON. Everything is recorded in the
+process-wide `metrics` registry and exported at the end of a run as JSON and
+as a Prometheus textfile (src/data/metrics/<run>.json and <run>.prom).
+
+Recorded:
+    stage_seconds{stage}                 histogram of every metrics.stage() block
+    http_request_seconds{domain}         network request latency (sessions passed to instrument_session)
+    http_response_bytes{domain}          response body bytes
+    http_requests{domain, status}        network requests by status code
+    http_cache{domain, result}           HTTP cache hit / revalidated / miss
+    parse_seconds{step, backend}         HTML parsing time
+    rate_limit_wait_seconds{domain}      time FetchEngine holds a request for its domain's rate limit
+    images_resolved{method}              image URLs found by HEAD probe / page scrape
+
+With profiling enabled (the scripts' --profile flag), each stage is also run
+under cProfile and its stats are written to src/data/metrics/profile/<stage>.prof.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'metrics')
+PROMETHEUS_PREFIX = 'yuka_'
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def domain_of(url: str) -> str:
+    """Return the bare host of a URL ('www.serebii.net' -> 'serebii.net')"""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class Histogram:
+    """Cumulative-bucket histogram, like a Prometheus histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'sum': round(self.sum, 6), 'max': round(self.max, 6),
+                'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+                'buckets': {str(bound): n for bound, n in zip((*self.buckets, '+Inf'), self.counts)}}
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms keyed by name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self.profile_dir: Optional[str] = None
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._profiling = False
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        with self._lock:
+            self.counters[name][tuple(sorted(labels.items()))] += value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self.histograms[name].get(key)
+            if histogram is None:
+                histogram = self.histograms[name][key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # Stages and profiling
+
+    def enable_profiling(self, profile_dir: Optional[str] = None) -> None:
+        self.profile_dir = profile_dir or os.path.join(METRICS_DIR, 'profile')
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a block as stage `name`. When profiling, the outermost stage
+        running at a time is also profiled (cProfile sees the calling thread
+        only); repeated runs of a stage add up in one profile.
+        """
+        profile = None
+        if self.profile_dir:
+            with self._lock:
+                if not self._profiling:
+                    self._profiling = True
+                    profile = self._profiles.setdefault(name, cProfile.Profile())
+        if profile:
+            profile.enable()
+        try:
+            with self.timer('stage_seconds', stage=name):
+                yield
+        finally:
+            if profile:
+                profile.disable()
+                with self._lock:
+                    self._profiling = False
+
+    def save_profiles(self, top: int = 15) -> None:
+        """Write each stage's profile as a .prof file and print its top functions"""
+        if not self._profiles:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profile in self._profiles.items():
+            path = os.path.join(self.profile_dir, f'{name}.prof')
+            profile.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+            print(f"\n🔬 Profile of stage '{name}' ({path}):")
+            print('\n'.join(line for line in out.getvalue().splitlines()[4:] if line.strip()))
+
+    # Export
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'counters': {name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                             for name, series in self.counters.items()},
+                'histograms': {name: [{'labels': dict(key), **histogram.to_dict()} for key, histogram in series.items()]
+                               for name, series in self.histograms.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format, for node_exporter's textfile collector"""
+        def fmt(labels: Labels, extra: Tuple = ()) -> str:
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+            return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f'{PROMETHEUS_PREFIX}{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                lines.extend(f'{metric}{fmt(key)} {value:g}' for key, value in series.items())
+            for name, series in sorted(self.histograms.items()):
+                metric = f'{PROMETHEUS_PREFIX}{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, n in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{fmt(key, (("le", str(bound)),))} {cumulative}')
+                    lines.append(f'{metric}_sum{fmt(key)} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{fmt(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def print_summary(self) -> None:
+        stages = self.histograms.get('stage_seconds', {})
+        if stages:
+            print(f"\n⏱️  {'stage':<28} {'calls':>7} {'total':>10} {'mean':>10} {'max':>10}")
+            for key, h in sorted(stages.items(), key=lambda item: -item[1].sum):
+                print(f"  {dict(key)['stage']:<28} {h.count:>7} {h.sum:>9.2f}s {h.sum / h.count * 1000:>8.1f}ms "
+                      f"{h.max * 1000:>8.1f}ms")
+
+        requests_by_domain = self.histograms.get('http_request_seconds', {})
+        if requests_by_domain:
+            bytes_by_domain = self.counters.get('http_response_bytes', {})
+            print(f"\n🌐 {'domain':<28} {'requests':>8} {'mean':>10} {'max':>10} {'KB':>10}")
+            for key, h in sorted(requests_by_domain.items()):
+                print(f"  {dict(key)['domain']:<28} {h.count:>8} {h.sum / h.count * 1000:>8.1f}ms "
+                      f"{h.max * 1000:>8.1f}ms {bytes_by_domain.get(key, 0) / 1024:>10.1f}")
+
+        parsing = self.histograms.get('parse_seconds', {})
+        for key, h in sorted(parsing.items()):
+            labels = dict(key)
+            print(f"\n🧩 {labels['step']} ({labels['backend']}): {h.count} pages, {h.sum / h.count * 1000:.2f}ms mean")
+
+        cache = self.counters.get('http_cache', {})
+        if cache:
+            totals = defaultdict(float)
+            for key, value in cache.items():
+                totals[dict(key)['result']] += value
+            print("\n♻️  HTTP cache: " + ', '.join(f"{result} {n:g}" for result, n in sorted(totals.items())))
+
+    def export(self, run: str, directory: str = METRICS_DIR) -> str:
+        """Write <run>.json and <run>.prom, print the summary and any profiles; returns the JSON path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{run}.json')
+        data = {'run': run, 'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), **self.to_dict()}
+        for target, text in ((path, json.dumps(data, indent=2, ensure_ascii=False)),
+                             (os.path.join(directory, f'{run}.prom'), self.to_prometheus())):
+            tmp_path = target + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, target)
+
+        self.print_summary()
+        self.save_profiles()
+        print(f"\n📈 Metrics written to {path} (and .prom)")
+        return path
+
+
+metrics = Metrics()
+
+
+def _record_response(response: requests.Response, *args, **kwargs) -> None:
+    domain = domain_of(response.url)
+    metrics.observe('http_request_seconds', response.elapsed.total_seconds(), domain=domain)
+    metrics.inc('http_requests', domain=domain, status=str(response.status_code))
+    if response.request.method == 'HEAD':
+        return
+    length = response.headers.get('Content-Length', '')
+    # Hooks run before the body is read; without a length header it is read here (no session streams)
+    metrics.inc('http_response_bytes', int(length) if length.isdigit() else len(response.content or b''),
+                domain=domain)
+
+
+def instrument_session(session: requests.Session) -> requests.Session:
+    """Record latency, status and bytes of every network response the session gets"""
+    if _record_response not in session.hooks['response']:
+        session.hooks['response'].append(_record_response)
+    return session
+
+
+def profiling_requested(argv) -> bool:
+    """The scripts' opt-in --profile flag: enables per-stage profiling when present"""
+    if '--profile' in argv:
+        metrics.enable_profiling()
+        return True
+    return False
@@ -0,0 +1,120 @@
+"""
+Card Migrations
+Versioned schema migrations for the card store. A migration is a batched
+transform over a list of cards that returns the cards it changed, and must
+be idempotent: running it on already migrated cards changes nothing.
+
+The runner applies every pending migration to each batch in one pass over
+the store. Each batch is committed together with its progress marker, and
+the schema version is recorded once the pass completes, so an interrupted
+run resumes after the last committed batch.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from card_store import CardStore
+
+SCHEMA_VERSION_KEY = 'schema_version'
+PROGRESS_KEY = 'migration_progress'
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    transform: Callable[[List[Dict]], List[Dict]]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Register a transform as the migration to `version`"""
+    def register(transform):
+        MIGRATIONS.append(Migration(version, name, transform))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return transform
+    return register
+
+
+@migration(1, "variation 'owned' string -> count / ordered")
+def owned_to_count(cards: List[Dict]) -> List[Dict]:
+    changed = []
+    for card in cards:
+        variations = card.get('variations')
+        if not isinstance(variations, dict):
+            continue
+
+        migrated = False
+        for var_type, old_var in variations.items():
+            # Variations that already have a count are in the new structure
+            if not isinstance(old_var, dict) or 'count' in old_var:
+                continue
+            owned = old_var.get('owned')
+            variations[var_type] = {
+                'count': 1 if owned == 'yes' else 0,
+                'ordered': owned == 'ordered',
+                'languages': old_var.get('languages', [])
+            }
+            migrated = True
+
+        if migrated:
+            changed.append(card)
+    return changed
+
+
+def schema_version(store: CardStore) -> int:
+    return int(store.get_meta(SCHEMA_VERSION_KEY) or 0)
+
+
+def run_migrations(store: CardStore, batch_size: int = 1000, target: Optional[int] = None) -> int:
+    """
+    Bring the store up to `target` (default: the latest migration).
+
+    Returns:
+        The number of migrations applied
+    """
+    current = schema_version(store)
+    todo = [m for m in MIGRATIONS if m.version > current and (target is None or m.version <= target)]
+    if not todo:
+        print(f"✅ Card store is at schema version {current}, nothing to migrate")
+        return 0
+
+    target_version = todo[-1].version
+    after_pos = -1
+    progress = store.get_meta(PROGRESS_KEY)
+    if progress:
+        progress_target, progress_pos = progress.split(':')
+        if int(progress_target) == target_version:
+            after_pos = int(progress_pos)
+            print(f"⏩ Resuming migration to version {target_version} after card #{after_pos + 1}")
+
+    print(f"🚀 Migrating card store from version {current} to {target_version}:")
+    for m in todo:
+        print(f"  {m.version}. {m.name}")
+
+    timings = {m.version: 0.0 for m in todo}
+    changed = {m.version: 0 for m in todo}
+    processed = 0
+    start = time.perf_counter()
+
+    for last_pos, cards in store.iter_batches(batch_size, after_pos):
+        touched = {}
+        for m in todo:
+            step_start = time.perf_counter()
+            for card in m.transform(cards):
+                touched[card['id']] = card
+                changed[m.version] += 1
+            timings[m.version] += time.perf_counter() - step_start
+
+        store.upsert_cards(touched.values(), meta={PROGRESS_KEY: f'{target_version}:{last_pos}'})
+        processed += len(cards)
+
+    store.upsert_cards([], meta={SCHEMA_VERSION_KEY: str(target_version), PROGRESS_KEY: None})
+
+    print(f"\n✅ Migrated {processed} cards to version {target_version} in {time.perf_counter() - start:.2f}s")
+    for m in todo:
+        print(f"  {m.version}. {changed[m.version]} cards changed ({timings[m.version] * 1000:.1f} ms)")
+    return len(todo)
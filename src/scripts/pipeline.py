@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner
+Runs the data scripts as a DAG of stages instead of by hand in a fixed order.
+Stages pass cards to each other in memory, starting with the web scraping
+enrichment (incremental through its fingerprint manifest). Independent
+stages (image lookup and TCGdex variant lookup) run at the same time in a
+process pool, and the output of every cached stage is kept as an Arrow
+snapshot keyed by the hash of its inputs, options and source files, so
+unchanged stages are skipped.
+
+Usage (the yuka-pipeline CLI):
+    python pipeline.py                  # run everything
+    python pipeline.py languages        # run up to a stage
+    python pipeline.py --force images   # ignore the cache for a stage
+    python pipeline.py --list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from card_store import open_store
+from cards_db_adjuster import fill_image_urls
+from checkpoint_journal import write_json_atomic
+from database_converter import REVIEW_CSV, cards_to_csv, load_cards, save_cards
+from fingerprints import FingerprintManifest
+from fix_language_bd import RULES_FILE, auto_fix_languages
+from image_mirror import add_thumbnails
+from tcgdex_client import TCGDEX_API
+from update_database import apply_manual_fixes, update_variations_from_tcgdex
+from yuka_morii_data_fetcher import ENRICH_MANIFEST, ENRICH_MAX_AGE, FETCHER_VERSION, CardEnricher
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'pipeline_cache')
+CACHE_INDEX = os.path.join(CACHE_DIR, 'index.json')
+
+
+# Stage functions - each gets its own copy of the cards it depends on
+
+def load_collection() -> List[Dict]:
+    with open_store() as store:
+        return store.all_cards()
+
+
+def enrich(cards: List[Dict], concurrent: bool = True) -> List[Dict]:
+    """Scrape variations for the cards the enrich manifest says are new, changed or stale"""
+    manifest = FingerprintManifest(ENRICH_MANIFEST, FETCHER_VERSION, ENRICH_MAX_AGE)
+    return CardEnricher().enrich_cards(cards, manifest, concurrent=concurrent)
+
+
+def find_images(cards: List[Dict]) -> List[Dict]:
+    return fill_image_urls(cards)
+
+
+def find_variants(cards: List[Dict], api_base: str = TCGDEX_API, workers: int = 8) -> List[Dict]:
+    update_variations_from_tcgdex(cards, api_base=api_base, workers=workers)
+    return cards
+
+
+def merge_lookups(with_images: List[Dict], with_variants: List[Dict]) -> List[Dict]:
+    """Variant lookup results with the image URLs found by the image lookup"""
+    image_urls = {card.get('id'): card.get('imageUrl') for card in with_images}
+    for card in with_variants:
+        if image_urls.get(card.get('id')):
+            card['imageUrl'] = image_urls[card.get('id')]
+    return with_variants
+
+
+def fix_variants(cards: List[Dict]) -> List[Dict]:
+    return apply_manual_fixes(cards)
+
+
+def fix_languages(cards: List[Dict]) -> List[Dict]:
+    return auto_fix_languages(cards)
+
+
+def mirror_images(cards: List[Dict]) -> List[Dict]:
+    return add_thumbnails(cards)
+
+
+def publish(cards: List[Dict]) -> List[Dict]:
+    """Write the cards to the card store and refresh the cards.json view"""
+    with open_store() as store:
+        store.replace_all(cards)
+        store.export_json()
+    print(f"✓ Published {len(cards)} cards")
+    return cards
+
+
+def export_review_csv(cards: List[Dict]) -> List[Dict]:
+    cards_to_csv(cards, REVIEW_CSV)
+    return cards
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name: Stage name, used on the command line
+        func: Called with the outputs of `deps` (in order) plus the stage options
+        deps: Names of the stages whose output this one consumes
+        sources: Files whose content is part of the cache key (code and rule tables)
+        cached: False for stages that read or write outside the pipeline
+    """
+    name: str
+    func: Callable[..., List[Dict]]
+    deps: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    cached: bool = True
+
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in [
+    Stage('load', load_collection, cached=False),
+    # Incremental through its own fingerprint manifest, so it runs every time and skips unchanged cards
+    Stage('enrich', enrich, ('load',), cached=False),
+    Stage('images', find_images, ('enrich',), ('cards_db_adjuster.py', 'image_resolver.py', 'html_parsing.py')),
+    Stage('variants', find_variants, ('enrich',), ('update_database.py', 'card_matcher.py', 'tcgdex_mirror.py',
+                                                    'tcgdex_languages.py')),
+    Stage('merge', merge_lookups, ('images', 'variants'), ('pipeline.py',)),
+    Stage('manual_fixes', fix_variants, ('merge',), ('update_database.py',)),
+    Stage('languages', fix_languages, ('manual_fixes',), ('fix_language_bd.py', 'card_table.py', RULES_FILE)),
+    # Keeps its own content-addressed store, so it runs every time and skips what is mirrored
+    Stage('thumbnails', mirror_images, ('languages',), cached=False),
+    Stage('publish', publish, ('thumbnails',), cached=False),
+    Stage('review_csv', export_review_csv, ('languages',), cached=False),
+]}
+
+
+@dataclass
+class StageResult:
+    output_hash: str
+    seconds: float
+    cached: bool
+    cards: Optional[List[Dict]] = None
+    path: Optional[str] = None
+
+    def load(self) -> List[Dict]:
+        if self.cards is None:
+            self.cards = load_cards(self.path)
+        return self.cards
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def cards_hash(cards: List[Dict]) -> str:
+    return _sha256(json.dumps(cards, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+
+
+def stage_key(stage: Stage, input_hashes: List[str], options: Dict) -> str:
+    """Hash of everything a stage's output depends on"""
+    sources = []
+    for source in stage.sources:
+        with open(os.path.join(CURRENT_DIR, source), 'rb') as f:
+            sources.append(_sha256(f.read()))
+    payload = [stage.name, input_hashes, sorted(options.items()), sources]
+    return _sha256(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+
+def stages_for(targets: Iterable[str]) -> List[str]:
+    """The targets and everything they depend on, in dependency order"""
+    ordered = []
+
+    def visit(name: str, path: Tuple[str, ...]):
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage: {name}")
+        if name in path:
+            raise ValueError(f"Stage cycle: {' -> '.join(path + (name,))}")
+        if name in ordered:
+            return
+        for dep in STAGES[name].deps:
+            visit(dep, path + (name,))
+        ordered.append(name)
+
+    for target in targets:
+        visit(target, ())
+    return ordered
+
+
+def _run_stage(func: Callable, inputs: List[List[Dict]], options: Dict) -> Tuple[List[Dict], float]:
+    start = time.perf_counter()
+    cards = func(*inputs, **options)
+    return cards, time.perf_counter() - start
+
+
+class PipelineRunner:
+    """
+    Schedules stages on a process pool as soon as their dependencies finish.
+
+    Args:
+        options: Extra keyword arguments per stage name, e.g. {'variants': {'workers': 4}}
+        force: Stage names to run even if their cached output is current
+        use_cache: False to run every stage
+        jobs: Worker processes
+    """
+
+    def __init__(self, options: Optional[Dict[str, Dict]] = None, force: Iterable[str] = (),
+                 use_cache: bool = True, jobs: Optional[int] = None):
+        self.options = options or {}
+        self.force = set(force)
+        self.use_cache = use_cache
+        self.jobs = jobs or min(4, os.cpu_count() or 1)
+        self.index: Dict[str, Dict] = {}
+        self.results: Dict[str, StageResult] = {}
+
+        if os.path.exists(CACHE_INDEX):
+            with open(CACHE_INDEX, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def _cached_result(self, stage: Stage, key: str) -> Optional[StageResult]:
+        entry = self.index.get(stage.name)
+        if (not stage.cached or not self.use_cache or stage.name in self.force or
+                not entry or entry['key'] != key or not os.path.exists(entry['path'])):
+            return None
+        return StageResult(entry['output_hash'], 0.0, cached=True, path=entry['path'])
+
+    def _store(self, stage: Stage, key: str, result: StageResult) -> None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = os.path.join(CACHE_DIR, f'{stage.name}.arrow')
+        save_cards(result.cards, path)
+        self.index[stage.name] = {'key': key, 'output_hash': result.output_hash, 'path': path}
+        write_json_atomic(CACHE_INDEX, self.index)
+
+    def run(self, targets: Iterable[str]) -> Dict[str, StageResult]:
+        pending = stages_for(targets)
+        print(f"🚀 Running {len(pending)} stages with {self.jobs} workers: {', '.join(pending)}")
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while pending or running:
+                # Resolve cached stages and submit the ready ones until nothing else is unblocked
+                progress = True
+                while progress:
+                    progress = False
+                    for name in list(pending):
+                        stage = STAGES[name]
+                        if any(dep not in self.results for dep in stage.deps):
+                            continue
+                        pending.remove(name)
+                        options = self.options.get(name, {})
+                        key = stage_key(stage, [self.results[dep].output_hash for dep in stage.deps], options)
+
+                        cached = self._cached_result(stage, key)
+                        if cached:
+                            print(f"♻️  {name}: inputs unchanged, using cached output")
+                            self.results[name] = cached
+                            progress = True
+                            continue
+
+                        print(f"▶️  {name}: started")
+                        inputs = [self.results[dep].load() for dep in stage.deps]
+                        running[pool.submit(_run_stage, stage.func, inputs, options)] = (stage, key)
+
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Stages can never run: {', '.join(pending)}")
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, key = running.pop(future)
+                    try:
+                        cards, seconds = future.result()
+                    except Exception:
+                        print(f"❌ {stage.name}: failed")
+                        for other in running:
+                            other.cancel()
+                        raise
+
+                    result = StageResult(cards_hash(cards), seconds, cached=False, cards=cards)
+                    if stage.cached:
+                        self._store(stage, key, result)
+                    self.results[stage.name] = result
+                    print(f"✅ {stage.name}: done in {seconds:.2f}s")
+
+        self.print_timings(time.perf_counter() - start)
+        return self.results
+
+    def print_timings(self, total: float) -> None:
+        print(f"\n{'=' * 40}")
+        for name, result in self.results.items():
+            status = 'cached' if result.cached else f'{result.seconds:.2f}s'
+            print(f"  {name:<14} {status:>10}")
+        print(f"  {'total':<14} {total:>9.2f}s")
+        print('=' * 40)
+
+
+def sink_stages() -> List[str]:
+    """Stages nothing else depends on - running them runs the whole pipeline"""
+    used = {dep for stage in STAGES.values() for dep in stage.deps}
+    return [name for name in STAGES if name not in used]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='yuka-pipeline', description='Run the card data pipeline')
+    parser.add_argument('targets', nargs='*', help='Stages to run, with their dependencies (default: all)')
+    parser.add_argument('--list', action='store_true', help='List the stages and exit')
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        help='Run a stage even if its cached output is current')
+    parser.add_argument('--no-cache', action='store_true', help='Run every stage')
+    parser.add_argument('--jobs', type=int, help='Worker processes')
+    parser.add_argument('--api-base', default=TCGDEX_API, help='TCGdex API root')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent TCGdex requests')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for stage in STAGES.values():
+            print(f"  {stage.name:<14} <- {', '.join(stage.deps) or '-'}")
+        return 0
+
+    try:
+        targets = stages_for(args.targets or sink_stages())
+    except ValueError as e:
+        parser.error(str(e))
+
+    runner = PipelineRunner(
+        options={'variants': {'api_base': args.api_base, 'workers': args.workers}},
+        force=args.force,
+        use_cache=not args.no_cache,
+        jobs=args.jobs,
+    )
+    try:
+        runner.run(targets)
+    except Exception as e:
+        print(f"❌ Pipeline failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
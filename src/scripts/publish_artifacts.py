@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Publish Artifacts
+Builds what the app downloads from the collection: minified JSON with
+pre-compressed .gz (and .br, when the brotli package is installed) variants,
+one shard per era, the search index (see search_index.py) and a small
+manifest listing every file with its content hash. File names carry the
+hash, so they can be cached forever; only manifest.json has to be
+revalidated.
+
+The app reads the manifest, renders the shard holding the first cards of the
+grid, then fetches the other eras. public/cards.json stays the indented
+source of truth the scripts read and write.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List
+
+from checkpoint_journal import write_json_atomic
+from database_converter import PUBLIC_CARDS_JSON
+from search_index import build_search_index
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PUBLIC_DIR = os.path.join(CURRENT_DIR, '..', '..', 'public')
+ARTIFACT_DIR = os.path.join(PUBLIC_DIR, 'data')
+
+
+def minify(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def era_slug(era: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', (era or 'unknown').lower()).strip('-') or 'unknown'
+
+
+def _sheet_no(card: Dict) -> int:
+    try:
+        return int(card.get('sheet_no'))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_artifact(name: str, data: bytes, out_dir: str) -> Dict:
+    """Write `<name>.<hash>.json` plus its compressed variants and describe it for the manifest"""
+    digest = content_hash(data)
+    filename = f'{name}.{digest}.json'
+    path = os.path.join(out_dir, filename)
+
+    entry = {'path': f'{os.path.basename(out_dir)}/{filename}', 'hash': digest, 'bytes': len(data)}
+    # Content-addressed, so an existing file already holds these bytes
+    if not os.path.exists(path):
+        _write(path, data)
+    if not os.path.exists(path + '.gz'):
+        _write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None and not os.path.exists(path + '.br'):
+        _write(path + '.br', brotli.compress(data, quality=11))
+
+    entry['gzip_bytes'] = os.path.getsize(path + '.gz')
+    if os.path.exists(path + '.br'):
+        entry['brotli_bytes'] = os.path.getsize(path + '.br')
+    return entry
+
+
+def build_artifacts(cards: List[Dict], out_dir: str = ARTIFACT_DIR) -> Dict:
+    """
+    Write the full minified collection and one shard per era, then the manifest.
+
+    Shards are listed in the order the grid shows them (by lowest sheet_no),
+    and `eras` keeps the collection's first-appearance order so the app can
+    rebuild the original card order. Files no longer in the manifest are removed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    by_era: Dict[str, List[Dict]] = {}
+    for card in cards:
+        by_era.setdefault(card.get('era') or '', []).append(card)
+
+    shards = []
+    for era, era_cards in by_era.items():
+        shard = write_artifact(f'era-{era_slug(era)}', minify(era_cards), out_dir)
+        shards.append({'era': era, 'count': len(era_cards), **shard})
+    first_sheet = {era: min(_sheet_no(card) for card in era_cards) for era, era_cards in by_era.items()}
+    shards.sort(key=lambda shard: first_sheet[shard['era']])
+
+    manifest = {
+        'count': len(cards),
+        'eras': list(by_era),
+        'cards': write_artifact('cards', minify(cards), out_dir),
+        'search': write_artifact('search-index', minify(build_search_index(cards)), out_dir),
+        'shards': shards,
+    }
+    manifest['version'] = content_hash(minify(manifest))
+    write_json_atomic(os.path.join(out_dir, 'manifest.json'), manifest, indent=None)
+
+    # Drop files from earlier publishes
+    keep = {os.path.basename(entry['path']) for entry in [manifest['cards'], manifest['search'], *shards]}
+    for name in os.listdir(out_dir):
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base.endswith('.json') and base != 'manifest.json' and base not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+    return manifest
+
+
+def print_summary(manifest: Dict, source_bytes: int) -> None:
+    first = manifest['shards'][0] if manifest['shards'] else None
+    compressed = 'brotli_bytes' if first and 'brotli_bytes' in first else 'gzip_bytes'
+    print(f"✓ Published {manifest['count']} cards in {len(manifest['shards'])} era shards "
+          f"(version {manifest['version']})")
+    print(f"  cards.json (indented): {source_bytes / 1024:.1f} KB")
+    print(f"  minified: {manifest['cards']['bytes'] / 1024:.1f} KB, "
+          f"{compressed.split('_')[0]}: {manifest['cards'][compressed] / 1024:.1f} KB")
+    print(f"  search index: {manifest['search']['bytes'] / 1024:.1f} KB, "
+          f"{compressed.split('_')[0]}: {manifest['search'][compressed] / 1024:.1f} KB")
+    if first:
+        print(f"  first shard ({first['era']}): {first['bytes'] / 1024:.1f} KB, "
+              f"{compressed.split('_')[0]}: {first[compressed] / 1024:.1f} KB")
+
+
+def main():
+    with open(PUBLIC_CARDS_JSON, 'r', encoding='utf-8') as f:
+        cards = json.load(f)
+
+    manifest = build_artifacts(cards)
+    print_summary(manifest, os.path.getsize(PUBLIC_CARDS_JSON))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Search Index
+Compact search and facet index over the collection, published next to the
+card shards so filtering and search are index lookups instead of scans over
+every card.
+
+Cards are numbered by their position in `ids` (collection order):
+    tokens:   sorted [word, postings] pairs from name and set, for prefix
+              search by binary search over the words, and substring search
+              by a scan over the words (query words hold no spaces, so a
+              substring always falls within one word)
+    facets:   {facet: {value: bitset}} for era, set, variation_type,
+              language (available languages) and status (yes/ordered/no,
+              as the app computes it from the published counts)
+Postings are delta-encoded sorted positions. Bitsets are base64 of a
+little-endian bit array where bit i is card i.
+"""
+
+import base64
+import json
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from card_matcher import normalize_name
+
+INDEX_VERSION = 2
+FACETS = ('era', 'set', 'variation_type', 'language', 'status')
+
+
+def card_status(card: Dict) -> str:
+    """'yes' if any variation is owned, 'ordered' if none is but one is ordered, else 'no'"""
+    variations = card.get('variations')
+    if not isinstance(variations, dict) or not variations:
+        return 'no'
+    values = [v for v in variations.values() if isinstance(v, dict)]
+    if any((v.get('count') or 0) > 0 for v in values):
+        return 'yes'
+    if any(v.get('ordered') is True for v in values):
+        return 'ordered'
+    return 'no'
+
+
+def encode_bitset(positions: Iterable[int], size: int) -> str:
+    bits = 0
+    for pos in positions:
+        bits |= 1 << pos
+    return base64.b64encode(bits.to_bytes((size + 7) // 8, 'little')).decode('ascii')
+
+
+def decode_bitset(data: str) -> int:
+    return int.from_bytes(base64.b64decode(data), 'little')
+
+
+def encode_postings(positions: Iterable[int]) -> List[int]:
+    previous, deltas = 0, []
+    for pos in sorted(positions):
+        deltas.append(pos - previous)
+        previous = pos
+    return deltas
+
+
+def decode_postings(deltas: List[int]) -> int:
+    """Postings as a bitset (int), so they combine with facets by & and |"""
+    bits, pos = 0, 0
+    for delta in deltas:
+        pos += delta
+        bits |= 1 << pos
+    return bits
+
+
+def build_search_index(cards: List[Dict]) -> Dict:
+    tokens = defaultdict(set)
+    facets = {facet: defaultdict(set) for facet in FACETS}
+
+    for pos, card in enumerate(cards):
+        text = normalize_name(f"{card.get('name', '')} {card.get('set', '')}")
+        for word in text.split():
+            tokens[word].add(pos)
+
+        facets['era'][card.get('era') or ''].add(pos)
+        facets['set'][card.get('set') or ''].add(pos)
+        facets['status'][card_status(card)].add(pos)
+        variations = card.get('variations')
+        for variation_type, variation in (variations.items() if isinstance(variations, dict) else []):
+            facets['variation_type'][variation_type].add(pos)
+            for language in (variation.get('available_languages') or [] if isinstance(variation, dict) else []):
+                facets['language'][language].add(pos)
+
+    return {
+        'version': INDEX_VERSION,
+        'size': len(cards),
+        'ids': [card.get('id') for card in cards],
+        'tokens': [[word, encode_postings(tokens[word])] for word in sorted(tokens)],
+        'facets': {facet: {value: encode_bitset(positions, len(cards)) for value, positions in values.items()}
+                   for facet, values in facets.items()},
+    }
+
+
+class SearchIndex:
+    """Reads a built index and answers queries with bitset operations (bit i = card i)"""
+
+    def __init__(self, data: Dict):
+        self.size = data['size']
+        self.ids = data['ids']
+        self.all = (1 << self.size) - 1
+        self._words = [word for word, _ in data['tokens']]
+        self._word_postings = [postings for _, postings in data['tokens']]
+        self.facets = {facet: {value: decode_bitset(bits) for value, bits in values.items()}
+                       for facet, values in data['facets'].items()}
+        self._memo: Dict[str, int] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'SearchIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def _prefix(self, prefix: str) -> int:
+        """Cards with a name/set word starting with `prefix`"""
+        bits = 0
+        i = bisect_left(self._words, prefix)
+        while i < len(self._words) and self._words[i].startswith(prefix):
+            bits |= decode_postings(self._word_postings[i])
+            i += 1
+        return bits
+
+    def _substring(self, text: str) -> int:
+        """Cards with a name/set word containing `text`"""
+        bits = 0
+        for word, postings in zip(self._words, self._word_postings):
+            if text in word:
+                bits |= decode_postings(postings)
+        return bits
+
+    def search(self, query: str) -> int:
+        """
+        Cards matching every word of the query: short words by word prefix,
+        longer ones by prefix or substring match.
+        """
+        words = normalize_name(query).split()
+        bits = self.all
+        for word in words:
+            if word not in self._memo:
+                match = self._prefix(word)
+                if len(word) >= 3:
+                    match |= self._substring(word)
+                self._memo[word] = match
+            bits &= self._memo[word]
+        return bits
+
+    def filter(self, query: Optional[str] = None, **selected: Iterable[str]) -> int:
+        """
+        Cards matching the query and every selected facet; values within one
+        facet are alternatives, e.g. filter(era=['EX', 'Neo'], status=['no'])
+        """
+        bits = self.search(query) if query else self.all
+        for facet, values in selected.items():
+            facet_bits = 0
+            for value in values:
+                facet_bits |= self.facets[facet].get(value, 0)
+            bits &= facet_bits
+        return bits
+
+    def facet_counts(self, facet: str, within: Optional[int] = None) -> Dict[str, int]:
+        """Number of cards per value of `facet` among the cards in `within` (default: all)"""
+        within = self.all if within is None else within
+        return {value: (bits & within).bit_count() for value, bits in self.facets[facet].items()}
+
+    def card_ids(self, bits: int) -> List[str]:
+        return [card_id for pos, card_id in enumerate(self.ids) if bits >> pos & 1]
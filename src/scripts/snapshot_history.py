@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Snapshot History
+Content-addressed history of the collection, instead of full hand-made
+copies of cards.json. Every card version is stored once, as a blob named by
+the hash of its JSON, and a snapshot only records what changed since its
+parent: {id: hash} of changed and added cards, the ids of removed cards and
+the card order when it changed. Every CHECKPOINT_EVERY snapshots one lists
+every card, so no lookup walks a long chain. Storage grows with the amount
+of change, not with the number of snapshots times the collection size.
+
+Diffs are keyed by card id and compare per-card hashes, so only cards whose
+hash differs are loaded and compared field by field. Between a snapshot and
+one of its ancestors, only the ids touched by the snapshots in between are
+looked at. Single cards can be rolled back to their version in any snapshot,
+or have the change between two snapshots cherry-picked onto the collection.
+
+Usage:
+    python snapshot_history.py import-legacy            # the copies in src/data/json, oldest first
+    python snapshot_history.py snapshot -m "before TCGdex update"
+    python snapshot_history.py log
+    python snapshot_history.py diff cards_final current [--card ex11-30]
+    python snapshot_history.py rollback cards_final ex11-30 neo1-12
+    python snapshot_history.py cherry-pick cards_bk_2 cards_final ex11-30
+
+Snapshots are referred to by name, id (or an id prefix), HEAD (the latest)
+or `current` (the card store, not stored).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from card_store import open_store
+from publish_artifacts import content_hash
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_DB = os.path.join(CURRENT_DIR, '..', 'data', 'history.sqlite')
+LEGACY_DIR = os.path.join(CURRENT_DIR, '..', 'data', 'json')
+
+# Oldest first: cards_bk predates variations, cards.json is the last copy
+LEGACY_SNAPSHOTS = ('cards_bk.json', 'cards_bk_2.json', 'cards_updated.json', 'cards_final.json', 'cards.json')
+CHECKPOINT_EVERY = 16
+CURRENT = 'current'
+
+
+def card_bytes(card: Dict) -> bytes:
+    """A card's canonical form: compact JSON in its own key order"""
+    return json.dumps(card, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def version_hash(card: Dict) -> str:
+    return content_hash(card_bytes(card))
+
+
+@dataclass
+class State:
+    """
+    A collection as its card order and {card id: version hash}. Versions that
+    are not in the object store (the working collection) are kept in `cards`.
+    """
+    order: List[str]
+    hashes: Dict[str, str]
+    cards: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, cards: List[Dict]) -> 'State':
+        hashes, versions = {}, {}
+        for card in cards:
+            digest = version_hash(card)
+            hashes[card.get('id')] = digest
+            versions[digest] = card
+        return cls(list(hashes), hashes, versions)
+
+
+@dataclass
+class FieldChange:
+    """One changed value inside a card; path is the chain of keys leading to it"""
+    path: Tuple[str, ...]
+    old: Any = None
+    new: Any = None
+    kind: str = 'changed'  # 'added', 'removed' or 'changed'
+
+    def __str__(self) -> str:
+        where = '.'.join(self.path) or '(card)'
+        if self.kind == 'added':
+            return f'+ {where}: {json.dumps(self.new, ensure_ascii=False)}'
+        if self.kind == 'removed':
+            return f'- {where}: {json.dumps(self.old, ensure_ascii=False)}'
+        return f'~ {where}: {json.dumps(self.old, ensure_ascii=False)} → {json.dumps(self.new, ensure_ascii=False)}'
+
+
+def diff_values(old: Any, new: Any, path: Tuple[str, ...] = ()) -> List[FieldChange]:
+    """Structural diff of two JSON values; dicts are compared key by key, anything else as a whole"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key, value in old.items():
+            if key not in new:
+                changes.append(FieldChange((*path, key), old=value, kind='removed'))
+            elif value != new[key]:
+                changes.extend(diff_values(value, new[key], (*path, key)))
+        changes.extend(FieldChange((*path, key), new=value, kind='added') for key, value in new.items() if key not in old)
+        return changes
+    return [] if old == new else [FieldChange(path, old, new)]
+
+
+@dataclass
+class SnapshotDiff:
+    """Cards added, removed and changed (with their field changes) between two states, by card id"""
+    added: Dict[str, Dict] = field(default_factory=dict)
+    removed: Dict[str, Dict] = field(default_factory=dict)
+    changed: Dict[str, List[FieldChange]] = field(default_factory=dict)
+    reordered: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.reordered)
+
+    @property
+    def card_ids(self) -> List[str]:
+        return [*self.added, *self.removed, *self.changed]
+
+    def print(self) -> None:
+        for card_id, card in self.added.items():
+            print(f"➕ {card_id} ({card.get('name', '')})")
+        for card_id, card in self.removed.items():
+            print(f"➖ {card_id} ({card.get('name', '')})")
+        for card_id, changes in self.changed.items():
+            print(f"✏️  {card_id}")
+            for change in changes:
+                print(f"    {change}")
+        if self.reordered:
+            print("↕️  Card order changed")
+        print(f"\n📊 {len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed")
+
+
+Ref = Union[str, State]
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT UNIQUE,
+    parent TEXT,
+    created_at TEXT NOT NULL,
+    message TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    manifest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    name TEXT PRIMARY KEY,
+    snapshot TEXT NOT NULL
+);
+'''
+
+
+class SnapshotHistory:
+    """
+    Snapshot store in SQLite:
+        objects     one row per card version (zlib-compressed compact JSON), keyed by hash
+        snapshots   one row per snapshot with its manifest, in creation order
+        tags        extra names of snapshots, for names given when nothing had changed
+
+    A manifest holds `cards` ({id: hash}) and `removed` relative to its
+    parent, and `order` only when the order is not the parent's (minus
+    removed cards, plus added cards at the end). Checkpoint manifests
+    (`base`) list every card and keep the ids their delta touched in `touched`.
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self._manifests: Dict[str, Dict] = {}
+        self._states: Dict[str, State] = {}
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def index(self) -> List[Dict]:
+        """[{id, name, tags, parent, created_at, message, count}], oldest first"""
+        tags: Dict[str, List[str]] = {}
+        for row in self.db.execute('SELECT name, snapshot FROM tags ORDER BY rowid'):
+            tags.setdefault(row['snapshot'], []).append(row['name'])
+        return [{**dict(row), 'tags': tags.get(row['id'], [])} for row in self.db.execute(
+            'SELECT id, name, parent, created_at, message, count FROM snapshots ORDER BY seq')]
+
+    def names(self) -> Set[str]:
+        """Every snapshot name and tag"""
+        return ({row['name'] for row in self.db.execute('SELECT name FROM snapshots WHERE name IS NOT NULL')} |
+                {row['name'] for row in self.db.execute('SELECT name FROM tags')})
+
+    # Objects
+
+    def _put(self, data: bytes) -> str:
+        digest = content_hash(data)
+        self.db.execute('INSERT OR IGNORE INTO objects VALUES (?, ?)', (digest, zlib.compress(data, 9)))
+        return digest
+
+    def put_card(self, card: Dict) -> str:
+        """Store a card version (once) and return its hash"""
+        with self.db:
+            return self._put(card_bytes(card))
+
+    def get_card(self, digest: str, state: Optional[State] = None) -> Dict:
+        if state is not None and digest in state.cards:
+            return state.cards[digest]
+        row = self.db.execute('SELECT data FROM objects WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f'Card version {digest} is not in the history')
+        return json.loads(zlib.decompress(row['data']))
+
+    # Snapshots
+
+    def resolve(self, ref: str) -> str:
+        """Snapshot id for a name, id, id prefix or HEAD"""
+        if ref == 'HEAD':
+            row = self.db.execute('SELECT id FROM snapshots ORDER BY seq DESC LIMIT 1').fetchone()
+            if row is None:
+                raise KeyError('No snapshots yet')
+            return row['id']
+        row = self.db.execute('SELECT id FROM snapshots WHERE id = ? OR name = ?', (ref, ref)).fetchone()
+        if row:
+            return row['id']
+        row = self.db.execute('SELECT snapshot FROM tags WHERE name = ?', (ref,)).fetchone()
+        if row:
+            return row['snapshot']
+        matches = [row['id'] for row in self.db.execute(
+            "SELECT id FROM snapshots WHERE id LIKE ? || '%'", (ref,))]
+        if len(matches) == 1:
+            return matches[0]
+        raise KeyError(f"Unknown snapshot '{ref}'" if not matches else f"Ambiguous snapshot id '{ref}'")
+
+    def manifest(self, snapshot_id: str) -> Dict:
+        if snapshot_id not in self._manifests:
+            row = self.db.execute('SELECT manifest FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+            self._manifests[snapshot_id] = json.loads(row['manifest'])
+        return self._manifests[snapshot_id]
+
+    def state(self, ref: Ref) -> State:
+        """The full state of a snapshot, rebuilt from its nearest checkpoint"""
+        if isinstance(ref, State):
+            return ref
+        snapshot_id = self.resolve(ref)
+        if snapshot_id in self._states:
+            return self._states[snapshot_id]
+
+        manifest = self.manifest(snapshot_id)
+        if manifest['base']:
+            state = State(list(manifest['order']), dict(manifest['cards']))
+        else:
+            parent = self.state(manifest['parent'])
+            hashes = dict(parent.hashes)
+            for card_id in manifest['removed']:
+                del hashes[card_id]
+            hashes.update(manifest['cards'])
+            order = manifest['order'] or ([card_id for card_id in parent.order if card_id in hashes] +
+                                          [card_id for card_id in manifest['cards'] if card_id not in parent.hashes])
+            state = State(order, hashes)
+        self._states[snapshot_id] = state
+        return state
+
+    def lookup(self, ref: str, card_id: str) -> Optional[str]:
+        """The hash of one card in a snapshot (None if absent), walking back to the nearest checkpoint"""
+        manifest = self.manifest(self.resolve(ref))
+        while True:
+            if card_id in manifest['cards']:
+                return manifest['cards'][card_id]
+            if manifest['base'] or card_id in manifest['removed']:
+                return None
+            manifest = self.manifest(manifest['parent'])
+
+    def _chain(self, snapshot_id: str) -> List[str]:
+        """The snapshot and its ancestors, newest first"""
+        chain = []
+        while snapshot_id:
+            chain.append(snapshot_id)
+            snapshot_id = self.manifest(snapshot_id)['parent']
+        return chain
+
+    def _touched(self, snapshot_id: str) -> Iterable[str]:
+        manifest = self.manifest(snapshot_id)
+        return manifest['touched'] if manifest['base'] else [*manifest['cards'], *manifest['removed']]
+
+    def _touched_between(self, a: Ref, b: Ref) -> Optional[Tuple[Set[str], bool]]:
+        """
+        When one snapshot descends from the other: the card ids touched in
+        between and whether any step set an explicit order. None otherwise.
+        """
+        if isinstance(a, State) or isinstance(b, State):
+            return None
+        a_id, b_id = self.resolve(a), self.resolve(b)
+        for older, newer in ((a_id, b_id), (b_id, a_id)):
+            chain = self._chain(newer)
+            if older in chain:
+                steps = chain[:chain.index(older)]
+                touched = {card_id for step in steps for card_id in self._touched(step)}
+                return touched, any(self.manifest(step)['order'] for step in steps)
+        return None
+
+    def snapshot(self, cards: List[Dict], name: Optional[str] = None, message: str = '') -> str:
+        """
+        Record the collection as a new snapshot, storing only card versions
+        that are not stored yet. Returns the snapshot id. If nothing changed,
+        no snapshot is added: the latest one's id is returned, and `name` is
+        recorded on it as a tag.
+        """
+        if name and name in self.names():
+            raise ValueError(f"A snapshot named '{name}' already exists")
+
+        state = State.of(cards)
+        head = self.db.execute('SELECT id FROM snapshots ORDER BY seq DESC LIMIT 1').fetchone()
+        parent_id = head['id'] if head else None
+        parent = self.state(parent_id) if parent_id else State([], {})
+
+        delta = {card_id: digest for card_id, digest in state.hashes.items() if parent.hashes.get(card_id) != digest}
+        removed = [card_id for card_id in parent.order if card_id not in state.hashes]
+        expected_order = ([card_id for card_id in parent.order if card_id in state.hashes] +
+                          [card_id for card_id in delta if card_id not in parent.hashes])
+        if parent_id and not delta and not removed and state.order == expected_order:
+            if name:
+                with self.db:
+                    self.db.execute('INSERT INTO tags VALUES (?, ?)', (name, parent_id))
+                print(f"✓ Nothing changed since the latest snapshot, tagged {parent_id} as '{name}'")
+            else:
+                print("✓ Nothing changed since the latest snapshot")
+            return parent_id
+
+        depth = self.manifest(parent_id)['depth'] + 1 if parent_id else 0
+        base = parent_id is None or depth >= CHECKPOINT_EVERY
+        manifest = {
+            'parent': parent_id,
+            'base': base,
+            'depth': 0 if base else depth,
+            'cards': state.hashes if base else delta,
+            'removed': [] if base else removed,
+            'order': state.order if base or state.order != expected_order else None,
+        }
+        if base:
+            manifest['touched'] = [*delta, *removed]
+        snapshot_id = content_hash(json.dumps(manifest, sort_keys=True).encode('utf-8'))
+        manifest['id'] = snapshot_id
+
+        # The new versions and the snapshot commit together
+        with self.db:
+            for card_id in delta:
+                self._put(card_bytes(state.cards[state.hashes[card_id]]))
+            self.db.execute(
+                'INSERT INTO snapshots (id, name, parent, created_at, message, count, manifest) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (snapshot_id, name, parent_id, time.strftime('%Y-%m-%dT%H:%M:%S'), message, len(state.hashes),
+                 json.dumps(manifest, ensure_ascii=False, separators=(',', ':'))))
+        self._manifests[snapshot_id] = manifest
+        self._states[snapshot_id] = State(state.order, state.hashes)
+
+        print(f"📸 Snapshot {snapshot_id}{f' ({name})' if name else ''}: "
+              f"{len(delta)} cards changed, {len(removed)} removed")
+        return snapshot_id
+
+    def version(self, ref: Ref, card_id: str) -> Optional[Dict]:
+        """A card as it was in a snapshot, or None if it was not there"""
+        digest = ref.hashes.get(card_id) if isinstance(ref, State) else self.lookup(ref, card_id)
+        return self.get_card(digest, ref if isinstance(ref, State) else None) if digest else None
+
+    def diff(self, a: Ref, b: Ref, card_ids: Optional[Iterable[str]] = None) -> SnapshotDiff:
+        """
+        What changed from `a` to `b`, optionally only for some cards. Only
+        cards whose hashes differ are loaded.
+        """
+        between = self._touched_between(a, b)
+        if between is not None:
+            candidates, reordered = between
+            hash_a, hash_b = (lambda card_id: self.lookup(a, card_id)), (lambda card_id: self.lookup(b, card_id))
+            if reordered:
+                reordered = self._reordered(self.state(a), self.state(b))
+        else:
+            state_a, state_b = self.state(a), self.state(b)
+            candidates = set(state_a.hashes) | set(state_b.hashes)
+            hash_a, hash_b = state_a.hashes.get, state_b.hashes.get
+            reordered = self._reordered(state_a, state_b)
+        if card_ids is not None:
+            candidates = set(card_ids) & candidates
+
+        result = SnapshotDiff(reordered=reordered)
+        state_a, state_b = (a if isinstance(a, State) else None), (b if isinstance(b, State) else None)
+        for card_id in sorted(candidates):
+            old, new = hash_a(card_id), hash_b(card_id)
+            if old == new:
+                continue
+            if old is None:
+                result.added[card_id] = self.get_card(new, state_b)
+            elif new is None:
+                result.removed[card_id] = self.get_card(old, state_a)
+            else:
+                result.changed[card_id] = diff_values(self.get_card(old, state_a), self.get_card(new, state_b))
+        return result
+
+    @staticmethod
+    def _reordered(a: State, b: State) -> bool:
+        """True if the cards both states hold are not in the same relative order"""
+        return ([card_id for card_id in a.order if card_id in b.hashes] !=
+                [card_id for card_id in b.order if card_id in a.hashes])
+
+    # Applying changes
+
+    def rollback(self, cards: List[Dict], ref: Ref, card_ids: Iterable[str]) -> List[str]:
+        """
+        Put the given cards back to their version in `ref` (in place). Cards
+        that were not in the snapshot are removed; cards that are gone are
+        added back at the end. Returns the ids that changed.
+        """
+        changed = []
+        for card_id in dict.fromkeys(card_ids):
+            if _set_version(cards, card_id, self.version(ref, card_id)):
+                changed.append(card_id)
+        return changed
+
+    def cherry_pick(self, cards: List[Dict], a: Ref, b: Ref, card_ids: Optional[Iterable[str]] = None,
+                    force: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Apply the changes from `a` to `b` of the given cards (all by default)
+        onto `cards` (in place). A card that changed since `a` in the
+        collection is a conflict and is left alone unless force=True.
+
+        Returns:
+            (applied card ids, conflicting card ids)
+        """
+        current = {card.get('id'): version_hash(card) for card in cards}
+        applied, conflicts = [], []
+        for card_id in self.diff(a, b, card_ids).card_ids:
+            new = self.version(b, card_id)
+            if current.get(card_id) == (version_hash(new) if new else None):
+                continue
+            old = self.version(a, card_id)
+            if current.get(card_id) != (version_hash(old) if old else None) and not force:
+                conflicts.append(card_id)
+                continue
+            _set_version(cards, card_id, new)
+            applied.append(card_id)
+        return applied, conflicts
+
+    def log(self) -> List[Dict]:
+        return list(reversed(self.index))
+
+
+def _set_version(cards: List[Dict], card_id: str, version: Optional[Dict]) -> bool:
+    """Replace, add or (for version None) remove one card in the list; True if anything changed"""
+    for pos, card in enumerate(cards):
+        if card.get('id') == card_id:
+            if version is None:
+                del cards[pos]
+                return True
+            if card == version:
+                return False
+            cards[pos] = version
+            return True
+    if version is None:
+        return False
+    cards.append(version)
+    return True
+
+
+def save_to_store(store, cards: List[Dict], changed_ids: List[str]) -> None:
+    """Write the changed cards back and refresh cards.json; removals need a full rewrite"""
+    by_id = {card.get('id'): card for card in cards}
+    if all(card_id in by_id for card_id in changed_ids):
+        store.upsert_cards([by_id[card_id] for card_id in changed_ids])
+    else:
+        store.replace_all(cards)
+    store.export_json()
+
+
+def import_legacy(history: SnapshotHistory, directory: str = LEGACY_DIR) -> List[str]:
+    """Record the hand-made copies in src/data/json as snapshots named after them, oldest first"""
+    known = history.names()
+    ids = []
+    for filename in LEGACY_SNAPSHOTS:
+        name = os.path.splitext(filename)[0]
+        path = os.path.join(directory, filename)
+        if name in known or not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            ids.append(history.snapshot(json.load(f), name=name, message=f'Imported from src/data/json/{filename}'))
+    return ids
+
+
+def _ref(history: SnapshotHistory, ref: str, store) -> Ref:
+    return State.of(store.all_cards()) if ref == CURRENT else ref
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Snapshot history of the collection')
+    parser.add_argument('--db', default=HISTORY_DB, help='History database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    snapshot = commands.add_parser('snapshot', help='Record the card store as a snapshot')
+    snapshot.add_argument('--name')
+    snapshot.add_argument('-m', '--message', default='')
+
+    commands.add_parser('import-legacy', help='Import the copies in src/data/json')
+    commands.add_parser('log', help='List snapshots, newest first')
+
+    diff = commands.add_parser('diff', help='Show what changed between two snapshots')
+    diff.add_argument('a')
+    diff.add_argument('b', nargs='?', default=CURRENT)
+    diff.add_argument('--card', action='append', dest='cards', help='Only this card (repeatable)')
+
+    rollback = commands.add_parser('rollback', help='Put cards back to their version in a snapshot')
+    rollback.add_argument('snapshot')
+    rollback.add_argument('card_ids', nargs='+')
+
+    pick = commands.add_parser('cherry-pick', help='Apply the changes of cards between two snapshots')
+    pick.add_argument('a')
+    pick.add_argument('b')
+    pick.add_argument('card_ids', nargs='*', help='Default: every changed card')
+    pick.add_argument('--force', action='store_true', help='Apply even to cards changed since A')
+
+    args = parser.parse_args(argv)
+    history = SnapshotHistory(args.db)
+
+    if args.command == 'import-legacy':
+        ids = import_legacy(history)
+        print(f"✅ Imported {len(ids)} snapshots")
+        return 0
+
+    if args.command == 'log':
+        for entry in history.log():
+            print(f"{entry['id']}  {entry['created_at']}  {entry['count']:>4} cards  "
+                  f"{', '.join(filter(None, [entry['name'], *entry['tags']])) or '-'}  {entry['message']}")
+        return 0
+
+    try:
+        with open_store() as store:
+            if args.command == 'snapshot':
+                history.snapshot(store.all_cards(), name=args.name, message=args.message)
+
+            elif args.command == 'diff':
+                history.diff(_ref(history, args.a, store), _ref(history, args.b, store), args.cards).print()
+
+            else:
+                cards = store.all_cards()
+                # The collection as it is now, so the change can itself be undone
+                history.snapshot(cards, message=f'Before {args.command}')
+                if args.command == 'rollback':
+                    changed = history.rollback(cards, args.snapshot, args.card_ids)
+                    description = f'Rolled back {", ".join(changed)} to {args.snapshot}'
+                else:
+                    changed, conflicts = history.cherry_pick(cards, args.a, args.b, args.card_ids or None,
+                                                             force=args.force)
+                    for card_id in conflicts:
+                        print(f"  ⚠️ {card_id} changed since {args.a}, skipped (use --force to apply)")
+                    description = f'Cherry-picked {", ".join(changed)} from {args.a}..{args.b}'
+
+                if not changed:
+                    print("✓ Nothing to change")
+                    return 0
+                save_to_store(store, cards, changed)
+                history.snapshot(cards, message=description)
+                print(f"✅ {description}")
+    except (KeyError, ValueError) as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
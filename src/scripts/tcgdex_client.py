@@ -0,0 +1,72 @@
+"""
+TCGdex Client
+Pooled keep-alive session and batched card detail fetching for the TCGdex API.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import CachedSession
+from instrumentation import instrument_session
+
+TCGDEX_API = 'https://api.tcgdex.net/v2'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def make_session(pool_size: int = 8, retries: int = 4, backoff: float = 0.5,
+                 cached: bool = True) -> requests.Session:
+    """
+    Create a session (cached unless cached=False) whose connection pool fits
+    `pool_size` workers.
+
+    Failed requests on 429/5xx are retried with exponential backoff,
+    honouring Retry-After when the server sends it.
+    """
+    session = CachedSession() if cached else requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return instrument_session(session)
+
+
+def fetch_card_details(session: requests.Session, card_ids: Iterable[str], lang: str = 'en',
+                       api_base: str = TCGDEX_API, workers: int = 8) -> Dict[str, Optional[Dict]]:
+    """
+    Fetch /cards/{id} for every distinct id using a bounded thread pool.
+
+    Args:
+        session: Session from make_session()
+        card_ids: TCGdex card ids, duplicates are fetched once
+        lang: Catalog language
+        api_base: API root, override to point at a mock server
+        workers: Number of concurrent requests
+
+    Returns:
+        Dict mapping each id to its detail JSON, or None if the fetch failed
+    """
+    unique_ids = list(dict.fromkeys(card_ids))
+
+    def fetch(card_id: str) -> Optional[Dict]:
+        try:
+            response = session.get(f'{api_base}/{lang}/cards/{quote(card_id)}', timeout=15)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"  ⚠️ Error fetching details for {card_id}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(unique_ids, pool.map(fetch, unique_ids)))
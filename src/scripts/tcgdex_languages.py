@@ -0,0 +1,165 @@
+"""
+TCGdex Language Availability
+Works out which languages each card variation was printed in from TCGdex's
+own catalogs instead of guessing it from the set. The English and Japanese
+Yuka Morii card lists are fetched concurrently over one pooled session, the
+sets they touch are synced into the local TCGdex mirror (one language per
+thread, so each catalog is cached and only changed sets are refetched), and
+the catalogs are joined by set id and card number: a variation is available
+in a language when that language's copy of the card has the variant.
+
+Japanese sets have their own ids (SV2a for sv03.5), so the join goes through
+the set aliases in src/data/json/tcgdex_set_aliases.json. Languages whose
+catalog does not hold the card's set at all are unknown, and keep the guess
+build_variations() makes for them.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import requests
+
+from card_matcher import normalize_number
+from tcgdex_client import TCGDEX_API
+from tcgdex_mirror import MIRROR_DB, TcgdexMirror, set_id_of
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SET_ALIASES_FILE = os.path.join(CURRENT_DIR, '..', 'data', 'json', 'tcgdex_set_aliases.json')
+
+ILLUSTRATOR = 'Yuka Morii'
+
+# TCGdex language -> the collection's language code
+LANGUAGE_CODES = {'en': 'EN', 'ja': 'JP'}
+DEFAULT_LANGUAGES = ('en', 'ja')
+
+# Collection variation type -> TCGdex variant field
+VARIATION_VARIANTS = {
+    'normal': 'normal',
+    'reverse_holo': 'reverse',
+    'first_edition': 'firstEdition',
+    'holo': 'holo',
+}
+
+# Written on variations whose every language came from the catalogs, so the rule-based fix-up leaves them alone
+LANGUAGES_SOURCE = 'tcgdex'
+
+
+def fetch_illustrator_cards(session: requests.Session, lang: str = 'en',
+                            api_base: str = TCGDEX_API) -> List[Dict]:
+    """The card briefs TCGdex credits to Yuka Morii in one language (empty if it has none)"""
+    response = session.get(f'{api_base}/{lang}/illustrators/{ILLUSTRATOR}', timeout=30)
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return response.json().get('cards', [])
+
+
+def sync_catalog(session: requests.Session, lang: str, api_base: str = TCGDEX_API,
+                 path: str = MIRROR_DB, workers: int = 4) -> List[Dict]:
+    """Fetch one language's card list and sync the sets it touches into the mirror; returns the briefs"""
+    briefs = fetch_illustrator_cards(session, lang, api_base)
+    print(f"✅ Found {len(briefs)} {lang} cards from TCGdex")
+    # Opened in this thread: a sqlite connection stays with the thread that made it
+    with TcgdexMirror(path, lang=lang) as mirror:
+        mirror.sync(session, (set_id_of(brief) for brief in briefs), api_base=api_base, workers=workers)
+    return briefs
+
+
+def sync_catalogs(session: requests.Session, languages: Sequence[str] = DEFAULT_LANGUAGES,
+                  api_base: str = TCGDEX_API, path: str = MIRROR_DB, workers: int = 4) -> Dict[str, List[Dict]]:
+    """
+    Sync every language's catalog at the same time, sharing the session's
+    connection pool. The first language is required; a failure in any other
+    one only leaves that language unknown.
+    """
+    with ThreadPoolExecutor(max_workers=len(languages)) as pool:
+        futures = {lang: pool.submit(sync_catalog, session, lang, api_base, path, workers) for lang in languages}
+
+        catalogs = {}
+        for lang, future in futures.items():
+            try:
+                catalogs[lang] = future.result()
+            except Exception as e:
+                if lang == languages[0]:
+                    raise
+                print(f"  ⚠️ Could not sync the {lang} catalog, its languages stay guessed: {e}")
+                catalogs[lang] = []
+        return catalogs
+
+
+def load_set_aliases(path: str = SET_ALIASES_FILE) -> Dict[str, Dict[str, str]]:
+    """{lang: {English set id: that language's set id}}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['aliases']
+
+
+class LanguageAvailability:
+    """Per-variation language availability joined from the mirrored catalogs"""
+
+    def __init__(self, indexes: Dict[str, Dict[Tuple[str, str], Set[str]]], set_ids: Dict[str, Set[str]],
+                 set_aliases: Optional[Dict[str, Dict[str, str]]] = None):
+        """
+        Args:
+            indexes: {lang: {(set id, local id): variants}}
+            set_ids: {lang: ids of the sets whose cards are all in the index}
+            set_aliases: {lang: {English set id: that language's set id}}
+        """
+        self.indexes = {lang: {(set_id, normalize_number(local_id)): variants
+                               for (set_id, local_id), variants in index.items()}
+                        for lang, index in indexes.items()}
+        self.set_ids = set_ids
+        self.set_aliases = set_aliases or {}
+
+    @classmethod
+    def from_mirror(cls, path: str = MIRROR_DB, languages: Iterable[str] = DEFAULT_LANGUAGES,
+                    set_aliases: Optional[Dict[str, Dict[str, str]]] = None) -> 'LanguageAvailability':
+        """Join the mirrored catalogs, through the shipped set aliases unless `set_aliases` is given"""
+        if set_aliases is None:
+            set_aliases = load_set_aliases()
+        indexes, set_ids = {}, {}
+        for lang in languages:
+            with TcgdexMirror(path, lang=lang) as mirror:
+                indexes[lang], set_ids[lang] = mirror.variant_index()
+        return cls(indexes, set_ids, set_aliases)
+
+    def resolve(self, detail: Dict) -> Dict[str, Dict[str, Optional[bool]]]:
+        """
+        {variation type: {language code: True/False, or None when unknown}}
+        for a TCGdex card detail
+        """
+        set_id = (detail.get('set') or {}).get('id', '')
+        number = normalize_number(detail.get('localId', ''))
+
+        known = {variation_type: {} for variation_type in VARIATION_VARIANTS}
+        for lang, index in self.indexes.items():
+            code = LANGUAGE_CODES.get(lang, lang.upper())
+            lang_set = self.set_aliases.get(lang, {}).get(set_id, set_id)
+            if lang_set in self.set_ids.get(lang, ()):
+                # A card missing from a mirrored set was not printed in that language
+                variants = index.get((lang_set, number), set())
+                for variation_type, variant in VARIATION_VARIANTS.items():
+                    known[variation_type][code] = variant in variants
+            else:
+                for variation_type in VARIATION_VARIANTS:
+                    known[variation_type][code] = None
+        return known
+
+
+def available_languages(known: Optional[Dict[str, Optional[bool]]], guessed: List[str]) -> Tuple[List[str], bool]:
+    """
+    The variation's available languages: the catalogs' answer for the
+    languages they know, the guess for the rest. Returns (languages, True if
+    every language came from the catalogs).
+    """
+    if not known:
+        return guessed, False
+
+    codes = list(dict.fromkeys([*known, *guessed]))
+    languages = [code for code in codes if known.get(code) or (known.get(code) is None and code in guessed)]
+    verified = all(known.get(code) is not None for code in codes)
+    # Nothing printed anywhere means the catalogs disagree with the variant itself; keep the guess
+    if not languages:
+        return guessed, False
+    return languages, verified
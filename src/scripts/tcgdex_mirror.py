@@ -0,0 +1,207 @@
+"""
+TCGdex Mirror
+Local SQLite copy of the TCGdex sets, cards and variants the collection
+touches. Each set is fetched whole with one GraphQL query instead of one
+/cards/{id} request per card, and later syncs only refetch sets whose card
+count changed, so variants are resolved with local queries.
+"""
+
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import requests
+
+from tcgdex_client import TCGDEX_API
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIRROR_DB = os.path.join(CURRENT_DIR, '..', 'data', 'tcgdex_mirror.sqlite')
+
+VARIANT_FIELDS = ('normal', 'reverse', 'holo', 'firstEdition')
+
+SET_QUERY = '''
+query ($id: ID!) {
+  set(id: $id) {
+    id name
+    cardCount { total official }
+    cards { id localId name rarity illustrator variants { %s } }
+  }
+}
+''' % ' '.join(VARIANT_FIELDS)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sets (
+    id TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    name TEXT NOT NULL,
+    card_count INTEGER NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (id, lang)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    set_id TEXT NOT NULL,
+    local_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    rarity TEXT,
+    illustrator TEXT,
+    PRIMARY KEY (id, lang)
+);
+CREATE TABLE IF NOT EXISTS variants (
+    card_id TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    PRIMARY KEY (card_id, lang, variant)
+);
+CREATE INDEX IF NOT EXISTS cards_by_set ON cards (set_id, lang);
+CREATE INDEX IF NOT EXISTS cards_by_illustrator ON cards (illustrator, lang);
+'''
+
+
+def set_id_of(card_brief: Dict) -> str:
+    """'ex11-30' with localId '30' -> 'ex11' (card ids are {set id}-{local id})"""
+    card_id, local_id = card_brief.get('id', ''), card_brief.get('localId', '')
+    if local_id and card_id.endswith(f'-{local_id}'):
+        return card_id[:-len(local_id) - 1]
+    return card_id.rsplit('-', 1)[0]
+
+
+class TcgdexMirror:
+    """SQLite mirror of TCGdex sets with their cards and variants"""
+
+    def __init__(self, path: str = MIRROR_DB, lang: str = 'en'):
+        self.path = path
+        self.lang = lang
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        # Mirrors of different languages sync into the same file at the same time
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fetch_set(self, session: requests.Session, api_base: str, set_id: str) -> Optional[Dict]:
+        try:
+            response = session.post(f'{api_base}/graphql', params={'lang': self.lang}, timeout=30,
+                                    json={'query': SET_QUERY, 'variables': {'id': set_id}})
+            response.raise_for_status()
+            payload = response.json()
+            if payload.get('errors'):
+                raise ValueError(payload['errors'][0].get('message', payload['errors']))
+            return payload['data']['set']
+        except Exception as e:
+            print(f"  ⚠️ Error fetching set {set_id}: {e}")
+            return None
+
+    def _store_set(self, data: Dict) -> None:
+        """Replace one set and its cards in a single transaction"""
+        with self.db:
+            self.db.execute('DELETE FROM variants WHERE lang = ? AND card_id IN '
+                            '(SELECT id FROM cards WHERE set_id = ? AND lang = ?)',
+                            (self.lang, data['id'], self.lang))
+            self.db.execute('DELETE FROM cards WHERE set_id = ? AND lang = ?', (data['id'], self.lang))
+
+            cards = data.get('cards') or []
+            self.db.executemany(
+                'INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(card['id'], self.lang, data['id'], card.get('localId', ''), card.get('name', ''),
+                  card.get('rarity'), card.get('illustrator')) for card in cards])
+            self.db.executemany(
+                'INSERT OR REPLACE INTO variants VALUES (?, ?, ?)',
+                [(card['id'], self.lang, variant) for card in cards
+                 for variant, available in (card.get('variants') or {}).items() if available])
+            self.db.execute(
+                'INSERT OR REPLACE INTO sets VALUES (?, ?, ?, ?, ?)',
+                (data['id'], self.lang, data.get('name', ''), (data.get('cardCount') or {}).get('total', len(cards)),
+                 time.time()))
+
+    def stale_sets(self, session: requests.Session, set_ids: Iterable[str],
+                   api_base: str = TCGDEX_API) -> List[str]:
+        """Sets that are missing locally or whose TCGdex card count changed"""
+        wanted = list(dict.fromkeys(set_ids))
+        local = {row['id']: row['card_count'] for row in self.db.execute(
+            'SELECT id, card_count FROM sets WHERE lang = ?', (self.lang,))}
+        if not any(set_id in local for set_id in wanted):
+            return wanted
+
+        # One listing request carries the card count of every set; always revalidate it
+        response = session.get(f'{api_base}/{self.lang}/sets', headers={'Cache-Control': 'no-cache'}, timeout=30)
+        response.raise_for_status()
+        remote = {s['id']: (s.get('cardCount') or {}).get('total') for s in response.json()}
+
+        return [set_id for set_id in wanted
+                if set_id not in local or (remote.get(set_id) is not None and remote[set_id] != local[set_id])]
+
+    def sync(self, session: requests.Session, set_ids: Iterable[str], api_base: str = TCGDEX_API,
+             workers: int = 4, force: bool = False) -> List[str]:
+        """
+        Fetch every stale set (all of them with force=True) and store it.
+
+        Returns:
+            The set ids that were refreshed
+        """
+        todo = list(dict.fromkeys(set_ids)) if force else self.stale_sets(session, set_ids, api_base)
+        if not todo:
+            return []
+
+        print(f"🌐 Syncing {len(todo)} TCGdex {self.lang} sets ({workers} workers)...")
+        synced = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for set_id, data in zip(todo, pool.map(lambda s: self._fetch_set(session, api_base, s), todo)):
+                if data:
+                    self._store_set(data)
+                    synced.append(set_id)
+                    print(f"  ✅ {set_id} ({self.lang}): {len(data.get('cards') or [])} cards")
+        return synced
+
+    def _detail(self, row: sqlite3.Row) -> Dict:
+        variants = {variant for (variant,) in self.db.execute(
+            'SELECT variant FROM variants WHERE card_id = ? AND lang = ?', (row['id'], self.lang))}
+        return {
+            'id': row['id'],
+            'localId': row['local_id'],
+            'name': row['name'],
+            'rarity': row['rarity'],
+            'illustrator': row['illustrator'],
+            'set': {'id': row['set_id'], 'name': row['set_name']},
+            'variants': {field: field in variants for field in VARIANT_FIELDS},
+        }
+
+    def card(self, card_id: str) -> Optional[Dict]:
+        """The card in /cards/{id} detail shape, or None if it is not mirrored"""
+        row = self.db.execute(
+            'SELECT cards.*, sets.name AS set_name FROM cards '
+            'JOIN sets ON sets.id = cards.set_id AND sets.lang = cards.lang '
+            'WHERE cards.id = ? AND cards.lang = ?', (card_id, self.lang)).fetchone()
+        return self._detail(row) if row else None
+
+    def cards(self, card_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        return {card_id: self.card(card_id) for card_id in dict.fromkeys(card_ids)}
+
+    def variant_index(self) -> Tuple[Dict[Tuple[str, str], Set[str]], Set[str]]:
+        """
+        {(set id, local id): variants} for every mirrored card of this
+        language, and the ids of the mirrored sets (whose cards are all known)
+        """
+        index = defaultdict(set)
+        for row in self.db.execute(
+                'SELECT cards.set_id, cards.local_id, variants.variant FROM cards '
+                'LEFT JOIN variants ON variants.card_id = cards.id AND variants.lang = cards.lang '
+                'WHERE cards.lang = ?', (self.lang,)):
+            variants = index[(row['set_id'], row['local_id'])]
+            if row['variant']:
+                variants.add(row['variant'])
+        set_ids = {row['id'] for row in self.db.execute('SELECT id FROM sets WHERE lang = ?', (self.lang,))}
+        return dict(index), set_ids
@@ -1,153 +1,218 @@
-import requests
+import copy
 import json
-import time
-
-
-def update_database_from_tcgdex():
-    """Update database using TCGdex API data from illustrator search"""
+import os
+import sys
+
+from card_matcher import CardMatcher
+from database_converter import PUBLIC_CARDS_JSON, load_cards, save_cards
+from instrumentation import metrics, profiling_requested
+from tcgdex_client import TCGDEX_API, fetch_card_details, make_session
+from tcgdex_languages import (DEFAULT_LANGUAGES, LANGUAGES_SOURCE, LanguageAvailability, available_languages,
+                              fetch_illustrator_cards, sync_catalogs)
+from tcgdex_mirror import MIRROR_DB, TcgdexMirror
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CARDS_UPDATED = os.path.join(CURRENT_DIR, '..', 'data', 'cards_updated.arrow')
+CARDS_FINAL = os.path.join(CURRENT_DIR, '..', 'data', 'cards_final.arrow')
+
+
+def build_variations(detail, availability=None):
+    """
+    Build the variations dict for a TCGdex card detail.
+
+    `availability` ({variation type: {language code: True/False/None}}, from
+    LanguageAvailability.resolve) decides available_languages wherever the
+    TCGdex catalogs know the answer; otherwise they are guessed from the set.
+    """
+    availability = availability or {}
+
+    # Get variations
+    variants = detail.get('variants', {})
+    set_info = detail.get('set', {})
+    set_id = set_info.get('id', '').lower()
+    set_name = set_info.get('name', '').lower()
+
+    # Check special sets
+    is_vs_set = 'vs' in set_id or 'vs' in set_name
+    is_neo_set = set_id.startswith('neo')
+
+    def variation(var_type, default_language, guessed_languages):
+        languages, verified = available_languages(availability.get(var_type), guessed_languages)
+        data = {
+            'count': 0,
+            'ordered': False,
+            'languages': [],
+            'default_language': default_language if default_language in languages else languages[0],
+            'available_languages': languages
+        }
+        if verified:
+            data['languages_source'] = LANGUAGES_SOURCE
+        return data
+
+    new_variations = {}
+
+    # Normal
+    if variants.get('normal'):
+        new_variations['normal'] = variation('normal', 'JP' if is_vs_set else 'EN',
+                                             ['JP'] if is_vs_set else ['EN', 'JP'])
+
+    # Reverse Holo (not for Neo or VS sets)
+    if (variants.get('reverse') or variants.get('reverseHolo')) and not is_neo_set and not is_vs_set:
+        new_variations['reverse_holo'] = variation('reverse_holo', 'EN', ['EN', 'JP'])
+
+    # 1st Edition
+    if variants.get('firstEdition') or variants.get('1stEdition'):
+        new_variations['first_edition'] = variation('first_edition', 'JP' if is_vs_set else 'EN',
+                                                    ['JP'] if is_vs_set else ['EN'])
+
+    # Holo
+    if variants.get('holo'):
+        new_variations['holo'] = variation('holo', 'EN', ['EN', 'JP'])
+
+    return new_variations
+
+
+def merge_variations(old_variations, new_variations):
+    """Merge new variations with existing user data (count, ordered, languages)"""
+    merged_variations = {}
+
+    for var_type, var_data in new_variations.items():
+        if var_type in old_variations:
+            # Preserve user data
+            merged_variations[var_type] = {
+                **var_data,
+                'count': old_variations[var_type].get('count', 0),
+                'ordered': old_variations[var_type].get('ordered', False),
+                'languages': old_variations[var_type].get('languages', [])
+            }
+        else:
+            merged_variations[var_type] = var_data
+
+    return merged_variations
+
+
+def update_variations_from_tcgdex(your_cards, api_base=TCGDEX_API, workers=8, min_confidence=0.4, bulk=True,
+                                  languages=DEFAULT_LANGUAGES, mirror_path=MIRROR_DB):
+    """
+    Match cards against TCGdex's Yuka Morii cards and rebuild their variations
+    in place, keeping user data. Returns (updated count, skipped count).
+
+    With bulk=True the Yuka Morii catalog of every language in `languages` is
+    synced into the local TCGdex mirror at `mirror_path` concurrently (one
+    request per changed set), details are read from it and available
+    languages come from joining the catalogs (see tcgdex_languages.py). Cards
+    are matched against the first language. Cards the mirror lacks, or all
+    cards with bulk=False, are fetched in one batch over a pooled keep-alive
+    session with `workers` concurrent requests, and their languages are
+    guessed. `api_base` can point at a mock server. Matches scoring below
+    `min_confidence` are skipped.
+    """
 
     print("🔍 Fetching all Yuka Morii cards from TCGdex...")
-
-    try:
+    session = make_session(pool_size=workers)
+
+    mirror = None
+    availability = None
+    if bulk:
+        # Fetch all Yuka Morii cards in every language and sync their sets, sharing the pool
+        with metrics.stage('tcgdex_mirror_sync'):
+            catalogs = sync_catalogs(session, languages, api_base=api_base, path=mirror_path,
+                                     workers=max(1, workers // len(languages)))
+            tcgdex_cards = catalogs[languages[0]]
+            availability = LanguageAvailability.from_mirror(mirror_path, languages)
+            mirror = TcgdexMirror(mirror_path, lang=languages[0])
+            # Mirrored cards carry their set name, which sharpens matching
+            tcgdex_cards = [mirror.card(card['id']) or card for card in tcgdex_cards]
+    else:
         # Fetch all Yuka Morii cards
-        response = requests.get('https://api.tcgdex.net/v2/en/illustrators/Yuka Morii')
-        response.raise_for_status()
-        data = response.json()
-        tcgdex_cards = data.get('cards', [])
-
+        with metrics.stage('tcgdex_illustrator'):
+            tcgdex_cards = fetch_illustrator_cards(session, languages[0], api_base)
         print(f"✅ Found {len(tcgdex_cards)} cards from TCGdex")
 
-        # Create a mapping: card_name -> tcgdex_data
-        tcgdex_map = {}
-        for card in tcgdex_cards:
-            card_id = card.get('id')
-            card_name = card.get('name')
-            # Use name as key since IDs don't match
-            if card_name:
-                if card_name not in tcgdex_map:
-                    tcgdex_map[card_name] = []
-                tcgdex_map[card_name].append(card_id)
+    # Index TCGdex cards by normalized name/set/number, with a fuzzy name fallback
+    with metrics.stage('tcgdex_index'):
+        matcher = CardMatcher.from_tcgdex_cards(tcgdex_cards)
 
-        print(f"📖 Reading your existing database...")
-        with open('../../public/cards.json', 'r', encoding='utf-8') as f:
-            your_cards = json.load(f)
-
-        print(f"✅ Loaded {len(your_cards)} cards from your database\n")
-        print("🔄 Matching and updating variations...\n")
+    print("🔄 Matching cards...\n")
 
-        updated_count = 0
-        skipped_count = 0
+    updated_count = 0
+    skipped_count = 0
+    matches = {}
 
+    with metrics.stage('tcgdex_match'):
         for idx, your_card in enumerate(your_cards, 1):
             card_name = your_card.get('name', '')
             print(f"Processing {idx}/{len(your_cards)}: {card_name}...")
 
-            # Try to find matching TCGdex card(s)
-            matching_ids = tcgdex_map.get(card_name, [])
+            # Try to find matching TCGdex card
+            match = matcher.match(your_card)
 
-            if not matching_ids:
-                print(f"  ⚠️ No match found in TCGdex")
+            if not match or match.confidence < min_confidence:
+                print(f"  ⚠️ No match found in TCGdex" + (f" ({match.explanation})" if match else ""))
                 skipped_count += 1
                 continue
 
-            # If multiple matches, try to pick the best one
-            # (we'll just use the first for now, but could add smarter logic)
-            tcgdex_id = matching_ids[0]
-            if len(matching_ids) > 1:
-                print(f"  ⚠️ Multiple matches found, using: {tcgdex_id}")
-
-            # Fetch detailed card info
-            try:
-                detail_response = requests.get(f'https://api.tcgdex.net/v2/en/cards/{tcgdex_id}')
-                detail_response.raise_for_status()
-                detail = detail_response.json()
-
-                # Get variations
-                variants = detail.get('variants', {})
-                set_info = detail.get('set', {})
-                set_id = set_info.get('id', '').lower()
-                set_name = set_info.get('name', '').lower()
-
-                # Check special sets
-                is_vs_set = 'vs' in set_id or 'vs' in set_name
-                is_neo_set = set_id.startswith('neo')
-
-                new_variations = {}
-
-                # Normal
-                if variants.get('normal'):
-                    new_variations['normal'] = {
-                        'count': 0,
-                        'ordered': False,
-                        'languages': [],
-                        'default_language': 'JP' if is_vs_set else 'EN',
-                        'available_languages': ['JP'] if is_vs_set else ['EN', 'JP']
-                    }
-
-                # Reverse Holo (not for Neo or VS sets)
-                if (variants.get('reverse') or variants.get('reverseHolo')) and not is_neo_set and not is_vs_set:
-                    new_variations['reverse_holo'] = {
-                        'count': 0,
-                        'ordered': False,
-                        'languages': [],
-                        'default_language': 'EN',
-                        'available_languages': ['EN', 'JP']
-                    }
-
-                # 1st Edition
-                if variants.get('firstEdition') or variants.get('1stEdition'):
-                    new_variations['first_edition'] = {
-                        'count': 0,
-                        'ordered': False,
-                        'languages': [],
-                        'default_language': 'JP' if is_vs_set else 'EN',
-                        'available_languages': ['JP'] if is_vs_set else ['EN']
-                    }
-
-                # Holo
-                if variants.get('holo'):
-                    new_variations['holo'] = {
-                        'count': 0,
-                        'ordered': False,
-                        'languages': [],
-                        'default_language': 'EN',
-                        'available_languages': ['EN', 'JP']
-                    }
-
-                # Merge with existing user data
-                old_variations = your_card.get('variations', {})
-                merged_variations = {}
-
-                for var_type, var_data in new_variations.items():
-                    if var_type in old_variations:
-                        # Preserve user data
-                        merged_variations[var_type] = {
-                            **var_data,
-                            'count': old_variations[var_type].get('count', 0),
-                            'ordered': old_variations[var_type].get('ordered', False),
-                            'languages': old_variations[var_type].get('languages', [])
-                        }
-                    else:
-                        merged_variations[var_type] = var_data
-
-                your_card['variations'] = merged_variations
-                updated_count += 1
-                print(f"  ✅ Updated: {list(merged_variations.keys())}")
-
-                time.sleep(0.15)
-
-            except Exception as e:
-                print(f"  ⚠️ Error fetching details: {e}")
+            tcgdex_id = match.tcgdex_id
+            if match.confidence < 1.0:
+                print(f"  🔎 {tcgdex_id} - confidence {match.confidence:.2f}: {match.explanation}")
+
+            matches[idx - 1] = tcgdex_id
+
+    # Resolve details from the mirror, fetch the rest - shared ids are only requested once
+    with metrics.stage('tcgdex_details'):
+        details = mirror.cards(matches.values()) if mirror else {}
+        missing = [tcgdex_id for tcgdex_id in matches.values() if details.get(tcgdex_id) is None]
+        if missing:
+            print(f"\n🌐 Fetching details for {len(set(missing))} TCGdex cards ({workers} workers)...")
+            details.update(fetch_card_details(session, missing, api_base=api_base, workers=workers))
+    if mirror:
+        mirror.close()
+
+    print("🔄 Updating variations...\n")
+    known_count = 0
+    with metrics.stage('tcgdex_merge'):
+        for idx, tcgdex_id in matches.items():
+            your_card = your_cards[idx]
+            detail = details.get(tcgdex_id)
+
+            if detail is None:
                 skipped_count += 1
+                continue
+
+            new_variations = build_variations(detail, availability.resolve(detail) if availability else None)
+            known_count += sum(1 for data in new_variations.values() if data.get('languages_source'))
+            merged_variations = merge_variations(your_card.get('variations', {}), new_variations)
+
+            your_card['variations'] = merged_variations
+            updated_count += 1
+            print(f"  ✅ Updated {your_card.get('name', '')}: {list(merged_variations.keys())}")
+
+    if availability:
+        print(f"\n🌍 Languages of {known_count} variations resolved from the {'/'.join(languages)} catalogs")
+    return updated_count, skipped_count
+
+
+def update_database_from_tcgdex(api_base=TCGDEX_API, workers=8, min_confidence=0.4, bulk=True):
+    """Update cards.json variations from TCGdex and save them to cards_updated.arrow"""
+
+    try:
+        print(f"📖 Reading your existing database...")
+        with metrics.stage('load_input'), open(PUBLIC_CARDS_JSON, 'r', encoding='utf-8') as f:
+            your_cards = json.load(f)
+
+        print(f"✅ Loaded {len(your_cards)} cards from your database\n")
+
+        updated_count, skipped_count = update_variations_from_tcgdex(
+            your_cards, api_base=api_base, workers=workers, min_confidence=min_confidence, bulk=bulk)
 
         # Save
-        with open('../data/cards_updated.json', 'w', encoding='utf-8') as f:
-            json.dump(your_cards, f, indent=2, ensure_ascii=False)
+        with metrics.stage('save_output'):
+            save_cards(your_cards, CARDS_UPDATED)
 
         print(f"\n✅ Update complete!")
         print(f"📊 Updated: {updated_count} cards")
         print(f"⚠️  Skipped: {skipped_count} cards")
-        print(f"💾 Saved to: cards_updated.json")
+        print(f"💾 Saved to: cards_updated.arrow")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -155,174 +220,169 @@ def update_database_from_tcgdex():
         traceback.print_exc()
 
 
-if __name__ == "__main__":
-    #update_database_from_tcgdex()
-
-    import json
-
-    # Read the updated file
-    with open('../data/cards_updated.json', 'r', encoding='utf-8') as f:
-        cards = json.load(f)
-
-    # Manual fixes
-    manual_fixes = {
-        "Bruno's Machamp": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                              "available_languages": ["JP"]}},
-        "Bruno's Steelix": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                              "available_languages": ["JP"]}},
-        "Bruno's Hitmonchan": {
-            "first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                              "available_languages": ["JP"]}},
-        "Bruno's Hitmonlee": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                                "available_languages": ["JP"]}},
-        "Bruno's Hitmontop": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                                "available_languages": ["JP"]}},
-        "Bruno's Ursaring": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                               "available_languages": ["JP"]}},
-
-        # Ditto variants
-        "Ditto BULBASAUR": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                       "available_languages": ["EN"]},
-                            "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                             "available_languages": ["EN"]}},
-        "Ditto CHARMANDER 2": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                          "available_languages": ["EN"]},
-                               "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                                "available_languages": ["EN"]}},
-        "Ditto MR MIME": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                     "available_languages": ["EN"]},
-                          "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                           "available_languages": ["EN"]}},
-        "Ditto PIKACHU": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                     "available_languages": ["EN"]},
-                          "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                           "available_languages": ["EN"]}},
-        "Ditto SQUIRTLE 2": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                        "available_languages": ["EN"]},
-                             "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                              "available_languages": ["EN"]}},
-        "Ditto CHARMANDER": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                        "available_languages": ["EN"]},
-                             "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                              "available_languages": ["EN"]}},
-        "Ditto GEODUDE": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                     "available_languages": ["EN"]},
-                          "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                           "available_languages": ["EN"]}},
-        "Ditto SQUIRTLE": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+# Manual fixes
+MANUAL_FIXES = {
+    "Bruno's Machamp": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                          "available_languages": ["JP"]}},
+    "Bruno's Steelix": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                          "available_languages": ["JP"]}},
+    "Bruno's Hitmonchan": {
+        "first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                          "available_languages": ["JP"]}},
+    "Bruno's Hitmonlee": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                            "available_languages": ["JP"]}},
+    "Bruno's Hitmontop": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                            "available_languages": ["JP"]}},
+    "Bruno's Ursaring": {"first_edition": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                           "available_languages": ["JP"]}},
+
+    # Ditto variants
+    "Ditto BULBASAUR": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                   "available_languages": ["EN"]},
+                        "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                         "available_languages": ["EN"]}},
+    "Ditto CHARMANDER 2": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
                                       "available_languages": ["EN"]},
                            "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
                                             "available_languages": ["EN"]}},
+    "Ditto MR MIME": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                 "available_languages": ["EN"]},
+                      "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                       "available_languages": ["EN"]}},
+    "Ditto PIKACHU": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                 "available_languages": ["EN"]},
+                      "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                       "available_languages": ["EN"]}},
+    "Ditto SQUIRTLE 2": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                    "available_languages": ["EN"]},
+                         "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                          "available_languages": ["EN"]}},
+    "Ditto CHARMANDER": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                    "available_languages": ["EN"]},
+                         "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                          "available_languages": ["EN"]}},
+    "Ditto GEODUDE": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                 "available_languages": ["EN"]},
+                      "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                       "available_languages": ["EN"]}},
+    "Ditto SQUIRTLE": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN"]},
+                       "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                        "available_languages": ["EN"]}},
 
-        # Japanese promos
-        "Pikachu TOKYO": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                     "available_languages": ["JP"]}},
-        "Pikachu FUKUOKA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                       "available_languages": ["JP"]}},
-        "Pikachu NAGOYA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                      "available_languages": ["JP"]}},
-        "Pikachu OSAKA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                     "available_languages": ["JP"]}},
-        "Pikachu YOKOHAMA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                                        "available_languages": ["JP"]}},
-        "Bulbasaur": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+    # Japanese promos
+    "Pikachu TOKYO": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
                                  "available_languages": ["JP"]}},
-        "Charmander": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+    "Pikachu FUKUOKA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                   "available_languages": ["JP"]}},
+    "Pikachu NAGOYA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
                                   "available_languages": ["JP"]}},
-        "Treecko": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
-                               "available_languages": ["JP"]}},
-
-        # Recent cards
-        "Venusaur & Snivy GX": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                           "available_languages": ["EN", "JP"]},
-                                "reverse_holo": {"count": 0, "ordered": False, "languages": [],
-                                                 "default_language": "EN", "available_languages": ["EN", "JP"]}},
-        "Wormadam": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                "available_languages": ["EN", "JP"]},
-                     "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                      "available_languages": ["EN", "JP"]}},
-        "Staryu": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                              "available_languages": ["EN", "JP"]},
-                   "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                    "available_languages": ["EN", "JP"]}},
-        "Shieldon": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                "available_languages": ["EN", "JP"]},
-                     "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                      "available_languages": ["EN", "JP"]}},
-        "Litwick": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                               "available_languages": ["EN", "JP"]},
+    "Pikachu OSAKA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                 "available_languages": ["JP"]}},
+    "Pikachu YOKOHAMA": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                                    "available_languages": ["JP"]}},
+    "Bulbasaur": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                             "available_languages": ["JP"]}},
+    "Charmander": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                              "available_languages": ["JP"]}},
+    "Treecko": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "JP",
+                           "available_languages": ["JP"]}},
+
+    # Recent cards
+    "Venusaur & Snivy GX": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                       "available_languages": ["EN", "JP"]},
+                            "reverse_holo": {"count": 0, "ordered": False, "languages": [],
+                                             "default_language": "EN", "available_languages": ["EN", "JP"]}},
+    "Wormadam": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                            "available_languages": ["EN", "JP"]},
+                 "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN", "JP"]}},
+    "Staryu": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                          "available_languages": ["EN", "JP"]},
+               "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                "available_languages": ["EN", "JP"]}},
+    "Shieldon": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                            "available_languages": ["EN", "JP"]},
+                 "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN", "JP"]}},
+    "Litwick": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                           "available_languages": ["EN", "JP"]},
+                "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                 "available_languages": ["EN", "JP"]}},
+    "Ducklett": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                            "available_languages": ["EN", "JP"]},
+                 "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN", "JP"]}},
+    "Machop": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                          "available_languages": ["EN", "JP"]},
+               "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                "available_languages": ["EN", "JP"]}},
+    "Murkrow": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                           "available_languages": ["EN", "JP"]},
+                "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                 "available_languages": ["EN", "JP"]}},
+    "Pawniard": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                            "available_languages": ["EN", "JP"]},
+                 "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN", "JP"]}},
+    "Drapion V": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                             "available_languages": ["EN", "JP"]},
+                  "holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                           "available_languages": ["EN", "JP"]}},
+    "Nymble": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                          "available_languages": ["EN", "JP"]},
+               "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                "available_languages": ["EN", "JP"]}},
+
+    # Delta Species Dittos
+    "Croconaw 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                               "available_languages": ["EN"]},
                     "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                     "available_languages": ["EN", "JP"]}},
-        "Ducklett": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                "available_languages": ["EN", "JP"]},
-                     "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                      "available_languages": ["EN", "JP"]}},
-        "Machop": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                              "available_languages": ["EN", "JP"]},
+                                     "available_languages": ["EN"]}},
+    "Flaaffy 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                              "available_languages": ["EN"]},
                    "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                    "available_languages": ["EN", "JP"]}},
-        "Murkrow": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                               "available_languages": ["EN", "JP"]},
-                    "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                     "available_languages": ["EN", "JP"]}},
-        "Pawniard": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                "available_languages": ["EN", "JP"]},
-                     "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                      "available_languages": ["EN", "JP"]}},
-        "Drapion V": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                 "available_languages": ["EN", "JP"]},
-                      "holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                               "available_languages": ["EN", "JP"]}},
-        "Nymble": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                              "available_languages": ["EN", "JP"]},
-                   "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                    "available_languages": ["EN", "JP"]}},
-
-        # Delta Species Dittos
-        "Croconaw 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                   "available_languages": ["EN"]},
-                        "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                         "available_languages": ["EN"]}},
-        "Flaaffy 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                  "available_languages": ["EN"]},
-                       "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                        "available_languages": ["EN"]}},
-        "Chikorita 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                    "available_languages": ["EN"]},
-                         "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
-                                          "available_languages": ["EN"]}},
-        "Ekans 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                    "available_languages": ["EN"]}},
+    "Chikorita 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
                                 "available_languages": ["EN"]},
                      "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
                                       "available_languages": ["EN"]}},
-    }
+    "Ekans 未": {"normal": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                            "available_languages": ["EN"]},
+                 "reverse_holo": {"count": 0, "ordered": False, "languages": [], "default_language": "EN",
+                                  "available_languages": ["EN"]}},
+}
 
-    # Apply fixes
+
+def apply_manual_fixes(cards, manual_fixes=MANUAL_FIXES):
+    """Replace the variations of the cards named in manual_fixes, keeping user data"""
     for card in cards:
         name = card.get('name', '')
         if name in manual_fixes:
-            # Preserve user data
-            old_vars = card.get('variations', {})
-            new_vars = manual_fixes[name]
-
-            merged = {}
-            for var_type, var_data in new_vars.items():
-                if var_type in old_vars:
-                    merged[var_type] = {
-                        **var_data,
-                        'count': old_vars[var_type].get('count', 0),
-                        'ordered': old_vars[var_type].get('ordered', False),
-                        'languages': old_vars[var_type].get('languages', [])
-                    }
-                else:
-                    merged[var_type] = var_data
-
-            card['variations'] = merged
+            # Preserve user data - the fix table is copied so it is never shared between cards
+            card['variations'] = merge_variations(card.get('variations', {}), copy.deepcopy(manual_fixes[name]))
             print(f"✅ Fixed: {name}")
+    return cards
+
+
+if __name__ == "__main__":
+    profiling_requested(sys.argv)
+
+    #update_database_from_tcgdex()
+
+    # Read the updated file
+    with metrics.stage('load_input'):
+        cards = load_cards(CARDS_UPDATED)
+
+    # Manual fixes
+    with metrics.stage('manual_fixes'):
+        apply_manual_fixes(cards)
 
     # Save
-    with open('../data/json/cards_final.json', 'w', encoding='utf-8') as f:
-        json.dump(cards, f, indent=2, ensure_ascii=False)
+    with metrics.stage('save_output'):
+        save_cards(cards, CARDS_FINAL)
+    metrics.export('update_database')
 
-    print(f"\n✅ All done! Saved to cards_final.json")
-    print("Review it, then replace your cards.json")
\ No newline at end of file
+    print(f"\n✅ All done! Saved to cards_final.arrow")
+    print("Review it, then publish it to cards.json with:")
+    print("  python database_converter.py publish ../data/cards_final.arrow")
\ No newline at end of file
@@ -1,28 +1,44 @@
+import asyncio
 import json
 import requests
-from bs4 import BeautifulSoup
+import sys
 import time
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 import re
 
+from fetch_engine import DomainLimit, FetchEngine
+from checkpoint_journal import CardJournal
+from fingerprints import MANIFEST_DIR, FingerprintManifest
+from html_parsing import variation_hints
+from http_cache import CachedSession
+from instrumentation import metrics, profiling_requested
+from migrations import owned_to_count
+
+FETCHER_VERSION = '1'  # Bump when scraping logic changes to re-enrich every card
+ENRICH_MANIFEST = os.path.join(MANIFEST_DIR, 'enrich.json')
+ENRICH_MAX_AGE = 30 * 24 * 3600
+
 
 class CardEnricher:
     """Enrich card data by scraping existing URLs"""
 
     def __init__(self):
-        self.session = requests.Session()
+        self.session = CachedSession()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
 
+    @metrics.stage('scrape_serebii')
     def scrape_serebii_card(self, url: str) -> Dict:
         """Scrape card info from Serebii"""
         try:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+
+            # Check page content for variation hints
+            page_text, rarities = variation_hints(response.content)
 
             variations = {
                 'normal': {
@@ -31,9 +47,6 @@ class CardEnricher:
                 }
             }
 
-            # Check page content for variation hints
-            page_text = soup.get_text().lower()
-
             # Check for holofoil mentions
             if 'holofoil' in page_text or 'holo rare' in page_text or 'holographic' in page_text:
                 variations['holo'] = {
@@ -49,20 +62,12 @@ class CardEnricher:
                 }
 
             # Check rarity from table
-            tables = soup.find_all('table')
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        cell_text = cells[0].get_text().strip().lower()
-                        if 'rarity' in cell_text:
-                            rarity_text = cells[1].get_text().strip().lower()
-                            if 'holo' in rarity_text and 'reverse' not in rarity_text:
-                                variations['holo'] = {
-                                    'owned': 'no',
-                                    'languages': ['English']
-                                }
+            for rarity_text in rarities:
+                if 'holo' in rarity_text and 'reverse' not in rarity_text:
+                    variations['holo'] = {
+                        'owned': 'no',
+                        'languages': ['English']
+                    }
 
             return variations
 
@@ -70,12 +75,14 @@ class CardEnricher:
             print(f"    Error scraping Serebii: {e}")
             return None
 
+    @metrics.stage('scrape_pkmncards')
     def scrape_pkmncards(self, url: str) -> Dict:
         """Scrape card info from PkmnCards"""
         try:
             response = self.session.get(url, timeout=15)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Look for variation info in the page
+            page_text, _ = variation_hints(response.content)
 
             variations = {
                 'normal': {
@@ -84,9 +91,6 @@ class CardEnricher:
                 }
             }
 
-            # Look for variation info in the page
-            page_text = soup.get_text().lower()
-
             # Check for holofoil
             if 'holofoil' in page_text or 'holo rare' in page_text:
                 variations['holo'] = {
@@ -132,6 +136,7 @@ class CardEnricher:
 
         return variations
 
+    @metrics.stage('enrich_card')
     def enrich_card(self, card: Dict) -> Dict:
         """Enrich a single card with variation data"""
         print(f"Processing: {card['name']} ({card.get('set', 'Unknown')} #{card.get('number', '?')})")
@@ -176,68 +181,180 @@ class CardEnricher:
 
         return card
 
-    def process_collection(self, input_file: str, output_file: str, delay: float = 1.0, start_from: int = 0):
-        """Process entire collection and save enriched data"""
+    def _enrich_or_keep(self, card: Dict) -> Tuple[Dict, bool]:
+        """Enrich a card; returns (card, True), or (the unchanged card, False) if enrichment fails"""
+        try:
+            return self.enrich_card(card), True
+        except Exception as e:
+            print(f"  ❌ Error processing card: {e}")
+            return card, False
+
+    def _enrich_concurrently(self, cards: List[Dict], todo: List[int], on_done,
+                             domain_limits: Optional[Dict[str, DomainLimit]]) -> None:
+        """Enrich cards[i] for every i in todo with the async fetch engine"""
+        engine = FetchEngine(domain_limits)
+        asyncio.run(engine.map_ordered(
+            [cards[i] for i in todo],
+            lambda c: c.get('url', ''),
+            self._enrich_or_keep,
+            lambda index, result: on_done(todo[index], *result)
+        ))
+
+    def enrich_cards(self, cards: List[Dict], manifest: FingerprintManifest, delay: float = 1.0,
+                     concurrent: bool = False, domain_limits: Optional[Dict[str, DomainLimit]] = None) -> List[Dict]:
+        """
+        Enrich, in memory, the cards the manifest says need it, for the
+        pipeline's enrich stage. The store's variations carry the owned counts,
+        so they are kept as they are; only variation types the card does not
+        have yet are added, in the count structure. Returns the cards.
+        """
+        todo = [i for i, card in enumerate(cards) if manifest.needs_update(card)]
+        print(f"♻️  {len(cards) - len(todo)} cards unchanged since last run, enriching {len(todo)}")
+
+        def merge(i: int, enriched_card: Dict, ok: bool = True):
+            if not ok or not enriched_card.get('enriched'):
+                return
+            card = cards[i]
+            scraped = {'variations': {var_type: variation for var_type, variation
+                                      in enriched_card['variations'].items()
+                                      if var_type not in (card.get('variations') or {})}}
+            owned_to_count([scraped])
+            card['variations'] = {**(card.get('variations') or {}), **scraped['variations']}
+            card['enriched'] = True
+            card['enriched_method'] = enriched_card['enriched_method']
+            manifest.mark(card)
+
+        try:
+            if concurrent:
+                self._enrich_concurrently([dict(card) for card in cards], todo, merge, domain_limits)
+            else:
+                for i in todo:
+                    merge(i, *self._enrich_or_keep(dict(cards[i])))
+                    with metrics.stage('rate_limit_sleep'):
+                        time.sleep(delay)
+        finally:
+            manifest.save()
+        return cards
+
+    def process_collection(self, input_file: str, output_file: str, delay: float = 1.0, start_from: int = 0,
+                           concurrent: bool = False, domain_limits: Optional[Dict[str, DomainLimit]] = None,
+                           manifest_file: Optional[str] = None, max_age: Optional[float] = None):
+        """
+        Process entire collection and save enriched data.
+
+        With concurrent=True, cards are fetched in parallel through FetchEngine,
+        rate limited per domain by `domain_limits` instead of a fixed `delay`.
+
+        With a `manifest_file`, the run is incremental: cards whose fingerprint
+        is unchanged (and younger than `max_age` seconds) are copied from the
+        existing output by id, and `start_from` is ignored.
+        """
         print(f"Loading cards from {input_file}...")
 
-        with open(input_file, 'r', encoding='utf-8') as f:
+        with metrics.stage('load_input'), open(input_file, 'r', encoding='utf-8') as f:
             cards = json.load(f)
 
+        manifest = FingerprintManifest(manifest_file, FETCHER_VERSION, max_age) if manifest_file else None
+
         # Load existing progress if output file exists
         enriched_cards = []
-        if os.path.exists(output_file) and start_from > 0:
+        todo = list(range(start_from, len(cards)))
+        if manifest:
+            previous = {}
+            if os.path.exists(output_file):
+                print(f"Loading existing progress from {output_file}...")
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    previous = {c.get('id'): c for c in json.load(f)}
+
+            todo = []
+            for i, card in enumerate(cards):
+                if card.get('id') in previous and not manifest.needs_update(card):
+                    enriched_cards.append(previous[card.get('id')])
+                else:
+                    enriched_cards.append(card)
+                    todo.append(i)
+            print(f"♻️  {len(cards) - len(todo)} cards unchanged since last run")
+
+        elif os.path.exists(output_file) and start_from > 0:
             print(f"Loading existing progress from {output_file}...")
             with open(output_file, 'r', encoding='utf-8') as f:
                 enriched_cards = json.load(f)
             print(f"Resuming from card {start_from + 1}")
 
-        print(f"\nProcessing {len(cards)} cards (starting from #{start_from + 1})...\n")
+        # Unprocessed slots hold the input card until they are enriched
+        enriched_cards.extend(cards[len(enriched_cards):])
+
+        # Replay cards journaled by an interrupted run
+        journal = CardJournal(output_file + '.journal.jsonl')
+        journaled = journal.replay()
+        if journaled:
+            print(f"📓 Replaying {len(journaled)} cards from the progress journal")
+            remaining = []
+            for i in todo:
+                card_id = cards[i].get('id')
+                if card_id in journaled:
+                    enriched_cards[i] = journaled[card_id]
+                    if manifest:
+                        manifest.mark(cards[i])
+                else:
+                    remaining.append(i)
+            todo = remaining
+
+        print(f"\nProcessing {len(todo)} of {len(cards)} cards...\n")
         print("=" * 80)
 
-        success_count = len([c for c in enriched_cards if c.get('enriched')])
+        success_count = 0
 
-        for i in range(start_from, len(cards)):
-            card = cards[i]
-            print(f"\n[{i + 1}/{len(cards)}]", end=" ")
+        def store(i: int, enriched_card: Dict, ok: bool = True):
+            nonlocal success_count
+            enriched_cards[i] = enriched_card
 
-            try:
-                enriched_card = self.enrich_card(card)
+            if ok and enriched_card.get('enriched'):
+                success_count += 1
+                # Checkpoint - O(1) per card, survives a crash
+                journal.append(enriched_card)
+                if manifest:
+                    manifest.mark(cards[i])
 
-                if len(enriched_cards) > i:
-                    enriched_cards[i] = enriched_card
-                else:
-                    enriched_cards.append(enriched_card)
+        def interrupted():
+            journal.close()
+            if manifest:
+                manifest.save()
+            print(f"\n\n⚠️  Interrupted by user. Progress is journaled, run again to resume.")
 
-                if enriched_card.get('enriched'):
-                    success_count += 1
+        if concurrent:
+            try:
+                self._enrich_concurrently(cards, todo, store, domain_limits)
+            except KeyboardInterrupt:
+                interrupted()
+                return
+            todo = []
+
+        for i in todo:
+            card = cards[i]
+            print(f"\n[{i + 1}/{len(cards)}]", end=" ")
 
-                # Save progress every 20 cards
-                if (i + 1) % 20 == 0:
-                    print(f"\n    💾 Saving progress...")
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(enriched_cards, f, indent=2, ensure_ascii=False)
+            try:
+                store(i, self.enrich_card(card))
 
             except KeyboardInterrupt:
-                print(f"\n\n⚠️  Interrupted by user. Saving progress...")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(enriched_cards, f, indent=2, ensure_ascii=False)
-                print(f"Progress saved. Resume with start_from={i}")
+                interrupted()
                 return
             except Exception as e:
                 print(f"  ❌ Error processing card: {e}")
-                if len(enriched_cards) > i:
-                    enriched_cards[i] = card
-                else:
-                    enriched_cards.append(card)
+                store(i, card, ok=False)
 
             # Rate limiting - be nice to the servers
-            time.sleep(delay)
+            with metrics.stage('rate_limit_sleep'):
+                time.sleep(delay)
 
         print("\n" + "=" * 80)
         print(f"\nSaving final data to {output_file}...")
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(enriched_cards, f, indent=2, ensure_ascii=False)
+        with metrics.stage('save_output'):
+            journal.compact(enriched_cards, output_file)
+        if manifest:
+            manifest.save()
 
         print("✅ Done!")
 
@@ -251,7 +368,7 @@ class CardEnricher:
         print(f"SUMMARY:")
         print(f"{'=' * 80}")
         print(f"  Total cards processed: {len(enriched_cards)}")
-        print(f"  Successfully enriched: {success_count}")
+        print(f"  Successfully enriched this run: {success_count}")
         print(f"  Total variations found: {total_variations}")
         print(f"  Average variations per card: {total_variations / len(enriched_cards):.2f}")
 
@@ -266,24 +383,20 @@ def main():
     print("No API key needed! 🎉\n")
 
     enricher = CardEnricher()
+    concurrent = '--concurrent' in sys.argv
+    profiling_requested(sys.argv)
 
-    # Check if user wants to resume
-    start_from = 0
-    if os.path.exists('../data/json/cards_enriched.json'):
-        resume = input("Found existing cards_enriched.json. Resume from last position? (y/n): ")
-        if resume.lower() == 'y':
-            with open('../data/json/cards_enriched.json', 'r') as f:
-                existing = json.load(f)
-                start_from = len(existing)
-                print(f"Will resume from card #{start_from + 1}\n")
-
-    # Process the collection
+    # Process the collection - cards already enriched with unchanged
+    # inputs are reused from cards_enriched.json by id
     enricher.process_collection(
         input_file='../../public/cards.json',
         output_file='../data/json/cards_enriched.json',
         delay=1.0,  # Be respectful - 1 second between requests
-        start_from=start_from
+        concurrent=concurrent,  # Per-domain rate limits replace the fixed delay
+        manifest_file=ENRICH_MANIFEST,
+        max_age=ENRICH_MAX_AGE
     )
+    metrics.export('enrich')
 
     print("\n" + "=" * 80)
     print("NEXT STEPS:")